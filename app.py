@@ -12,6 +12,7 @@ from pages import batch_generator
 from pages import settings
 from pages import history
 from utils.ai_services import generate_gemini_script, list_gemini_models
+from utils.render_profiles import obtener_perfil, perfil_desde_opciones
 
 # Importaciones simuladas de tus módulos de utilidades
 # En una implementación real, crearías estos archivos
@@ -496,16 +497,28 @@ else:
             st.subheader("Formato de salida")
             col1, col2, col3 = st.columns(3)
             
+            # Valores iniciales tomados del perfil por defecto de config.yaml
+            perfil_defecto = obtener_perfil()
+            resoluciones = ["1080p (1920x1080)", "720p (1280x720)", "Vertical (1080x1920)"]
+            tamano_defecto = perfil_defecto.tamano
+            indice_resolucion = next(
+                (i for i, r in enumerate(resoluciones) if tamano_defecto and r.endswith(f"({tamano_defecto[0]}x{tamano_defecto[1]})")),
+                0
+            )
+            
             with col1:
                 resolution = st.selectbox(
                     "Resolución",
-                    ["1080p (1920x1080)", "720p (1280x720)", "Vertical (1080x1920)"]
+                    resoluciones,
+                    index=indice_resolucion
                 )
             
             with col2:
+                formatos = ["MP4", "MOV", "WebM"]
                 format_type = st.selectbox(
                     "Formato",
-                    ["MP4", "MOV", "WebM"]
+                    formatos,
+                    index=[f.lower() for f in formatos].index(perfil_defecto.container)
                 )
             
             with col3:
@@ -514,6 +527,15 @@ else:
                     options=["Baja", "Media", "Alta", "Ultra"]
                 )
             
+            # Subtítulos incrustados desde la transcripción
+            st.subheader("Subtítulos")
+            col1, col2 = st.columns(2)
+            with col1:
+                burn_captions = st.checkbox("Subtítulos desde la transcripción", value=True)
+            with col2:
+                highlight_words = st.checkbox("Resaltar la palabra que suena", value=False,
+                                              disabled=not burn_captions)
+            
             # Botón para generar video
             if st.button("Generar video", use_container_width=True):
                 with st.spinner("Componiendo video... Esto puede tomar unos minutos"):
@@ -532,7 +554,11 @@ else:
                         "bg_music_volume": bg_music_volume if use_bg_music else 0,
                         "resolution": resolution,
                         "format": format_type,
-                        "quality": quality
+                        "quality": quality,
+                        "render_profile": perfil_desde_opciones(resolution, format_type, quality).a_dict(),
+                        # Parámetros captions/caption_style de create_video_from_images
+                        "captions": current_project["transcription"] if burn_captions else None,
+                        "caption_style": {"highlight_color": "#FFD400"} if burn_captions and highlight_words else None
                     }
                     current_project["status"] = "video_generated"
                     st.session_state.generation_step = 5
@@ -0,0 +1,66 @@
+"""
+Compara el coste de normalizar la música en cada render: afx.audio_normalize
+(decodifica todo el archivo para buscar el pico) frente al análisis guardado por
+hash de utils.audio_analysis, la primera vez (análisis completo) y en los
+renders siguientes (solo el hash del archivo).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_audio_analysis --seconds 180
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+from moviepy.audio.fx import all as afx
+from moviepy.config import FFMPEG_BINARY
+from moviepy.editor import AudioFileClip
+
+from utils.audio_analysis import AudioAnalysisCache, normalizar_audio
+import utils.audio_analysis as audio_analysis
+
+
+def crear_musica(ruta, segundos):
+    """Ruido rosa con trémolo en mp3: una música sintética con dinámica."""
+    subprocess.run(
+        [FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi", "-i",
+         f"anoisesrc=d={segundos}:c=pink:a=0.3", "-af", "tremolo=f=0.5:d=0.7",
+         "-ac", "2", "-ar", "44100", ruta],
+        check=True
+    )
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    funcion()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=180.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "musica.mp3")
+        crear_musica(ruta, args.seconds)
+        # Caché vacía en el directorio temporal, para medir también el primer análisis
+        audio_analysis.audio_analysis_cache = AudioAnalysisCache(os.path.join(directorio, "cache"))
+
+        print(f"Música de {args.seconds:g} s")
+        print(f"{'Variante':<34} {'s':>7}")
+        segundos = cronometrar(lambda: afx.audio_normalize(AudioFileClip(ruta)))
+        print(f"{'afx.audio_normalize (cada render)':<34} {segundos:7.2f}")
+        segundos = cronometrar(lambda: normalizar_audio(AudioFileClip(ruta), ruta))
+        print(f"{'análisis (primer render)':<34} {segundos:7.2f}")
+        # Renders siguientes en un proceso nuevo: solo se lee el JSON guardado
+        audio_analysis.audio_analysis_cache = AudioAnalysisCache(os.path.join(directorio, "cache"))
+        segundos = cronometrar(lambda: normalizar_audio(AudioFileClip(ruta), ruta))
+        print(f"{'análisis guardado (siguientes)':<34} {segundos:7.2f}")
+        analisis = audio_analysis.audio_analysis_cache.obtener(ruta)
+        print(f"pico {analisis['pico']:.3f}, loudness {analisis['loudness']:.1f} LUFS, {analisis['duracion']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compara dos formas de repetir la música de fondo hasta cubrir un video largo:
+concatenar el clip consigo mismo hasta superar la duración (lo que se hacía
+antes) y AudioEnBucle (utils.audio_loop). Se mide el tiempo de generar todo el
+audio por bloques, como al escribir el video, y el tiempo medio por bloque al
+principio y al final.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_audio_loop --music-seconds 20 --minutes 10
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+from moviepy.editor import AudioFileClip, concatenate_audioclips
+
+from utils.audio_loop import AudioEnBucle
+
+FPS_AUDIO = 44100
+
+
+def crear_musica(ruta, segundos):
+    """Acorde con trémolo, codificado en mp3 para que se lea con ffmpeg como una música real."""
+    subprocess.run(
+        [FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi",
+         "-i", f"sine=frequency=220:duration={segundos}", "-f", "lavfi",
+         "-i", f"sine=frequency=277:duration={segundos}", "-filter_complex",
+         "amix=inputs=2,tremolo=f=2,aformat=channel_layouts=stereo", "-ar", str(FPS_AUDIO), ruta],
+        check=True
+    )
+
+
+def bucle_concatenado(musica, duracion):
+    while musica.duration < duracion:
+        musica = concatenate_audioclips([musica, musica])
+    return musica.subclip(0, duracion)
+
+
+def medir(clip):
+    tiempos = []
+    for _ in clip.iter_chunks(chunksize=2000, fps=FPS_AUDIO, quantize=True, nbytes=2):
+        tiempos.append(time.perf_counter())
+    por_bloque = np.diff(tiempos)
+    decimo = max(1, len(por_bloque) // 10)
+    return tiempos[-1] - tiempos[0], por_bloque[:decimo].mean(), por_bloque[-decimo:].mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--music-seconds", type=float, default=20.0)
+    parser.add_argument("--minutes", type=float, default=10.0)
+    parser.add_argument("--crossfade", type=float, default=1.0)
+    args = parser.parse_args()
+    duracion = args.minutes * 60
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "musica.mp3")
+        crear_musica(ruta, args.music_seconds)
+
+        print(f"Música de {args.music_seconds:g} s repetida hasta {args.minutes:g} min")
+        print(f"{'Variante':<26} {'total (s)':>10} {'ms/bloque inicio':>17} {'ms/bloque final':>16}")
+        variantes = (
+            ("concatenate_audioclips", lambda m: bucle_concatenado(m, duracion)),
+            ("AudioEnBucle", lambda m: AudioEnBucle(m, duracion)),
+            (f"AudioEnBucle + {args.crossfade:g} s", lambda m: AudioEnBucle(m, duracion, crossfade=args.crossfade)),
+        )
+        for nombre, construir in variantes:
+            musica = AudioFileClip(ruta, fps=FPS_AUDIO)
+            total, inicio, final = medir(construir(musica))
+            musica.close()
+            print(f"{nombre:<26} {total:10.2f} {1000 * inicio:17.2f} {1000 * final:16.2f}")
+
+
+if __name__ == "__main__":
+    main()
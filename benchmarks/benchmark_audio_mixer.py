@@ -0,0 +1,71 @@
+"""
+Compara la mezcla de música y voz en off con CompositeAudioClip (lo que se
+hacía antes, sin ducking) y con AudioMixer (utils.audio_mixer), con y sin
+ducking. Se mide el tiempo de generar toda la mezcla por bloques, como al
+escribir el video; con ducking se incluye el cálculo de la envolvente.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_audio_mixer --minutes 5
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+from moviepy.config import FFMPEG_BINARY
+from moviepy.editor import AudioFileClip, CompositeAudioClip
+
+from utils.audio_loop import AudioEnBucle
+from utils.audio_mixer import AudioMixer, FPS_MEZCLA, MUESTRAS_BLOQUE
+
+
+def crear_audio(ruta, filtro, segundos):
+    subprocess.run(
+        [FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi", "-i", filtro, "-t", str(segundos),
+         "-ac", "2", "-ar", str(FPS_MEZCLA), ruta],
+        check=True
+    )
+
+
+def cronometrar(bloques):
+    inicio = time.perf_counter()
+    for _ in bloques:
+        pass
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=5.0)
+    args = parser.parse_args()
+    duracion = args.minutes * 60
+
+    with tempfile.TemporaryDirectory() as directorio:
+        musica = os.path.join(directorio, "musica.mp3")
+        voz = os.path.join(directorio, "voz.mp3")
+        crear_audio(musica, "anoisesrc=c=pink:a=0.2", 30)
+        # Voz sintética: frases de 3 s separadas por pausas de 1 s
+        crear_audio(voz, "sine=frequency=300,volume='if(lt(mod(t,4),3),1,0)':eval=frame", duracion)
+
+        def fuentes():
+            return AudioEnBucle(AudioFileClip(musica, fps=FPS_MEZCLA), duracion), AudioFileClip(voz, fps=FPS_MEZCLA)
+
+        print(f"Mezcla de {args.minutes:g} min, bloques de {MUESTRAS_BLOQUE} muestras")
+        print(f"{'Variante':<28} {'s':>7} {'x tiempo real':>14}")
+
+        musica_clip, voz_clip = fuentes()
+        compuesta = CompositeAudioClip([musica_clip.volumex(0.3), voz_clip])
+        segundos = cronometrar(compuesta.iter_chunks(chunksize=MUESTRAS_BLOQUE, fps=FPS_MEZCLA,
+                                                     quantize=True, nbytes=2))
+        print(f"{'CompositeAudioClip':<28} {segundos:7.2f} {duracion / segundos:14.1f}")
+
+        for nombre, ducking in (("AudioMixer", False), ("AudioMixer + ducking", True)):
+            musica_clip, voz_clip = fuentes()
+            mezclador = AudioMixer(duracion).anadir(musica_clip, volumen=0.3, atenuar=ducking).anadir_voz(voz_clip)
+            segundos = cronometrar(mezclador.bloques())
+            print(f"{nombre:<28} {segundos:7.2f} {duracion / segundos:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
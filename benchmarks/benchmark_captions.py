@@ -0,0 +1,85 @@
+"""
+Mide lo que añaden los subtítulos incrustados (utils.captions) al render de un
+video largo: una transcripción sintética de --minutes minutos a la resolución
+del perfil, con y sin resaltado de palabras. Se compara el coste por frame de
+los subtítulos con el de codificar un frame con el mismo perfil.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_captions --minutes 10
+    python -m benchmarks.benchmark_captions --profile borrador --stride 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from moviepy.editor import ImageClip
+
+from utils.captions import CaptionRenderer
+from utils.render_profiles import obtener_perfil
+
+PALABRAS = ("el video se genera a partir de las imágenes con la voz en off y la música "
+            "de fondo mientras los subtítulos siguen la transcripción palabra por palabra").split()
+
+
+def crear_transcripcion(minutos, rng):
+    """Segmentos de 2 a 5 segundos con entre 5 y 14 palabras, con huecos ocasionales."""
+    segmentos = []
+    t = 0.0
+    while t < minutos * 60:
+        duracion = rng.uniform(2, 5)
+        texto = " ".join(rng.choice(PALABRAS, rng.integers(5, 15)))
+        segmentos.append({"text": texto, "start": t, "end": t + duracion, "segment_id": len(segmentos)})
+        t += duracion + (rng.uniform(0.2, 1.0) if rng.random() < 0.3 else 0)
+    return segmentos
+
+
+def medir(clip, tiempos):
+    inicio = time.perf_counter()
+    for t in tiempos:
+        clip.get_frame(t)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=10.0)
+    parser.add_argument("--profile", default=None)
+    parser.add_argument("--stride", type=int, default=1, help="Medir solo uno de cada N frames")
+    args = parser.parse_args()
+
+    perfil = obtener_perfil(args.profile)
+    ancho, alto = perfil.tamano or (1920, 1080)
+    rng = np.random.default_rng(0)
+    transcripcion = crear_transcripcion(args.minutes, rng)
+    duracion = transcripcion[-1]["end"]
+    fondo = ImageClip(rng.integers(0, 256, (alto, ancho, 3), dtype=np.uint8), duration=duracion)
+    tiempos = np.arange(0, int(duracion * perfil.fps), args.stride) / perfil.fps
+    print(f"{len(transcripcion)} subtítulos, {duracion / 60:.1f} min, {ancho}x{alto} a {perfil.fps} fps, "
+          f"{len(tiempos)} frames medidos")
+
+    base = medir(fondo, tiempos)
+
+    # Coste de codificar con el perfil, medido sobre unos segundos del mismo fondo
+    with tempfile.TemporaryDirectory() as directorio:
+        muestra = fondo.subclip(0, 2)
+        inicio = time.perf_counter()
+        muestra.write_videofile(os.path.join(directorio, f"muestra.{perfil.extension}"), audio=False, logger=None,
+                                **perfil.parametros_write_videofile())
+        codificar = (time.perf_counter() - inicio) / int(2 * perfil.fps)
+
+    print(f"{'Variante':<22} {'ms/frame':>9} {'total (s)':>10} {'% del render':>13}")
+    print(f"{'codificar (perfil)':<22} {1000 * codificar:9.2f} {codificar * duracion * perfil.fps:10.1f} {'':>13}")
+    for nombre, estilo in (("subtítulos", None), ("subtítulos + resaltado", {"highlight_color": "#FFD400"})):
+        inicio = time.perf_counter()
+        clip = CaptionRenderer(transcripcion, (ancho, alto), estilo).aplicar(fondo)
+        preparar = time.perf_counter() - inicio
+        extra = max(0.0, medir(clip, tiempos) - base) / len(tiempos)
+        total = preparar + extra * duracion * perfil.fps
+        render = (codificar + base / len(tiempos)) * duracion * perfil.fps
+        print(f"{nombre:<22} {1000 * extra:9.2f} {total:10.1f} {100 * total / render:12.1f}%")
+
+
+if __name__ == "__main__":
+    main()
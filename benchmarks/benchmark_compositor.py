@@ -0,0 +1,75 @@
+"""
+Compara los frames por segundo del compositor vectorizado (utils/compositor.py)
+con CompositeVideoClip + set_opacity sobre las mismas entradas, y mide el coste
+de cada modo de fusión frente al frame base sin overlays.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_compositor --width 1920 --height 1080 --overlays 2 --frames 48
+"""
+import argparse
+import time
+
+import numpy as np
+from moviepy.editor import ImageClip, VideoClip, CompositeVideoClip
+
+from utils.compositor import CapaOverlay, OverlayCompositor
+from utils.blend_modes import MODOS_FUSION
+
+
+def crear_overlay(rng, ancho, alto, duracion, con_alpha):
+    """Overlay sintético: frames RGB precalculados y, opcionalmente, una máscara."""
+    frames = [rng.integers(0, 256, (alto, ancho, 3), dtype=np.uint8) for _ in range(4)]
+    clip = VideoClip(lambda t: frames[int(t * 24) % len(frames)], duration=duracion)
+    if con_alpha:
+        mascara = rng.random((alto, ancho))
+        clip = clip.set_mask(VideoClip(lambda t: mascara, ismask=True, duration=duracion))
+    return clip
+
+
+def medir(nombre, clip, frames):
+    inicio = time.perf_counter()
+    for i in range(frames):
+        clip.get_frame(i / 24)
+    fps = frames / (time.perf_counter() - inicio)
+    print(f"{nombre:<28} {fps:8.1f} fps")
+    return fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--overlays", type=int, default=2)
+    parser.add_argument("--frames", type=int, default=48)
+    parser.add_argument("--opacity", type=float, default=0.5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    duracion = args.frames / 24 + 1
+    base = ImageClip(rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8), duration=duracion)
+
+    for con_alpha in (False, True):
+        overlays = [crear_overlay(rng, args.width, args.height, duracion, con_alpha) for _ in range(args.overlays)]
+        etiqueta = "alpha" if con_alpha else "opacidad"
+
+        composite = CompositeVideoClip([base] + [overlay.set_opacity(args.opacity) for overlay in overlays])
+        compositor = OverlayCompositor(base, [
+            CapaOverlay(overlay, opacity=args.opacity, use_alpha=con_alpha) for overlay in overlays
+        ]).to_clip()
+
+        referencia = medir(f"CompositeVideoClip ({etiqueta})", composite, args.frames)
+        fps = medir(f"OverlayCompositor ({etiqueta})", compositor, args.frames)
+        print(f"{'':<28} x{fps / referencia:.2f} respecto a CompositeVideoClip")
+
+    # Coste de los modos de fusión apilando todos los overlays
+    overlays = [crear_overlay(rng, args.width, args.height, duracion, False) for _ in range(args.overlays)]
+    sin_overlays = medir("Sin overlays", OverlayCompositor(base, []).to_clip(), args.frames)
+    for modo in MODOS_FUSION:
+        fps = medir(f"Modo {modo}", OverlayCompositor(base, [
+            CapaOverlay(overlay, opacity=args.opacity, blend_mode=modo) for overlay in overlays
+        ]).to_clip(), args.frames)
+        print(f"{'':<28} {1000 / fps - 1000 / sin_overlays:.1f} ms/frame sobre el frame base")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compara el render completo (composición y codificación) de un mismo video de
+imágenes con efectos, disoluciones, texto y fundidos con el backend de moviepy
+y con el backend nativo de ffmpeg (utils.ffmpeg_backend), que lo expresa todo
+en un único filtergraph. Las imágenes son sintéticas y el video no lleva audio.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_ffmpeg_backend --images 10 --profile borrador
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from utils.render_profiles import obtener_perfil
+from utils.video_services import VideoServices
+
+EFECTOS = [("zoom_in", {}), ("pan_left", {}), ("mirror_x", {}), ("kenburns", {"zoom_end": 1.3}), ("zoom_out", {})]
+
+
+def crear_imagenes(directorio, cantidad, tamano):
+    """Degradados con una rejilla: con estructura, como una foto, y no puro ruido para el codificador."""
+    ancho, alto = tamano
+    x = np.linspace(0, 255, ancho, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, alto, dtype=np.float32)[:, None]
+    rutas = []
+    for i in range(cantidad):
+        canales = [(x + 40 * i) % 256, (y + 70 * i) % 256, ((x + y) / 2 + 25 * i) % 256]
+        frame = np.stack(np.broadcast_arrays(*canales), axis=-1).astype(np.uint8)
+        frame[::64] = 255
+        frame[:, ::64] = 255
+        ruta = os.path.join(directorio, f"imagen_{i:03d}.jpg")
+        Image.fromarray(frame).save(ruta, quality=90)
+        rutas.append(ruta)
+    return rutas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=4.0, help="Segundos por imagen")
+    parser.add_argument("--profile", default="borrador")
+    args = parser.parse_args()
+    perfil = obtener_perfil(args.profile)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        rutas = crear_imagenes(directorio, args.images, perfil.tamano or (1280, 720))
+        servicios = VideoServices()
+        servicios.output_dir = directorio
+        parametros = dict(
+            images=rutas, duration_per_image=args.duration, transition_duration=1.0, transition_type="dissolve",
+            text="Título del video", text_size=48, effects_sequence=EFECTOS,
+            fade_in_duration=1.0, fade_out_duration=1.0, profile=perfil,
+        )
+        duracion = args.images * (args.duration - 1.0) + 1.0
+
+        print(f"{args.images} imágenes, perfil {perfil.nombre} ({duracion:g} s de video)")
+        print(f"{'Backend':<10} {'s':>7} {'fps':>8} {'MB':>7}")
+        for backend in ("moviepy", "ffmpeg"):
+            inicio = time.perf_counter()
+            ruta = servicios.create_video_from_images(**parametros, backend=backend)
+            segundos = time.perf_counter() - inicio
+            megas = os.path.getsize(ruta) / 1024 ** 2
+            print(f"{backend:<10} {segundos:7.2f} {duracion * perfil.fps / segundos:8.1f} {megas:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
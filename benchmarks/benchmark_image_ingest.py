@@ -0,0 +1,82 @@
+"""
+Compara la carga de las imágenes de un proyecto: ImageClip(ruta) a resolución
+completa más el encaje en la resolución de salida (lo que se hacía antes)
+frente a la ingesta de utils.image_ingest, la primera vez (decodificación en
+modo borrador y guardado) y en renders siguientes (lectura mapeada de la caché).
+Se mide el tiempo y la memoria reservada por Python/numpy para tener todas las
+escenas construidas a la vez (tracemalloc; las páginas mapeadas no cuentan).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_image_ingest --images 20 --source 4000x3000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from moviepy.editor import ImageClip
+from PIL import Image
+
+from utils.image_ingest import ImageIngestCache
+from utils.warp import encajar_frame
+
+
+def crear_fotos(directorio, cantidad, ancho, alto):
+    """Fotos JPEG sintéticas con degradados y grano, del tamaño de las de un móvil."""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1, ancho, dtype=np.float32)[None, :, None]
+    y = np.linspace(0, 1, alto, dtype=np.float32)[:, None, None]
+    rutas = []
+    for i in range(cantidad):
+        color = rng.uniform(40, 215, 3).astype(np.float32)
+        pixeles = color * (0.6 + 0.4 * x) * (0.6 + 0.4 * y) + rng.normal(0, 6, (alto, ancho, 1)).astype(np.float32)
+        ruta = os.path.join(directorio, f"foto_{i:03d}.jpg")
+        Image.fromarray(np.clip(pixeles, 0, 255).astype(np.uint8)).save(ruta, quality=90)
+        rutas.append(ruta)
+    return rutas
+
+
+def medir(cargar, rutas):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    clips = [cargar(ruta) for ruta in rutas]
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del clips
+    return segundos, pico / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--source", default="4000x3000")
+    parser.add_argument("--resolution", default="1920x1080")
+    parser.add_argument("--margin", type=float, default=1.5, help="Margen para el zoom de los efectos")
+    args = parser.parse_args()
+    fuente = tuple(int(v) for v in args.source.split("x"))
+    resolucion = tuple(int(v) for v in args.resolution.split("x"))
+
+    with tempfile.TemporaryDirectory() as directorio:
+        rutas = crear_fotos(directorio, args.images, *fuente)
+        cache = ImageIngestCache(os.path.join(directorio, "cache"))
+
+        def antes(ruta):
+            clip = ImageClip(ruta, duration=3)
+            return ImageClip(encajar_frame(clip.img, resolucion), duration=3), clip
+
+        def ingesta(ruta):
+            return ImageClip(cache.obtener(ruta, resolucion, args.margin), duration=3)
+
+        print(f"{args.images} fotos de {args.source} a {args.resolution} (margen {args.margin:g})")
+        print(f"{'Variante':<30} {'s':>7} {'MB en memoria':>14}")
+        for nombre, cargar in (("ImageClip + encaje", antes), ("ingesta (primera vez)", ingesta),
+                               ("ingesta (caché)", ingesta)):
+            segundos, megas = medir(cargar, rutas)
+            print(f"{nombre:<30} {segundos:7.2f} {megas:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
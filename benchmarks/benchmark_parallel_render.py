@@ -0,0 +1,81 @@
+"""
+Compara el tiempo de create_video_from_images en serie (write_videofile) con los
+renders en paralelo de utils/parallel_render.py (por segmentos y por frames) y
+comprueba que todos los videos tienen el mismo número de frames.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_parallel_render --images 12 --duration 3 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+from moviepy.editor import VideoFileClip
+
+from utils.video_services import VideoServices
+
+
+def crear_imagenes(directorio, cantidad, ancho, alto):
+    """Imágenes sintéticas con degradados distintos para que el zoom tenga detalle."""
+    rng = np.random.default_rng(0)
+    rutas = []
+    x = np.linspace(0, 1, ancho)[None, :, None]
+    y = np.linspace(0, 1, alto)[:, None, None]
+    for i in range(cantidad):
+        color = rng.random(3)[None, None, :]
+        imagen = (255 * (0.5 * x + 0.5 * y) * color + rng.integers(0, 32, (alto, ancho, 3))).clip(0, 255)
+        ruta = os.path.join(directorio, f"imagen_{i:03d}.png")
+        Image.fromarray(imagen.astype(np.uint8)).save(ruta)
+        rutas.append(ruta)
+    return rutas
+
+
+def contar_frames(ruta):
+    clip = VideoFileClip(ruta, audio=False)
+    try:
+        return clip.reader.nframes
+    finally:
+        clip.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--transition", type=float, default=1.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    servicio = VideoServices()
+    with tempfile.TemporaryDirectory() as directorio:
+        imagenes = crear_imagenes(directorio, args.images, args.width, args.height)
+        parametros = dict(
+            images=imagenes,
+            duration_per_image=args.duration,
+            transition_duration=args.transition,
+            effects_sequence=[("zoom_in", {}), ("pan_left", {}), ("kenburns", {})],
+        )
+
+        inicio = time.perf_counter()
+        serie = servicio.create_video_from_images(**parametros)
+        tiempo_serie = time.perf_counter() - inicio
+
+        resultados = []
+        for modo in ("segments", "frames"):
+            inicio = time.perf_counter()
+            ruta = servicio.create_video_from_images(**parametros, workers=args.workers, parallel_mode=modo)
+            resultados.append((modo, time.perf_counter() - inicio, ruta))
+
+    print(f"{'En serie':<28} {tiempo_serie:8.1f} s  ({contar_frames(serie)} frames)")
+    for modo, tiempo, ruta in resultados:
+        print(f"{f'{modo} ({args.workers} procesos)':<28} {tiempo:8.1f} s  ({contar_frames(ruta)} frames)")
+        print(f"{'':<28} x{tiempo_serie / tiempo:.2f} respecto al render en serie")
+
+
+if __name__ == "__main__":
+    main()
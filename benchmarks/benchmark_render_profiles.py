@@ -0,0 +1,61 @@
+"""
+Mide, para cada perfil de render de config.yaml, el tiempo de codificación y el
+tamaño del archivo resultante sobre el mismo clip sintético (degradado en
+movimiento con grano, a la resolución y fps de cada perfil).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_render_profiles --seconds 4
+    python -m benchmarks.benchmark_render_profiles --profiles borrador youtube_1080p
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from moviepy.editor import VideoClip
+
+from utils.render_profiles import nombres_perfiles, obtener_perfil
+
+
+def crear_clip(ancho, alto, duracion):
+    """Degradado que se desplaza más un grano fijo: ni trivial ni puro ruido para el codificador."""
+    rng = np.random.default_rng(0)
+    grano = rng.integers(0, 24, (alto, ancho, 1), dtype=np.uint8)
+    x = np.linspace(0, 255, ancho, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, alto, dtype=np.float32)[:, None]
+
+    def make_frame(t):
+        desplazamiento = 40 * t
+        canales = [(x + desplazamiento) % 256, (y + 2 * desplazamiento) % 256, ((x + y) / 2) % 256]
+        frame = np.stack(np.broadcast_arrays(*canales), axis=-1).astype(np.uint8)
+        return frame + grano
+
+    return VideoClip(make_frame, duration=duracion)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--profiles", nargs="*", default=None)
+    args = parser.parse_args()
+
+    print(f"{'Perfil':<16} {'Tamaño':>10} {'fps':>4} {'codec':<11} {'preset':<10} {'crf':>4} {'s':>7} {'MB':>7} {'x tiempo real':>14}")
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre in args.profiles or nombres_perfiles():
+            perfil = obtener_perfil(nombre)
+            ancho, alto = perfil.tamano or (1280, 720)
+            clip = crear_clip(ancho, alto, args.seconds)
+            ruta = os.path.join(directorio, f"{nombre}.{perfil.extension}")
+
+            inicio = time.perf_counter()
+            clip.write_videofile(ruta, audio=False, logger=None, **perfil.parametros_write_videofile())
+            segundos = time.perf_counter() - inicio
+            megas = os.path.getsize(ruta) / 1024 ** 2
+
+            print(f"{nombre:<16} {f'{ancho}x{alto}':>10} {perfil.fps:>4} {perfil.codec:<11} {perfil.preset:<10} "
+                  f"{str(perfil.crf):>4} {segundos:7.1f} {megas:7.2f} {args.seconds / segundos:14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Mide el re-render incremental con la caché de escenas (utils/scene_cache.py):
+un primer render completo, un re-render sin cambios y otro tras modificar una
+sola imagen, frente a un render sin caché.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_scene_cache --images 60 --duration 3 --profile borrador
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from utils.scene_cache import SceneRenderCache
+from utils.video_services import VideoServices
+import utils.scene_cache as scene_cache
+
+from benchmarks.benchmark_parallel_render import crear_imagenes, contar_frames
+
+
+def medir(nombre, funcion):
+    inicio = time.perf_counter()
+    ruta = funcion()
+    segundos = time.perf_counter() - inicio
+    print(f"{nombre:<32} {segundos:8.1f} s  ({contar_frames(ruta)} frames)")
+    return segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=60)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--transition", type=float, default=1.0)
+    parser.add_argument("--profile", default="borrador")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    servicio = VideoServices()
+    with tempfile.TemporaryDirectory() as directorio:
+        # Caché propia para no mezclar con la del proyecto
+        scene_cache.scene_render_cache = SceneRenderCache(cache_dir=os.path.join(directorio, "escenas"))
+        imagenes = crear_imagenes(directorio, args.images, 1280, 720)
+        parametros = dict(
+            images=imagenes,
+            duration_per_image=args.duration,
+            transition_duration=args.transition,
+            effects_sequence=[("zoom_in", {}), ("pan_left", {}), ("kenburns", {})],
+            profile=args.profile,
+            workers=args.workers,
+        )
+
+        sin_cache = medir("Sin caché", lambda: servicio.create_video_from_images(**parametros))
+        medir("Con caché (vacía)", lambda: servicio.create_video_from_images(**parametros, scene_cache=True))
+        medir("Con caché (sin cambios)", lambda: servicio.create_video_from_images(**parametros, scene_cache=True))
+
+        # Cambiar una imagen de en medio
+        medio = imagenes[len(imagenes) // 2]
+        Image.fromarray(255 - np.asarray(Image.open(medio))).save(medio)
+        una = medir("Con caché (una imagen cambiada)", lambda: servicio.create_video_from_images(**parametros, scene_cache=True))
+        print(f"{'':<32} x{sin_cache / una:.1f} respecto al render sin caché")
+
+
+if __name__ == "__main__":
+    main()
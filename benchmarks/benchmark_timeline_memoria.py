@@ -0,0 +1,69 @@
+"""
+Compara la memoria de una línea de tiempo larga construyendo todas las escenas
+de antemano (lo que se hacía antes) frente a escenas diferidas
+(utils.timeline.EscenaDiferida), que se construyen al llegar el cabezal y se
+sueltan tras su última disolución. Cada escena reserva un frame RGB de la
+resolución pedida, como una imagen decodificada; se recorre el video entero a
+pocos fps y se mide el pico de memoria con tracemalloc.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_timeline_memoria --scenes 300 --resolution 1280x720
+"""
+import argparse
+import time
+import tracemalloc
+from functools import partial
+
+import numpy as np
+from moviepy.editor import ImageClip
+
+from utils.timeline import EscenaDiferida, FlatTimeline
+
+
+def construir_escena(indice, tamano, duracion):
+    ancho, alto = tamano
+    return ImageClip(np.full((alto, ancho, 3), indice % 256, dtype=np.uint8), duration=duracion)
+
+
+def medir(crear_linea, fps):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    linea = crear_linea()
+    clip = linea.to_clip()
+    for t in np.arange(0, clip.duration, 1.0 / fps):
+        clip.get_frame(t)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, default=300)
+    parser.add_argument("--duration", type=float, default=3.0, help="Segundos por escena")
+    parser.add_argument("--transition", type=float, default=1.0)
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--fps", type=float, default=2.0, help="Frames por segundo al recorrer el video")
+    args = parser.parse_args()
+    tamano = tuple(int(v) for v in args.resolution.split("x"))
+
+    def anticipada():
+        clips = [construir_escena(i, tamano, args.duration) for i in range(args.scenes)]
+        return FlatTimeline.desde_disolucion(clips, args.transition)
+
+    def diferida():
+        escenas = [EscenaDiferida(args.duration, partial(construir_escena, i, tamano, args.duration))
+                   for i in range(args.scenes)]
+        return FlatTimeline.desde_disolucion(escenas, args.transition)
+
+    minutos = args.scenes * (args.duration - args.transition) / 60
+    print(f"{args.scenes} escenas a {args.resolution} (~{minutos:.0f} min), recorridas a {args.fps:g} fps")
+    print(f"{'Variante':<24} {'s':>7} {'MB pico':>10}")
+    for nombre, crear_linea in (("escenas anticipadas", anticipada), ("escenas diferidas", diferida)):
+        segundos, megas = medir(crear_linea, args.fps)
+        print(f"{nombre:<24} {segundos:7.2f} {megas:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Mide el coste de componer los frames de un video de imágenes fijas (sin efecto
+de movimiento ni overlay, con texto, disoluciones, fundidos y subtítulos sin
+resaltado) recorriendo toda la cadena en cada frame (lo que se hacía antes)
+frente a reutilizar el frame de cada tramo estático (utils.timeline.TramosEstaticos).
+Solo se mide la composición, no la codificación.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_tramos_estaticos --images 20 --resolution 1920x1080
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from utils.overlay_pool import overlay_pool
+from utils.timeline import TramosEstaticos
+from utils.video_services import VideoServices
+import utils.image_ingest as image_ingest
+
+
+def crear_imagenes(directorio, cantidad, tamano):
+    rng = np.random.default_rng(0)
+    ancho, alto = tamano
+    rutas = []
+    for i in range(cantidad):
+        ruta = os.path.join(directorio, f"imagen_{i:03d}.jpg")
+        Image.fromarray(rng.integers(0, 256, (alto, ancho, 3), dtype=np.uint8)).save(ruta, quality=85)
+        rutas.append(ruta)
+    return rutas
+
+
+def medir(parametros, fijar):
+    """Segundos en obtener todos los frames del video, con o sin tramos estáticos."""
+    original = TramosEstaticos.fijar
+    if not fijar:
+        TramosEstaticos.fijar = lambda self, clip: clip
+    try:
+        with overlay_pool.sesion() as lectores:
+            clip = VideoServices()._construir_video(lectores, **parametros)
+            inicio = time.perf_counter()
+            for n in range(int(clip.duration * parametros["fps"])):
+                clip.get_frame(n / parametros["fps"])
+            return time.perf_counter() - inicio, clip.duration
+    finally:
+        TramosEstaticos.fijar = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=4.0, help="Segundos por imagen")
+    parser.add_argument("--resolution", default="1920x1080")
+    parser.add_argument("--fps", type=float, default=24)
+    args = parser.parse_args()
+    resolucion = tuple(int(v) for v in args.resolution.split("x"))
+
+    with tempfile.TemporaryDirectory() as directorio:
+        image_ingest.image_ingest_cache = image_ingest.ImageIngestCache(os.path.join(directorio, "cache"))
+        rutas = crear_imagenes(directorio, args.images, resolucion)
+        duracion = args.images * (args.duration - 1.0)
+        subtitulos = [{"text": f"subtítulo número {i}", "start": t, "end": t + 2.5}
+                      for i, t in enumerate(np.arange(0.5, duracion - 3, 3.0))]
+        parametros = dict(
+            images=rutas, duration_per_image=args.duration, transition_duration=1.0, transition_type="dissolve",
+            text="Título del video", text_position="bottom", text_color="white", text_size=48,
+            effects_sequence=[(None, {}), ("mirror_x", {})], overlay_sequence=None,
+            fade_in_duration=1.0, fade_out_duration=1.0, captions=subtitulos, caption_style=None,
+            fps=args.fps, resolution=resolucion,
+        )
+
+        # Primera pasada para dejar las imágenes en la caché de ingesta
+        medir(parametros, fijar=True)
+        print(f"{args.images} imágenes a {args.resolution}, {args.fps:g} fps")
+        print(f"{'Variante':<26} {'s':>7} {'fps':>8}")
+        for nombre, fijar in (("cadena en cada frame", False), ("tramos estáticos", True)):
+            segundos, duracion = medir(parametros, fijar)
+            print(f"{nombre:<26} {segundos:7.2f} {duracion * args.fps / segundos:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compara los frames por segundo del motor de warp (utils/warp.py) con el
+camino anterior de recorte entero + resize LANCZOS con PIL.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.benchmark_warp --width 1920 --height 1080 --frames 120
+"""
+import argparse
+import time
+
+import numpy as np
+from PIL import Image
+
+from utils.warp import INTERPOLACIONES, warp_frame, matriz_kenburns
+
+
+def kenburns_pil(frame, zoom, pan_x, pan_y):
+    """Implementación previa de Ken Burns (recorte entero + PIL LANCZOS)."""
+    h, w = frame.shape[:2]
+    new_h = int(h / zoom)
+    new_w = int(w / zoom)
+    start_y = h // 2 - new_h // 2 + int(pan_y * h)
+    start_x = w // 2 - new_w // 2 + int(pan_x * w)
+    start_y = max(0, min(start_y, h - new_h))
+    start_x = max(0, min(start_x, w - new_w))
+    cropped = frame[start_y:start_y+new_h, start_x:start_x+new_w]
+    return np.array(Image.fromarray(cropped).resize((w, h), Image.Resampling.LANCZOS))
+
+
+def medir(nombre, render, frames):
+    inicio = time.perf_counter()
+    for i in range(frames):
+        progress = i / frames
+        render(1.0 + 0.5 * progress, 0.2 * progress, 0.2 * progress)
+    fps = frames / (time.perf_counter() - inicio)
+    print(f"{nombre:<20} {fps:8.1f} fps")
+    return fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=120)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    h, w = frame.shape[:2]
+
+    base = medir("pil-lanczos", lambda z, x, y: kenburns_pil(frame, z, x, y), args.frames)
+    for calidad in INTERPOLACIONES:
+        fps = medir(
+            f"warp-{calidad}",
+            lambda z, x, y, c=calidad: warp_frame(frame, matriz_kenburns(w, h, z, x, y), calidad=c),
+            args.frames
+        )
+        print(f"{'':<20} x{fps / base:.2f} respecto a PIL")
+
+
+if __name__ == "__main__":
+    main()
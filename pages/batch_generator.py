@@ -3,10 +3,13 @@ import os
 from utils.video_services import VideoServices
 from pages.efectos_ui import show_effects_ui
 from moviepy.editor import AudioFileClip, concatenate_audioclips
-from moviepy.audio.fx import all as afx
 from utils.transitions import TransitionEffect
 import math
 from pages.overlays_ui import show_overlays_ui
+from utils.render_profiles import nombres_perfiles, obtener_perfil
+from utils.audio_analysis import normalizar_audio
+from utils.captions import cargar_transcripcion
+import json
 
 def show_batch_generator():
     st.title("🎥 Generador de Videos")
@@ -88,8 +91,8 @@ def show_batch_generator():
     # Asegurar que la duración de cada overlay sea igual a la duración de la imagen
     if overlay_sequence:
         overlay_sequence = [
-            (name, opacity, start, duration_per_image)
-            for name, opacity, start, _ in overlay_sequence
+            (name, opacity, start, duration_per_image, *resto)
+            for name, opacity, start, _, *resto in overlay_sequence
         ]
     
     # Sección 5: Audio
@@ -133,6 +136,14 @@ def show_batch_generator():
                 )
                 normalize_music = st.checkbox("Normalizar volumen de música", value=True)
                 music_loop = st.checkbox("Repetir música", value=True)
+                music_crossfade = st.slider(
+                    "Fundido en cada repetición (segundos)",
+                    min_value=0.0,
+                    max_value=5.0,
+                    value=1.0,
+                    step=0.5,
+                    disabled=not music_loop
+                )
         else:
             background_music = None
     
@@ -153,6 +164,8 @@ def show_batch_generator():
                 step=0.1
             )
             normalize_voice = st.checkbox("Normalizar volumen de voz", value=True)
+            music_ducking = st.checkbox("Bajar la música mientras habla la voz", value=True,
+                                        disabled=not background_music)
             
             # Calcular duración del video
             video_duration = len(uploaded_images) * duration_per_image
@@ -209,6 +222,24 @@ def show_batch_generator():
                     - Aumentar la duración de las transiciones
                     """)
     
+    # Subtítulos incrustados desde la transcripción de la voz
+    st.subheader("💬 Subtítulos")
+    transcript_file = st.file_uploader(
+        "Transcripción (JSON con 'text', 'start' y 'end' por segmento, p. ej. la salida de Whisper)",
+        type=["json"],
+        key="transcript"
+    )
+    captions = None
+    caption_style = None
+    if transcript_file:
+        try:
+            captions = cargar_transcripcion(json.loads(transcript_file.getvalue()))
+            st.info(f"{len(captions)} subtítulos cargados")
+        except ValueError as e:
+            st.error(f"No se pudo leer la transcripción: {e}")
+        if captions and st.checkbox("Resaltar la palabra que suena", value=False):
+            caption_style = {"highlight_color": "#FFD400"}
+    
     # Sección 6: Texto
     st.header("5. Texto (Opcional)")
     text = st.text_area("Texto a mostrar en el video")
@@ -229,6 +260,47 @@ def show_batch_generator():
                 value=30
             )
     
+    # Perfil de render (resolución, fps y codificador) de config.yaml
+    render_profile = st.selectbox(
+        "Perfil de render",
+        options=nombres_perfiles(),
+        format_func=lambda x: f"{obtener_perfil(x).descripcion} ({x})"
+    )
+    
+    # Reutilizar las escenas que no cambian entre renders
+    scene_cache = st.checkbox(
+        "Reutilizar escenas ya renderizadas",
+        value=False,
+        help="Solo se vuelven a renderizar las escenas que cambian (imagen, efecto, overlay, texto o perfil)"
+    )
+    
+    # Backend nativo de ffmpeg (si el video no se puede expresar, se usa moviepy)
+    native_render = st.checkbox(
+        "Render nativo con ffmpeg",
+        value=False,
+        help="Compone el video entero en un solo proceso de ffmpeg; con subtítulos o keys de overlay se usa moviepy"
+    )
+    
+    # Render en paralelo por segmentos
+    max_workers = os.cpu_count() or 1
+    workers = 1
+    if max_workers > 1:
+        workers = st.slider(
+            "Procesos de render",
+            min_value=1,
+            max_value=max_workers,
+            value=1,
+            help="Con más de uno, el render se reparte entre varios procesos"
+        )
+    parallel_mode = 'segments'
+    if workers > 1 and not scene_cache:
+        parallel_mode = st.radio(
+            "Reparto del render",
+            options=['segments', 'frames'],
+            format_func=lambda x: "Por segmentos (unidos sin recodificar)" if x == 'segments' else "Por frames (un solo codificador)",
+            horizontal=True
+        )
+    
     # Botón para generar el video
     if st.button("Generar Video"):
         with st.spinner("Generando video..."):
@@ -246,7 +318,8 @@ def show_batch_generator():
                 music_path = os.path.join("background_music", background_music)
                 background_music_clip = AudioFileClip(music_path)
                 if normalize_music:
-                    background_music_clip = afx.audio_normalize(background_music_clip)
+                    # Ganancia precalculada (el análisis se guarda por hash del archivo)
+                    background_music_clip = normalizar_audio(background_music_clip, music_path)
                 background_music_clip = background_music_clip.volumex(music_volume)
             
             # Procesar voz en off si se proporciona
@@ -257,7 +330,7 @@ def show_batch_generator():
                     f.write(voice_over.getbuffer())
                 voice_over_clip = AudioFileClip(temp_voice)
                 if normalize_voice:
-                    voice_over_clip = afx.audio_normalize(voice_over_clip)
+                    voice_over_clip = normalizar_audio(voice_over_clip, temp_voice)
                 voice_over_clip = voice_over_clip.volumex(voice_volume)
             
             # Crear el video
@@ -277,7 +350,16 @@ def show_batch_generator():
                 fade_in_duration=fade_in_duration,
                 fade_out_duration=fade_out_duration,
                 music_volume=music_volume if background_music else 0.5,
-                music_loop=music_loop if background_music else True
+                music_loop=music_loop if background_music else True,
+                music_crossfade=music_crossfade if background_music else 0.0,
+                music_ducking=bool(background_music and voice_over and music_ducking),
+                workers=workers,
+                parallel_mode=parallel_mode,
+                profile=render_profile,
+                scene_cache=scene_cache,
+                captions=captions,
+                caption_style=caption_style,
+                backend='ffmpeg' if native_render else 'moviepy'
             )
             
             # Limpiar archivos temporales
@@ -297,5 +379,5 @@ def show_batch_generator():
                     "Descargar Video",
                     f,
                     file_name=os.path.basename(output_path),
-                    mime="video/mp4"
+                    mime=obtener_perfil(render_profile).mime
                 ) 
\ No newline at end of file
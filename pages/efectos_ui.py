@@ -1,4 +1,5 @@
 import streamlit as st
+from utils.warp import INTERPOLACIONES, CALIDAD_POR_DEFECTO
 
 def show_effects_ui():
     """
@@ -145,6 +146,15 @@ def show_effects_ui():
                 key=f"distancia_{efecto}"
             )
         
+        # Calidad de interpolación para los efectos que remuestrean la imagen
+        if efecto in ["kenburns", "zoom_in", "zoom_out"]:
+            params["calidad"] = st.selectbox(
+                "Calidad de interpolación",
+                options=list(INTERPOLACIONES.keys()),
+                index=list(INTERPOLACIONES.keys()).index(CALIDAD_POR_DEFECTO),
+                key=f"calidad_{efecto}"
+            )
+        
         efectos_configurados.append((efecto, params))
     
     return efectos_configurados 
\ No newline at end of file
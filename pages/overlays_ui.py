@@ -1,13 +1,48 @@
 import streamlit as st
 from utils.overlays import OverlayManager
+from utils.blend_modes import MODOS_FUSION, NOMBRES_MODOS
+from utils.keying import KEY_POR_DEFECTO
 from typing import List, Tuple, Optional
 
-def show_overlays_ui() -> List[Tuple[str, float, float, Optional[float]]]:
+def _hex_a_rgb(color: str) -> Tuple[int, int, int]:
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+def _mostrar_key(name: str) -> Optional[dict]:
+    """Controles de chroma/luma key de un overlay. Devuelve el dict del key o None."""
+    modo = st.selectbox(
+        f"Recorte (key) para {name}",
+        options=["none", "chroma", "luma"],
+        format_func=lambda x: {"none": "Ninguno", "chroma": "Chroma key (color)", "luma": "Luma key (brillo)"}[x],
+        key=f"key_mode_{name}",
+        help="Para overlays sin canal alpha grabados sobre fondo verde o negro"
+    )
+    if modo == "none":
+        return None
+    
+    key = dict(KEY_POR_DEFECTO[modo])
+    if modo == "chroma":
+        color = st.color_picker("Color a eliminar", value="#00FF00", key=f"key_color_{name}")
+        key["color"] = _hex_a_rgb(color)
+        key["tolerance"] = st.slider("Tolerancia", 0.0, 1.0, key["tolerance"], 0.01, key=f"key_tolerance_{name}")
+    else:
+        key["threshold"] = st.slider("Umbral de brillo", 0.0, 1.0, key["threshold"], 0.01, key=f"key_threshold_{name}")
+        key["invert"] = st.checkbox("Eliminar las zonas claras", value=False, key=f"key_invert_{name}")
+    key["softness"] = st.slider("Suavidad del borde", 0.0, 1.0, key["softness"], 0.01, key=f"key_softness_{name}")
+    key["persist"] = st.checkbox(
+        "Guardar las máscaras en disco",
+        value=False,
+        key=f"key_persist_{name}",
+        help="Reutiliza las máscaras calculadas en renders posteriores"
+    )
+    return key
+
+def show_overlays_ui() -> List[Tuple[str, float, float, Optional[float], str, Optional[dict]]]:
     """
     Muestra la interfaz de usuario para seleccionar overlays.
     
     Returns:
-        Lista de tuplas (nombre_overlay, opacidad, tiempo_inicio, duración)
+        Lista de tuplas (nombre_overlay, opacidad, tiempo_inicio, duración, modo_fusion, key)
     """
     st.header("🎨 Overlays de Video")
     
@@ -27,6 +62,23 @@ def show_overlays_ui() -> List[Tuple[str, float, float, Optional[float]]]:
         help="Puedes seleccionar múltiples overlays que se aplicarán en secuencia"
     )
     
+    # Metadatos de los overlays seleccionados (leídos del índice, sin abrir los videos)
+    if selected_overlays:
+        columnas = st.columns(min(len(selected_overlays), 4))
+        for i, name in enumerate(selected_overlays):
+            info = overlay_manager.get_overlay_info(name)
+            if not info:
+                continue
+            with columnas[i % len(columnas)]:
+                if info.get("thumbnail"):
+                    st.image(info["thumbnail"], use_column_width=True)
+                duracion = f"{info['duration']:.1f}s" if info.get("duration") else "?"
+                fps = f"{info['fps']:.0f} fps" if info.get("fps") else "?"
+                st.caption(
+                    f"{name}\n{info.get('width')}x{info.get('height')} · {fps} · {duracion}"
+                    f" · {info.get('codec') or '?'}{' · alpha' if info.get('has_alpha') else ''}"
+                )
+    
     # Opacidad global para todos los overlays
     opacity = st.slider(
         "Opacidad de los overlays",
@@ -36,7 +88,22 @@ def show_overlays_ui() -> List[Tuple[str, float, float, Optional[float]]]:
         step=0.1
     )
     
+    # Modo de fusión por overlay (screen/add para light leaks y grano)
+    modos = {}
+    for name in selected_overlays:
+        modos[name] = st.selectbox(
+            f"Modo de fusión para {name}",
+            options=MODOS_FUSION,
+            format_func=lambda x: NOMBRES_MODOS[x],
+            key=f"blend_mode_{name}"
+        )
+    
+    # Chroma/luma key por overlay
+    keys = {}
+    for name in selected_overlays:
+        keys[name] = _mostrar_key(name)
+    
     # Crear secuencia con la misma opacidad para todos los overlays
-    overlay_sequence = [(name, opacity, 0, None) for name in selected_overlays]
+    overlay_sequence = [(name, opacity, 0, None, modos[name], keys[name]) for name in selected_overlays]
     
     return overlay_sequence 
\ No newline at end of file
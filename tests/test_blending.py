@@ -0,0 +1,39 @@
+"""
+Error de la mezcla en punto fijo (utils.blending) frente a la mezcla exacta en
+float, con dos frames y con tres (disoluciones solapadas).
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests
+"""
+import itertools
+
+import numpy as np
+
+from utils.blending import mezclar_uint8, mezclar_varios_uint8, pesos_fijos
+
+# Todas las combinaciones de valores extremos y centrales de tres frames
+VALORES = [0, 1, 127, 128, 254, 255]
+FRAMES = np.array(list(itertools.product(VALORES, repeat=3)), dtype=np.uint8).T
+
+
+def test_pesos_fijos_suman_escala():
+    rng = np.random.default_rng(0)
+    for _ in range(1000):
+        pesos = rng.dirichlet(np.ones(rng.integers(2, 6)))
+        enteros = pesos_fijos(pesos)
+        assert sum(enteros) == 256
+        assert all(abs(entero - peso * 256) < 1 for entero, peso in zip(enteros, pesos))
+
+
+def test_error_dos_frames():
+    for progress in np.linspace(0, 1, 257 * 3):
+        exacto = (1 - progress) * FRAMES[0] + progress * FRAMES[1]
+        assert np.abs(mezclar_uint8(FRAMES[0], FRAMES[1], progress) - exacto).max() <= 1
+
+
+def test_error_tres_frames():
+    rng = np.random.default_rng(1)
+    for p1, p2 in rng.random((2000, 2)):
+        pesos = [(1 - p1) * (1 - p2), p1 * (1 - p2), p2]
+        exacto = sum(peso * frame for peso, frame in zip(pesos, FRAMES))
+        assert np.abs(mezclar_varios_uint8(list(FRAMES), pesos) - exacto).max() <= 1.17
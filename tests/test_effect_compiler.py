@@ -0,0 +1,84 @@
+"""
+La cadena compilada (utils.effect_compiler) debe dar los mismos frames que
+aplicar cada efecto de EfectosVideo por separado.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests
+"""
+import numpy as np
+import pytest
+from moviepy.editor import ImageClip
+
+from utils.effect_compiler import EFECTOS_BRILLO, EFECTOS_GEOMETRICOS, EffectChainCompiler
+from utils.efectos import EfectosVideo
+
+DURACION = 2.0
+# Con 64 px de ancho y distance=0.5, los paneos caen en píxeles enteros en estos
+# instantes (np.roll de EfectosVideo no tiene desplazamientos subpíxel)
+INSTANTES = (0.0, 0.5, 1.0, 1.5)
+
+PARAMETROS = {
+    "zoom_in": {"zoom_factor": 1.5},
+    "zoom_out": {"zoom_factor": 1.5},
+    "kenburns": {"duration": DURACION, "zoom_end": 1.3},
+    "pan_left": {"distance": 0.5},
+    "pan_right": {"distance": 0.5},
+    "mirror_x": {},
+    "mirror_y": {},
+    "fade_in": {"duration": 1.0},
+    "fade_out": {"duration": 1.0},
+}
+
+
+def crear_imagen(ancho=64, alto=36):
+    """Degradado con rejilla: distinto en cada píxel y sin simetrías."""
+    x = np.linspace(0, 255, ancho)[None, :]
+    y = np.linspace(0, 255, alto)[:, None]
+    canales = [x, y, (x * 0.7 + y * 0.3)]
+    imagen = np.stack(np.broadcast_arrays(*canales), axis=-1).astype(np.uint8)
+    imagen[::7] = 255
+    imagen[:, ::5] = 0
+    return imagen
+
+
+def aplicar_por_separado(imagen, efectos):
+    clip = ImageClip(imagen, duration=DURACION)
+    for nombre, params in efectos:
+        clip = EfectosVideo.apply_effect(clip, nombre, **params)
+    return clip
+
+
+def comparar(imagen, efectos):
+    directo = aplicar_por_separado(imagen, efectos)
+    compilado = EffectChainCompiler.compilar(ImageClip(imagen, duration=DURACION), efectos)
+    for t in INSTANTES:
+        esperado = directo.get_frame(t)
+        obtenido = compilado.get_frame(t)
+        assert obtenido.shape == esperado.shape
+        diferencia = np.abs(obtenido.astype(int) - esperado.astype(int)).max()
+        assert diferencia <= 1, f"{efectos} en t={t}: diferencia {diferencia}"
+
+
+def test_todos_los_efectos_compilables_estan_cubiertos():
+    assert set(PARAMETROS) == set(EFECTOS_GEOMETRICOS) | set(EFECTOS_BRILLO)
+
+
+@pytest.mark.parametrize("nombre", sorted(PARAMETROS))
+def test_efecto_compilado_igual_que_efectos_video(nombre):
+    comparar(crear_imagen(), [(nombre, PARAMETROS[nombre])])
+
+
+@pytest.mark.parametrize("efectos", [
+    [("mirror_x", {}), ("pan_right", {"distance": 0.5})],
+    [("mirror_y", {}), ("pan_left", {"distance": 0.5}), ("fade_in", {"duration": 1.0})],
+    [("zoom_in", {"zoom_factor": 1.5}), ("mirror_x", {})],
+])
+def test_cadena_compilada_igual_que_efectos_video(efectos):
+    comparar(crear_imagen(), efectos)
+
+
+@pytest.mark.parametrize("nombre", ["zoom_in", "zoom_out", "kenburns"])
+def test_tamano_salida(nombre):
+    # Imagen con margen para el zoom, remuestreada directamente a 64x36
+    params = dict(PARAMETROS[nombre], tamano_salida=(64, 36))
+    comparar(crear_imagen(96, 54), [(nombre, params), ("mirror_x", {})])
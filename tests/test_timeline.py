@@ -0,0 +1,61 @@
+"""
+La línea de tiempo plana (utils.timeline.FlatTimeline) debe colocar y mezclar
+los clips como la disolución encadenada original (TransitionEffect._dissolve_transition
+aplicado clip a clip), también con clips más cortos que la transición.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests
+"""
+import numpy as np
+import pytest
+from moviepy.editor import ColorClip
+
+from utils.timeline import FlatTimeline
+from utils.transitions import TransitionEffect
+
+COLORES = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0)]
+
+
+def crear_clips(duraciones):
+    return [ColorClip((8, 4), color=color, duration=duracion) for duracion, color in zip(duraciones, COLORES)]
+
+
+def disolucion_encadenada(clips, transition_duration):
+    final_clip = clips[0]
+    for clip in clips[1:]:
+        final_clip = TransitionEffect._dissolve_transition(final_clip, clip, transition_duration)
+    return final_clip
+
+
+def test_clip_corto_duracion_total():
+    # El clip de 0.8 s recorta su solape a 0.4 s; el siguiente se solapa 1 s
+    # con lo ya montado (5.4 s), como en la disolución encadenada
+    inicios = FlatTimeline.inicios_disolucion([5.0, 0.8, 5.0], 1.0, avisar=False)
+    assert inicios == pytest.approx([0.0, 4.6, 4.4])
+    plana = FlatTimeline.desde_disolucion(crear_clips([5.0, 0.8, 5.0]), 1.0)
+    assert plana.duracion == pytest.approx(9.4)
+
+
+@pytest.mark.parametrize("duraciones", [
+    [5.0, 0.8, 5.0],
+    [3.0, 0.5, 0.6, 3.0],
+    [0.4, 3.0, 3.0],
+    [2.0, 2.0, 2.0],
+])
+def test_igual_que_disolucion_encadenada(duraciones):
+    encadenada = disolucion_encadenada(crear_clips(duraciones), 1.0)
+    plana = FlatTimeline.desde_disolucion(crear_clips(duraciones), 1.0).to_clip()
+    assert plana.duration == pytest.approx(encadenada.duration)
+    for t in np.arange(0, encadenada.duration, 0.05):
+        esperado = encadenada.get_frame(t).astype(int)
+        obtenido = plana.get_frame(t).astype(int)
+        assert np.abs(obtenido - esperado).max() <= 1, f"t={t:.2f}"
+
+
+def test_tramos_estaticos_con_clip_corto():
+    # El tercer clip entra (4.4 s) antes que el clip corto (4.6 s): ninguno
+    # de los dos está solo en [4.4, 5.4)
+    plana = FlatTimeline.desde_disolucion(crear_clips([5.0, 0.8, 5.0]), 1.0)
+    tramos = plana.tramos_estaticos()
+    assert tramos.inicios == pytest.approx([0.0, 5.4])
+    assert tramos.finales == pytest.approx([4.4, 9.4])
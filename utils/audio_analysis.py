@@ -0,0 +1,181 @@
+"""
+Análisis de audio (pico, loudness integrada y duración) guardado por hash.
+
+afx.audio_normalize decodifica el archivo entero en cada render solo para
+encontrar el pico, y después se vuelve a decodificar al escribir el video. Aquí
+el archivo se analiza una sola vez, en streaming, y el resultado se guarda en
+disco bajo el hash de su contenido: la normalización queda en una ganancia
+constante que se aplica mientras se escribe el audio.
+
+La loudness sigue el esquema de EBU R128 / ITU-R BS.1770: ponderación K, bloques
+de 400 ms solapados al 75 % y puertas absoluta (-70 LUFS) y relativa (-10 LU).
+La ponderación K se aplica en frecuencia sobre cada tramo de 100 ms (la energía
+filtrada es la suma del espectro por la respuesta del filtro), sin filtrar
+muestra a muestra.
+"""
+from typing import Optional
+import json
+import os
+import subprocess
+import threading
+import uuid
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+from utils.overlay_cache import overlay_cache
+
+# Cambiar al modificar el análisis para invalidar los resultados guardados
+VERSION_ANALISIS = 1
+
+FPS_ANALISIS = 48000
+MUESTRAS_TRAMO = FPS_ANALISIS // 10  # 100 ms
+TRAMOS_BLOQUE = 4  # bloques de 400 ms que avanzan de 100 en 100 ms
+PUERTA_ABSOLUTA = -70.0
+PUERTA_RELATIVA = -10.0
+
+# Coeficientes del filtro K de BS.1770 a 48 kHz: estantería de agudos y paso alto
+FILTROS_K = (
+    ([1.53512485958697, -2.69169618940638, 1.19839281085285], [1.0, -1.69065929318241, 0.73248077421585]),
+    ([1.0, -2.0, 1.0], [1.0, -1.99004745483398, 0.99007225036621]),
+)
+
+
+def respuesta_k(muestras: int = MUESTRAS_TRAMO) -> np.ndarray:
+    """|H(f)|² del filtro K en las frecuencias de rfft de un tramo de muestras."""
+    z = np.exp(-1j * np.pi * np.arange(muestras // 2 + 1) / (muestras / 2))
+    respuesta = np.ones_like(z)
+    for b, a in FILTROS_K:
+        respuesta *= np.polyval(b[::-1], z) / np.polyval(a[::-1], z)
+    return np.abs(respuesta) ** 2
+
+
+def energia_tramos(muestras: np.ndarray, peso_k: np.ndarray) -> np.ndarray:
+    """Media cuadrática ponderada K de cada tramo completo (sumada sobre canales)."""
+    tramos = len(muestras) // MUESTRAS_TRAMO
+    if not tramos:
+        return np.zeros(0)
+    bloques = muestras[:tramos * MUESTRAS_TRAMO].reshape(tramos, MUESTRAS_TRAMO, -1)
+    espectro = np.abs(np.fft.rfft(bloques, axis=1)) ** 2
+    # Parseval para rfft: los bins intermedios cuentan dos veces
+    espectro[:, 1:(MUESTRAS_TRAMO + 1) // 2] *= 2
+    return (espectro * peso_k[None, :, None]).sum(axis=(1, 2)) / MUESTRAS_TRAMO ** 2
+
+
+def loudness_integrada(energias: np.ndarray) -> Optional[float]:
+    """Loudness integrada (LUFS) a partir de la energía de los tramos de 100 ms."""
+    if len(energias) < TRAMOS_BLOQUE:
+        energias = np.pad(energias, (0, TRAMOS_BLOQUE - len(energias)))
+    acumulada = np.concatenate([[0.0], np.cumsum(energias)])
+    bloques = (acumulada[TRAMOS_BLOQUE:] - acumulada[:-TRAMOS_BLOQUE]) / TRAMOS_BLOQUE
+    with np.errstate(divide="ignore"):
+        loudness = -0.691 + 10 * np.log10(bloques)
+    bloques = bloques[loudness > PUERTA_ABSOLUTA]
+    if not len(bloques):
+        return None  # silencio
+    umbral = -0.691 + 10 * np.log10(bloques.mean()) + PUERTA_RELATIVA
+    bloques = bloques[-0.691 + 10 * np.log10(bloques) > umbral]
+    return float(-0.691 + 10 * np.log10(bloques.mean()))
+
+
+def analizar_audio(path: str) -> dict:
+    """Decodifica el audio en streaming (float, 48 kHz) y mide pico, loudness y duración."""
+    comando = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-i", path, "-vn",
+               "-f", "f32le", "-acodec", "pcm_f32le", "-ar", str(FPS_ANALISIS), "-ac", "2", "-"]
+    proceso = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    peso_k = respuesta_k()
+    bytes_lectura = 100 * MUESTRAS_TRAMO * 2 * 4  # 10 s de audio por lectura
+    energias = []
+    pico = 0.0
+    total = 0
+    resto = np.zeros((0, 2), dtype=np.float32)
+    try:
+        while True:
+            datos = proceso.stdout.read(bytes_lectura)
+            if not datos:
+                break
+            muestras = np.frombuffer(datos[:len(datos) // 8 * 8], dtype=np.float32).reshape(-1, 2)
+            total += len(muestras)
+            if len(muestras):
+                pico = max(pico, float(np.abs(muestras).max()))
+            muestras = np.concatenate([resto, muestras])
+            completas = len(muestras) // MUESTRAS_TRAMO * MUESTRAS_TRAMO
+            energias.append(energia_tramos(muestras[:completas], peso_k))
+            resto = muestras[completas:]
+        if len(resto):
+            # El último tramo incompleto se completa con silencio
+            relleno = np.zeros((MUESTRAS_TRAMO - len(resto), 2), dtype=np.float32)
+            energias.append(energia_tramos(np.concatenate([resto, relleno]), peso_k))
+    finally:
+        proceso.stdout.close()
+        error = proceso.stderr.read().decode("utf8", errors="ignore").strip()
+        proceso.wait()
+    if proceso.returncode != 0:
+        raise IOError(f"Análisis de audio de {path} falló (código {proceso.returncode}): {error}")
+
+    energias = np.concatenate(energias) if energias else np.zeros(0)
+    return {
+        "pico": pico,
+        "loudness": loudness_integrada(energias) if total else None,
+        "duracion": total / FPS_ANALISIS,
+    }
+
+
+class AudioAnalysisCache:
+    """
+    Análisis de audio en memoria y en disco (un JSON por archivo), bajo el
+    hash de su contenido: un mismo archivo solo se analiza una vez.
+    """
+    def __init__(self, cache_dir: str = os.path.join("cache", "audio")):
+        self.cache_dir = cache_dir
+        self._analisis = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, path: str) -> dict:
+        """Pico (lineal), loudness integrada (LUFS, None si es silencio) y duración (s) del archivo."""
+        clave = f"{overlay_cache.hash_contenido(path)[:32]}_v{VERSION_ANALISIS}"
+        with self._lock:
+            if clave in self._analisis:
+                return self._analisis[clave]
+
+        ruta = os.path.join(self.cache_dir, f"{clave}.json")
+        analisis = None
+        if os.path.exists(ruta):
+            try:
+                with open(ruta, "r", encoding="utf8") as f:
+                    analisis = json.load(f)
+            except (OSError, ValueError):
+                analisis = None
+        if analisis is None:
+            print(f"[DEBUG] Analizando audio {path}")
+            analisis = analizar_audio(path)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporal = f"{ruta}.{uuid.uuid4().hex}.tmp"
+            with open(temporal, "w", encoding="utf8") as f:
+                json.dump(analisis, f)
+            os.replace(temporal, ruta)
+
+        with self._lock:
+            self._analisis[clave] = analisis
+        return analisis
+
+    def ganancia(self, path: str, loudness_objetivo: Optional[float] = -16.0, pico_maximo: float = 1.0) -> float:
+        """
+        Ganancia lineal que lleva el archivo a loudness_objetivo (LUFS) sin que el
+        pico pase de pico_maximo. Con loudness_objetivo=None solo se normaliza
+        el pico, como afx.audio_normalize.
+        """
+        analisis = self.obtener(path)
+        if analisis["pico"] <= 0:
+            return 1.0
+        ganancia = pico_maximo / analisis["pico"]
+        if loudness_objetivo is not None and analisis["loudness"] is not None:
+            ganancia = min(ganancia, 10 ** ((loudness_objetivo - analisis["loudness"]) / 20))
+        return ganancia
+
+
+def normalizar_audio(clip, path: str, loudness_objetivo: Optional[float] = -16.0, pico_maximo: float = 1.0):
+    """Clip con la ganancia de normalización del archivo path, aplicada al leer cada bloque."""
+    return clip.volumex(audio_analysis_cache.ganancia(path, loudness_objetivo, pico_maximo))
+
+
+# Análisis compartidos por todos los renders del proceso
+audio_analysis_cache = AudioAnalysisCache()
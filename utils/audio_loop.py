@@ -0,0 +1,81 @@
+"""
+Audio en bucle sin concatenar.
+
+Repetir la música con concatenate_audioclips([musica, musica]) hasta cubrir el
+video construye un árbol de clips cada vez más profundo que se recorre en cada
+bloque de audio. AudioEnBucle lee la fuente en t mod periodo: memoria y coste por
+bloque constantes sea cual sea la duración del video. Con crossfade, el final de
+cada vuelta se funde con el comienzo de la siguiente; el comienzo se guarda en
+memoria para que la fuente se siga leyendo hacia delante y solo salte atrás una
+vez por vuelta.
+"""
+import numpy as np
+from moviepy.editor import AudioClip
+
+
+class AudioEnBucle(AudioClip):
+    """
+    Repite un clip de audio hasta la duración pedida.
+
+    Args:
+        clip: Audio fuente (AudioFileClip o cualquier clip de audio con duración)
+        duration: Duración del resultado en segundos
+        crossfade: Segundos de fundido (de igual potencia) en la unión de cada vuelta
+    """
+    def __init__(self, clip, duration: float, crossfade: float = 0.0):
+        AudioClip.__init__(self, duration=duration, fps=clip.fps)
+        self.nchannels = clip.nchannels
+        self.fuente = clip
+        # El fundido no puede ocupar más de media vuelta
+        self.crossfade = max(0.0, min(crossfade, clip.duration / 2))
+        self.periodo = clip.duration - self.crossfade
+        self._muestras_fundido = int(round(self.crossfade * self.fps))
+        self._cabeza = None
+        self.make_frame = self._make_frame
+
+    def _leer_cabeza(self) -> np.ndarray:
+        """Primeras muestras de la fuente (la parte que se funde), leídas una sola vez."""
+        if self._cabeza is None:
+            tiempos = np.arange(self._muestras_fundido) / self.fps
+            self._cabeza = self._leer(tiempos)
+        return self._cabeza
+
+    def _leer(self, tiempos: np.ndarray) -> np.ndarray:
+        """Lee la fuente en tramos crecientes: el lector de ffmpeg solo avanza dentro de cada tramo."""
+        cortes = np.flatnonzero(np.diff(tiempos) < 0) + 1
+        if not len(cortes):
+            return np.asarray(self.fuente.get_frame(tiempos)).reshape(len(tiempos), -1)
+        salida = np.zeros((len(tiempos), self.nchannels))
+        for tramo in np.split(np.arange(len(tiempos)), cortes):
+            if len(tramo):
+                salida[tramo] = np.asarray(self.fuente.get_frame(tiempos[tramo])).reshape(len(tramo), -1)
+        return salida
+
+    def _make_frame(self, t):
+        escalar = np.isscalar(t)
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+        u = np.mod(t, self.periodo)
+
+        en_cabeza = u < self.crossfade
+        if not en_cabeza.any():
+            return self._formato(self._leer(u), escalar)
+
+        salida = np.empty((len(t), self.nchannels))
+        if (~en_cabeza).any():
+            salida[~en_cabeza] = self._leer(u[~en_cabeza])
+        indices = np.minimum(np.round(u[en_cabeza] * self.fps).astype(int), self._muestras_fundido - 1)
+        salida[en_cabeza] = self._leer_cabeza()[indices]
+
+        # A partir de la segunda vuelta, el comienzo se funde con el final de la anterior
+        cruce = en_cabeza & (t >= self.periodo)
+        if cruce.any():
+            fase = 0.5 * np.pi * u[cruce] / self.crossfade
+            final = self._leer(np.minimum(self.periodo + u[cruce], self.fuente.duration - 1.0 / self.fps))
+            salida[cruce] = salida[cruce] * np.sin(fase)[:, None] + final * np.cos(fase)[:, None]
+        return self._formato(salida, escalar)
+
+    def _formato(self, salida: np.ndarray, escalar: bool):
+        # Mismo formato que los clips de moviepy: sin eje de canales en mono
+        if self.nchannels == 1:
+            salida = salida[:, 0]
+        return salida[0] if escalar else salida
@@ -0,0 +1,320 @@
+"""
+Mezclador de audio en numpy por bloques de tamaño fijo.
+
+Sustituye a CompositeAudioClip: suma las pistas (música, voz en off, audio de
+las transiciones) bloque a bloque con su volumen y, si se pide, baja la música
+mientras suena la voz (ducking). La envolvente del ducking se calcula una sola
+vez a partir de la voz antes de mezclar, así que puede anticiparse a la voz en
+lugar de reaccionar tarde como un compresor en tiempo real.
+
+La mezcla se escribe como un único flujo PCM (WAV) directamente al codificador
+de video a través de una tubería con nombre, sin pasar por un archivo de audio
+temporal.
+"""
+from typing import List, Optional
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+from moviepy.editor import AudioClip
+from moviepy.video.io.ffmpeg_writer import ffmpeg_write_video
+
+FPS_MEZCLA = 44100
+MUESTRAS_BLOQUE = 4096
+VENTANA_ENVOLVENTE = 0.01  # segundos por punto de la envolvente de la voz
+
+
+class Pista:
+    """Un clip de audio dentro de la mezcla, con su volumen, su inicio y si se atenúa bajo la voz."""
+    def __init__(self, clip, volumen: float = 1.0, inicio: float = 0.0, atenuar: bool = False):
+        self.clip = clip
+        self.volumen = volumen
+        self.inicio = inicio
+        self.atenuar = atenuar
+
+    def leer(self, t: np.ndarray, nchannels: int) -> Optional[np.ndarray]:
+        """Muestras de la pista en los tiempos t (del video), o None si no suena en ese bloque."""
+        local = t - self.inicio
+        if local[0] >= 0 and local[-1] < self.clip.duration:
+            # Bloque entero dentro de la pista (lo habitual): sin máscara
+            return self._canales(self.clip.get_frame(local), len(t), nchannels)
+        dentro = (local >= 0) & (local < self.clip.duration)
+        if not dentro.any():
+            return None
+        muestras = np.zeros((len(t), nchannels))
+        muestras[dentro] = self._canales(self.clip.get_frame(local[dentro]), int(dentro.sum()), nchannels)
+        return muestras
+
+    @staticmethod
+    def _canales(leidas, n: int, nchannels: int) -> np.ndarray:
+        leidas = np.array(leidas, dtype=np.float64).reshape(n, -1)
+        if leidas.shape[1] != nchannels:
+            # Mono a todos los canales; de más canales se toman los primeros
+            leidas = np.repeat(leidas, nchannels, axis=1) if leidas.shape[1] == 1 else leidas[:, :nchannels]
+        return leidas
+
+
+def envolvente_rms(pista: Pista, duracion: float, fps: int = FPS_MEZCLA) -> np.ndarray:
+    """Nivel RMS de la pista en ventanas de VENTANA_ENVOLVENTE, leyéndola por bloques."""
+    por_ventana = int(round(VENTANA_ENVOLVENTE * fps))
+    ventanas = int(np.ceil(duracion / VENTANA_ENVOLVENTE))
+    energia = np.zeros(ventanas)
+    ventanas_bloque = max(1, MUESTRAS_BLOQUE // por_ventana) * 8
+    for primera in range(0, ventanas, ventanas_bloque):
+        n = min(ventanas_bloque, ventanas - primera)
+        t = (primera * por_ventana + np.arange(n * por_ventana)) / fps
+        muestras = pista.leer(t, 2)
+        if muestras is not None:
+            energia[primera:primera + n] = (muestras ** 2).mean(axis=1).reshape(n, por_ventana).mean(axis=1)
+    return np.sqrt(energia) * pista.volumen
+
+
+def envolvente_ducking(
+    rms: np.ndarray,
+    reduccion_db: float = -12.0,
+    umbral_db: float = -40.0,
+    anticipacion: float = 0.15,
+    ataque: float = 0.08,
+    liberacion: float = 0.5,
+    pausa_minima: float = 0.4
+) -> np.ndarray:
+    """
+    Ganancia de la música por ventana: reduccion_db mientras la voz supera
+    umbral_db. Las pausas de la voz más cortas que pausa_minima no devuelven la
+    música; la bajada empieza anticipacion segundos antes de la voz, con
+    rampas de ataque y liberación.
+    """
+    with np.errstate(divide="ignore"):
+        activa = 20 * np.log10(np.maximum(rms, 1e-12)) > umbral_db
+    ventanas = len(activa)
+    if activa.any():
+        indices = np.arange(ventanas)
+        # Ventanas que faltan hasta la siguiente con voz (0 si la voz ya está activa)
+        siguiente = np.minimum.accumulate(np.where(activa, indices, 2 * ventanas)[::-1])[::-1]
+        hasta_voz = siguiente - indices
+        hubo_voz = np.maximum.accumulate(activa)
+        activa = (activa
+                  | (hasta_voz <= int(round(anticipacion / VENTANA_ENVOLVENTE)))
+                  | (hubo_voz & (hasta_voz <= int(round(pausa_minima / VENTANA_ENVOLVENTE)))))
+
+    objetivo = np.where(activa, 10 ** (reduccion_db / 20), 1.0)
+    # Rampas lineales con pendiente máxima distinta al bajar (ataque) y al subir (liberación)
+    rango = 1.0 - 10 ** (reduccion_db / 20)
+    bajada = rango * VENTANA_ENVOLVENTE / max(ataque, VENTANA_ENVOLVENTE)
+    subida = rango * VENTANA_ENVOLVENTE / max(liberacion, VENTANA_ENVOLVENTE)
+    ganancia = np.empty(ventanas)
+    actual = 1.0
+    for i, destino in enumerate(objetivo):
+        actual = max(actual - bajada, destino) if destino < actual else min(actual + subida, destino)
+        ganancia[i] = actual
+    return ganancia
+
+
+class AudioMixer:
+    """
+    Mezcla de pistas de audio de duración fija, por bloques de muestras_bloque.
+
+    Args:
+        duracion: Duración de la mezcla (la del video)
+        fps: Frecuencia de muestreo
+        nchannels: Canales de la mezcla
+        muestras_bloque: Muestras por bloque al escribir la mezcla
+    """
+    def __init__(self, duracion: float, fps: int = FPS_MEZCLA, nchannels: int = 2,
+                 muestras_bloque: int = MUESTRAS_BLOQUE):
+        self.duracion = duracion
+        self.fps = fps
+        self.nchannels = nchannels
+        self.muestras_bloque = muestras_bloque
+        self.pistas: List[Pista] = []
+        self.voz: Optional[Pista] = None
+        self.ducking = None  # parámetros de envolvente_ducking, o None sin ducking
+        self._ganancia_ducking = None
+        self._tiempos_ducking = None
+
+    def anadir(self, clip, volumen: float = 1.0, inicio: float = 0.0, atenuar: bool = False) -> "AudioMixer":
+        """Añade una pista. Con atenuar=True se baja mientras suena la voz (si hay ducking)."""
+        self.pistas.append(Pista(clip, volumen, inicio, atenuar))
+        return self
+
+    def anadir_voz(self, clip, volumen: float = 1.0, inicio: float = 0.0, **ducking) -> "AudioMixer":
+        """
+        Añade la voz en off, que controla el ducking de las pistas con atenuar=True.
+        Los argumentos extra se pasan a envolvente_ducking (p. ej. reduccion_db).
+        """
+        self.voz = Pista(clip, volumen, inicio)
+        self.pistas.append(self.voz)
+        self.ducking = ducking
+        self._ganancia_ducking = None
+        return self
+
+    @property
+    def vacio(self) -> bool:
+        return not self.pistas
+
+    @property
+    def total_muestras(self) -> int:
+        # Igual que los bloques de moviepy: int(fps * duración)
+        return int(self.fps * self.duracion)
+
+    def ganancia_ducking(self) -> Optional[np.ndarray]:
+        """Envolvente de ganancia de las pistas atenuadas; se calcula una vez por mezcla."""
+        if self.voz is None or not any(p.atenuar for p in self.pistas):
+            return None
+        if self._ganancia_ducking is None:
+            rms = envolvente_rms(self.voz, self.duracion, self.fps)
+            self._ganancia_ducking = envolvente_ducking(rms, **self.ducking)
+            self._tiempos_ducking = (np.arange(len(self._ganancia_ducking)) + 0.5) * VENTANA_ENVOLVENTE
+        return self._ganancia_ducking
+
+    def mezclar(self, t):
+        """Muestras de la mezcla en los tiempos t (escalar o array), como un make_frame de moviepy."""
+        escalar = np.isscalar(t)
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+        salida = np.zeros((len(t), self.nchannels))
+        ganancia = self.ganancia_ducking()
+        for pista in self.pistas:
+            muestras = pista.leer(t, self.nchannels)
+            if muestras is None:
+                continue
+            if pista.atenuar and ganancia is not None:
+                muestras *= (pista.volumen * np.interp(t, self._tiempos_ducking, ganancia))[:, None]
+            else:
+                muestras *= pista.volumen
+            salida += muestras
+        return salida[0] if escalar else salida
+
+    def bloques(self):
+        """Bloques consecutivos de la mezcla en PCM de 16 bits intercalado (bytes)."""
+        total = self.total_muestras
+        for primera in range(0, total, self.muestras_bloque):
+            t = np.arange(primera, min(primera + self.muestras_bloque, total)) / self.fps
+            muestras = np.clip(self.mezclar(t), -1.0, 1.0)
+            yield (muestras * 32767).astype("<i2").tobytes()
+
+    def cabecera_wav(self) -> bytes:
+        """Cabecera WAV (PCM 16 bits) con el tamaño exacto de la mezcla."""
+        datos = self.total_muestras * self.nchannels * 2
+        return struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", 36 + datos, b"WAVE", b"fmt ", 16, 1, self.nchannels, self.fps,
+            self.fps * self.nchannels * 2, self.nchannels * 2, 16, b"data", datos
+        )
+
+    def escribir_wav(self, destino):
+        """Escribe la mezcla como WAV en un archivo ya abierto (o una tubería)."""
+        destino.write(self.cabecera_wav())
+        for bloque in self.bloques():
+            destino.write(bloque)
+
+    def como_clip(self) -> AudioClip:
+        """La mezcla como clip de audio de moviepy (para los renders que lo escriben por su cuenta)."""
+        clip = AudioClip(make_frame=self.mezclar, duration=self.duracion, fps=self.fps)
+        clip.nchannels = self.nchannels
+        return clip
+
+
+def escribir_video_con_mezcla(clip, mezclador: Optional[AudioMixer], output_path: str, perfil):
+    """
+    Escribe el clip con el perfil de render y la mezcla como pista de audio.
+    La mezcla entra al mismo ffmpeg que codifica el video por una tubería con
+    nombre en un directorio propio del render; donde no hay tuberías con nombre
+    se escribe antes un WAV en ese mismo directorio.
+    """
+    if mezclador is None or mezclador.vacio:
+        ffmpeg_write_video(clip, output_path, perfil.fps, logger=None, **perfil.parametros_writer())
+        return
+
+    directorio = tempfile.mkdtemp(prefix="mezcla_")
+    ruta_audio = os.path.join(directorio, "mezcla.wav")
+    hilo = None
+    errores = []
+    try:
+        if hasattr(os, "mkfifo"):
+            os.mkfifo(ruta_audio)
+
+            def alimentar():
+                try:
+                    with open(ruta_audio, "wb") as tuberia:
+                        mezclador.escribir_wav(tuberia)
+                except (BrokenPipeError, OSError) as e:
+                    errores.append(e)
+
+            hilo = threading.Thread(target=alimentar, daemon=True)
+            hilo.start()
+        else:
+            with open(ruta_audio, "wb") as f:
+                mezclador.escribir_wav(f)
+
+        parametros = perfil.parametros_writer()
+        # El audio se codifica en el mismo ffmpeg (el último -c:a anula el "-acodec copy" de moviepy)
+        parametros["ffmpeg_params"] = parametros["ffmpeg_params"] + ["-c:a", perfil.audio_codec, "-shortest"]
+        ffmpeg_write_video(clip, output_path, perfil.fps, audiofile=ruta_audio, logger=None, **parametros)
+        if hilo is not None:
+            hilo.join()
+            if errores:
+                raise IOError(f"Error al enviar la mezcla de audio al codificador: {errores[0]}")
+    finally:
+        if hilo is not None and hilo.is_alive():
+            # Si ffmpeg falló sin abrir la tubería, abrirla para lectura desbloquea al hilo
+            try:
+                descriptor = os.open(ruta_audio, os.O_RDONLY | os.O_NONBLOCK)
+                os.close(descriptor)
+            except OSError:
+                pass
+            hilo.join(timeout=5)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+class CodificadorAudio:
+    """
+    Codifica la pista de audio de un render en un hilo propio, en paralelo con
+    los frames: los bloques PCM del clip van por stdin a un ffmpeg que solo
+    codifica audio, dentro del directorio temporal del render. Al terminar el
+    video se une con esperar() sin recodificar nada.
+    """
+    def __init__(self, clip_audio, directorio: str, perfil, fps: int = FPS_MEZCLA):
+        self.ruta = os.path.join(directorio, f"audio.{perfil.extension_audio}")
+        self.fps = fps
+        self._error = None
+        comando = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+                   "-f", "s16le", "-ar", str(fps), "-ac", str(clip_audio.nchannels), "-i", "-",
+                   "-c:a", perfil.audio_codec, self.ruta]
+        self._proceso = subprocess.Popen(comando, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                         stderr=subprocess.PIPE)
+        self._hilo = threading.Thread(target=self._alimentar, args=(clip_audio,), daemon=True)
+        self._hilo.start()
+
+    def _alimentar(self, clip_audio):
+        try:
+            for bloque in clip_audio.iter_chunks(chunksize=MUESTRAS_BLOQUE, fps=self.fps, quantize=True, nbytes=2):
+                self._proceso.stdin.write(np.asarray(bloque, dtype="<i2").tobytes())
+        except Exception as e:
+            self._error = e
+        finally:
+            try:
+                self._proceso.stdin.close()
+            except OSError:
+                pass
+
+    def esperar(self) -> str:
+        """Espera a que termine la codificación y devuelve la ruta del audio."""
+        self._hilo.join()
+        error = self._proceso.stderr.read().decode("utf8", errors="ignore").strip()
+        self._proceso.wait()
+        if self._proceso.returncode != 0:
+            raise IOError(f"Codificación de audio falló (código {self._proceso.returncode}): {error}")
+        if self._error is not None:
+            raise IOError(f"Error al generar el audio: {self._error}")
+        return self.ruta
+
+    def cancelar(self):
+        """Detiene la codificación (p. ej. si el render del video falló)."""
+        if self._proceso.poll() is None:
+            self._proceso.kill()
+        self._hilo.join(timeout=5)
+        self._proceso.wait()
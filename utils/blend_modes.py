@@ -0,0 +1,82 @@
+"""
+Modos de fusión para overlays (screen, add, multiply, overlay) en enteros.
+
+Cada kernel recibe el frame base y el del overlay en uint8 y escribe el color
+fusionado (0..255) en un búfer uint16 preasignado. El compositor mezcla luego
+ese color con la base según la opacidad o el alpha de la capa.
+"""
+from functools import lru_cache
+import numpy as np
+
+MODOS_FUSION = ["normal", "screen", "add", "multiply", "overlay"]
+
+NOMBRES_MODOS = {
+    "normal": "Normal",
+    "screen": "Trama (screen)",
+    "add": "Suma (add)",
+    "multiply": "Multiplicar",
+    "overlay": "Superponer (overlay)",
+}
+
+
+def _dividir_255(valor):
+    """valor / 255 redondeado, en enteros e in place (válido para valor <= 65025)."""
+    valor += 128
+    valor += valor >> 8
+    valor >>= 8
+    return valor
+
+
+def fusion_add(base, capa, out):
+    """min(base + capa, 255)"""
+    np.add(base, capa, out=out, dtype=np.uint16)
+    np.minimum(out, 255, out=out)
+    return out
+
+
+def fusion_multiply(base, capa, out):
+    """base * capa / 255"""
+    np.multiply(base, capa, out=out, dtype=np.uint16)
+    return _dividir_255(out)
+
+
+def fusion_screen(base, capa, out):
+    """base + capa - base * capa / 255  (= 255 - (255 - base)(255 - capa) / 255)"""
+    fusion_multiply(base, capa, out)
+    np.subtract(capa, out, out=out, dtype=np.uint16)
+    out += base
+    return out
+
+
+@lru_cache(maxsize=1)
+def _tabla_overlay():
+    """Tabla 256x256 (base, capa) -> overlay, indexada por base << 8 | capa."""
+    base = np.arange(256, dtype=np.float64)[:, None]
+    capa = np.arange(256, dtype=np.float64)[None, :]
+    tabla = np.where(
+        base < 128,
+        2 * base * capa / 255,
+        255 - 2 * (255 - base) * (255 - capa) / 255
+    )
+    tabla = np.clip(np.rint(tabla), 0, 255).astype(np.uint16).ravel()
+    tabla.flags.writeable = False
+    return tabla
+
+
+def fusion_overlay(base, capa, out):
+    """
+    Multiply doble en las sombras de la base (< 128) y screen doble en las luces.
+    Al depender de una condición por píxel se resuelve con una tabla de consulta.
+    """
+    np.left_shift(base, 8, out=out, dtype=np.uint16)
+    out |= capa
+    np.take(_tabla_overlay(), out, out=out, mode="clip")
+    return out
+
+
+KERNELS_FUSION = {
+    "add": fusion_add,
+    "multiply": fusion_multiply,
+    "screen": fusion_screen,
+    "overlay": fusion_overlay,
+}
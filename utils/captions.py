@@ -0,0 +1,274 @@
+"""
+Subtítulos incrustados a partir de la transcripción.
+
+Cada carácter se rasteriza una sola vez en un atlas de glifos (relleno y
+contorno) por fuente y tamaño. Cada subtítulo se compone una sola vez a partir
+del atlas en una disposición con la caja de cada palabra, de la que salen los
+sprites: el normal y, con resaltado, uno por palabra que solo cambia el color
+dentro de su caja. El subtítulo activo en t se busca en un índice de intervalos.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import math
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw
+from utils.text_render import INTERLINEADO, SpriteTexto, cargar_fuente, partir_lineas
+from utils.timeline import IndiceIntervalos
+
+ESTILO_POR_DEFECTO = {
+    "font": None,
+    "size": None,  # por defecto, proporcional al alto del video
+    "color": "white",
+    "stroke_color": "black",
+    "stroke_width": 3,
+    "highlight_color": None,  # p. ej. "#FFD400" para resaltar la palabra que suena
+    "position": "bottom",
+    "margin": 0.06,  # fracción del alto del video
+    "max_width": 0.85,  # fracción del ancho del video
+}
+
+
+class Glifo:
+    """Máscaras (uint8) de un carácter: relleno y relleno + contorno, con su desplazamiento."""
+    def __init__(self, relleno: np.ndarray, contorno: np.ndarray, dx: int, dy: int):
+        self.relleno = relleno
+        self.contorno = contorno
+        self.dx = dx
+        self.dy = dy
+
+
+class GlyphAtlas:
+    """Glifos de una fuente y tamaño, rasterizados la primera vez que se usan."""
+    def __init__(self, font: Optional[str], size: int, stroke_width: int = 0):
+        self.fuente = cargar_fuente(font, size)
+        self.stroke_width = stroke_width
+        ascenso, descenso = self.fuente.getmetrics()
+        self.alto_linea = ascenso + descenso + 2 * stroke_width + INTERLINEADO
+        self._glifos = {}
+
+    def glifo(self, caracter: str) -> Optional[Glifo]:
+        if caracter not in self._glifos:
+            self._glifos[caracter] = self._rasterizar(caracter)
+        return self._glifos[caracter]
+
+    def _rasterizar(self, caracter: str) -> Optional[Glifo]:
+        sw = self.stroke_width
+        x0, y0, x1, y1 = self.fuente.getbbox(caracter, stroke_width=sw)
+        x0, y0, x1, y1 = math.floor(x0), math.floor(y0), math.ceil(x1), math.ceil(y1)
+        if x1 <= x0 or y1 <= y0:
+            return None  # espacios y caracteres sin tinta
+        relleno = Image.new("L", (x1 - x0, y1 - y0), 0)
+        ImageDraw.Draw(relleno).text((-x0, -y0), caracter, font=self.fuente, fill=255)
+        contorno = Image.new("L", (x1 - x0, y1 - y0), 0)
+        ImageDraw.Draw(contorno).text((-x0, -y0), caracter, font=self.fuente, fill=255,
+                                      stroke_width=sw, stroke_fill=255)
+        return Glifo(np.asarray(relleno), np.asarray(contorno), x0, y0)
+
+    def ancho(self, texto: str) -> float:
+        return self.fuente.getlength(texto) + 2 * self.stroke_width
+
+
+@lru_cache(maxsize=8)
+def obtener_atlas(font: Optional[str], size: int, stroke_width: int) -> GlyphAtlas:
+    """Atlas compartido por todos los subtítulos con la misma fuente, tamaño y contorno."""
+    return GlyphAtlas(font, size, stroke_width)
+
+
+class DisposicionSubtitulo:
+    """
+    Un subtítulo compuesto desde el atlas: máscaras de relleno y contorno del
+    bloque de texto centrado y la caja (x0, y0, x1, y1) de cada palabra.
+    """
+    def __init__(self, texto: str, atlas: GlyphAtlas, ancho_maximo: int):
+        sw = atlas.stroke_width
+        lineas = partir_lineas(texto, atlas.fuente, ancho_maximo, sw)
+        anchos = [math.ceil(atlas.ancho(linea)) for linea in lineas]
+        self.ancho = max(1, max(anchos))
+        self.alto = max(1, atlas.alto_linea * len(lineas))
+        self.relleno = np.zeros((self.alto, self.ancho), dtype=np.uint8)
+        self.contorno = np.zeros((self.alto, self.ancho), dtype=np.uint8)
+        self.palabras = []
+
+        for numero, (linea, ancho_linea) in enumerate(zip(lineas, anchos)):
+            origen_x = (self.ancho - ancho_linea) // 2 + sw
+            origen_y = numero * atlas.alto_linea + sw
+            # La posición de cada carácter incluye el kerning de lo que le precede
+            for k, caracter in enumerate(linea):
+                glifo = atlas.glifo(caracter)
+                if glifo is None:
+                    continue
+                x = origen_x + int(round(atlas.fuente.getlength(linea[:k]))) + glifo.dx
+                y = origen_y + glifo.dy
+                self._estampar(self.relleno, glifo.relleno, x, y)
+                self._estampar(self.contorno, glifo.contorno, x, y)
+            inicio_palabra = 0
+            for palabra in linea.split(" "):
+                if palabra:
+                    x0 = origen_x + int(atlas.fuente.getlength(linea[:inicio_palabra])) - sw
+                    x1 = origen_x + int(math.ceil(atlas.fuente.getlength(linea[:inicio_palabra + len(palabra)]))) + sw
+                    self.palabras.append((max(0, x0), numero * atlas.alto_linea, min(self.ancho, x1),
+                                          (numero + 1) * atlas.alto_linea))
+                inicio_palabra += len(palabra) + 1
+
+    @staticmethod
+    def _estampar(destino: np.ndarray, mascara: np.ndarray, x: int, y: int):
+        alto, ancho = destino.shape
+        h, w = mascara.shape
+        dx0, dy0 = max(x, 0), max(y, 0)
+        dx1, dy1 = min(x + w, ancho), min(y + h, alto)
+        if dx0 >= dx1 or dy0 >= dy1:
+            return
+        zona = destino[dy0:dy1, dx0:dx1]
+        np.maximum(zona, mascara[dy0 - y:dy1 - y, dx0 - x:dx1 - x], out=zona)
+
+    def colorear(self, color, stroke_color, zona=None) -> np.ndarray:
+        """RGBA de la disposición (o de zona=(x0, y0, x1, y1)): relleno de color sobre el contorno."""
+        x0, y0, x1, y1 = zona or (0, 0, self.ancho, self.alto)
+        relleno = self.relleno[y0:y1, x0:x1, None].astype(np.uint16)
+        rgb = (np.array(color, dtype=np.uint16) * relleno
+               + np.array(stroke_color, dtype=np.uint16) * (255 - relleno) + 127) // 255
+        alpha = np.maximum(self.contorno[y0:y1, x0:x1], self.relleno[y0:y1, x0:x1])
+        return np.dstack([rgb.astype(np.uint8), alpha])
+
+
+def tiempos_palabras(segmento: dict) -> List[Tuple[float, float]]:
+    """
+    (inicio, fin) de cada palabra del segmento: los de la transcripción si los
+    trae ('words' con 'start'/'end'), o repartidos según la longitud de cada palabra.
+    """
+    palabras = segmento["text"].split()
+    if segmento.get("words") and len(segmento["words"]) == len(palabras):
+        return [(float(p["start"]), float(p["end"])) for p in segmento["words"]]
+    inicio, fin = float(segmento["start"]), float(segmento["end"])
+    pesos = np.array([len(p) + 1 for p in palabras], dtype=np.float64)
+    limites = inicio + (fin - inicio) * np.concatenate([[0], np.cumsum(pesos)]) / pesos.sum()
+    return list(zip(limites[:-1], limites[1:]))
+
+
+def cargar_transcripcion(datos) -> List[dict]:
+    """
+    Segmentos de una transcripción en JSON: una lista de segmentos o un objeto
+    con 'segments' (la salida de Whisper). Cada segmento necesita 'text',
+    'start' y 'end'; 'words' es opcional. Lanza ValueError si falta algo.
+    """
+    if isinstance(datos, dict):
+        datos = datos.get("segments")
+    if not isinstance(datos, list):
+        raise ValueError("La transcripción debe ser una lista de segmentos o un objeto con 'segments'")
+    segmentos = []
+    for segmento in datos:
+        if not isinstance(segmento, dict) or not {"text", "start", "end"} <= segmento.keys():
+            raise ValueError("Cada segmento de la transcripción necesita 'text', 'start' y 'end'")
+        segmentos.append(segmento)
+    return segmentos
+
+
+class CaptionRenderer:
+    """
+    Incrusta los subtítulos de una transcripción (lista de dicts con 'text',
+    'start', 'end' y opcionalmente 'words') sobre un clip.
+
+    Args:
+        transcripcion: Segmentos de la transcripción
+        tamano_frame: (ancho, alto) del video
+        estilo: Claves de ESTILO_POR_DEFECTO a cambiar
+        max_sprites: Sprites coloreados que se conservan en memoria
+    """
+    def __init__(self, transcripcion: List[dict], tamano_frame: Tuple[int, int], estilo: Optional[dict] = None,
+                 max_sprites: int = 64):
+        self.estilo = dict(ESTILO_POR_DEFECTO, **(estilo or {}))
+        ancho, alto = tamano_frame
+        self.tamano_frame = tamano_frame
+        self.segmentos = sorted(
+            (s for s in transcripcion if s.get("text", "").strip() and s["end"] > s["start"]),
+            key=lambda s: s["start"]
+        )
+        self.indice = IndiceIntervalos([s["start"] for s in self.segmentos], [s["end"] for s in self.segmentos])
+
+        size = self.estilo["size"] or max(12, int(alto * 0.055))
+        self.atlas = obtener_atlas(self.estilo["font"], size, int(self.estilo["stroke_width"]))
+        self.ancho_maximo = int(ancho * self.estilo["max_width"])
+        self.color = ImageColor.getrgb(self.estilo["color"])[:3]
+        self.stroke_color = ImageColor.getrgb(self.estilo["stroke_color"])[:3]
+        resaltado = self.estilo["highlight_color"]
+        self.color_resaltado = ImageColor.getrgb(resaltado)[:3] if resaltado else None
+
+        self._disposiciones = {}
+        self._tiempos = {}
+        self._sprites = OrderedDict()
+        self.max_sprites = max_sprites
+
+    def _disposicion(self, indice: int) -> DisposicionSubtitulo:
+        if indice not in self._disposiciones:
+            self._disposiciones[indice] = DisposicionSubtitulo(
+                self.segmentos[indice]["text"], self.atlas, self.ancho_maximo
+            )
+        return self._disposiciones[indice]
+
+    def _palabra_activa(self, indice: int, t: float) -> Optional[int]:
+        if indice not in self._tiempos:
+            self._tiempos[indice] = IndiceIntervalos(*zip(*tiempos_palabras(self.segmentos[indice])))
+        activas = self._tiempos[indice].activos(t)
+        return activas[-1] if activas else None
+
+    def sprite(self, indice: int, palabra: Optional[int] = None) -> SpriteTexto:
+        """
+        Sprite del subtítulo indice, con la palabra indicada resaltada. Las
+        variantes resaltadas parten del sprite normal y solo recolorean la caja
+        de la palabra.
+        """
+        clave = (indice, palabra)
+        sprite = self._sprites.get(clave)
+        if sprite is None:
+            disposicion = self._disposicion(indice)
+            if palabra is None or palabra >= len(disposicion.palabras):
+                sprite = SpriteTexto(disposicion.colorear(self.color, self.stroke_color))
+            else:
+                x0, y0, x1, y1 = zona = disposicion.palabras[palabra]
+                sprite = self.sprite(indice).con_zona(
+                    disposicion.colorear(self.color_resaltado, self.stroke_color, zona), x0, y0
+                )
+            self._sprites[clave] = sprite
+            if len(self._sprites) > self.max_sprites:
+                self._sprites.popitem(last=False)
+        else:
+            self._sprites.move_to_end(clave)
+        return sprite
+
+    def instantes_cambio(self) -> List[float]:
+        """Instantes en los que cambia el subtítulo visible (o la palabra resaltada)."""
+        instantes = []
+        for segmento in self.segmentos:
+            instantes += [float(segmento["start"]), float(segmento["end"])]
+            if self.color_resaltado:
+                for inicio, fin in tiempos_palabras(segmento):
+                    instantes += [float(inicio), float(fin)]
+        return instantes
+
+    def posicion(self, sprite: SpriteTexto) -> Tuple[int, int]:
+        ancho, alto = self.tamano_frame
+        margen = int(alto * self.estilo["margin"])
+        x = (ancho - sprite.ancho) // 2
+        posicion = self.estilo["position"]
+        if posicion == "top":
+            y = margen
+        elif posicion == "center":
+            y = (alto - sprite.alto) // 2
+        else:
+            y = alto - sprite.alto - margen
+        return x, y
+
+    def pegar(self, frame: np.ndarray, t: float) -> np.ndarray:
+        """Frame con el subtítulo activo en t (si lo hay); sin subtítulo se devuelve tal cual."""
+        activos = self.indice.activos(t)
+        if not activos:
+            return frame
+        indice = activos[-1]
+        palabra = self._palabra_activa(indice, t) if self.color_resaltado else None
+        sprite = self.sprite(indice, palabra)
+        return sprite.pegar(frame, *self.posicion(sprite))
+
+    def aplicar(self, clip):
+        """Clip con los subtítulos incrustados (conserva el audio)."""
+        return clip.fl(lambda gf, t: self.pegar(gf(t), t))
@@ -0,0 +1,170 @@
+"""
+Compositor vectorizado para el caso imagen + overlays.
+
+Sustituye a CompositeVideoClip + set_opacity: no crea clips de máscara ni
+mezcla en float por capa. Todas las capas se mezclan en punto fijo de 8 bits
+sobre un búfer de salida preasignado.
+"""
+from typing import List, Optional
+import math
+from moviepy.editor import VideoClip
+import cv2
+import numpy as np
+from utils.blending import ESCALA_PESO, BITS_PESO, peso_fijo, a_uint8
+from utils.blend_modes import KERNELS_FUSION
+from utils.keying import key_mask_cache
+
+
+class CapaOverlay:
+    """
+    Una capa a componer sobre el clip base.
+
+    Args:
+        clip: Clip del overlay (sus frames son RGB)
+        opacity: Opacidad constante de la capa (0..1)
+        start_time: Instante del clip base en que empieza la capa
+        duration: Duración de la capa; por defecto la del overlay
+        use_alpha: Usar el alpha real del overlay (clip.mask)
+        blend_mode: 'normal', 'screen', 'add', 'multiply' u 'overlay'
+        key: Parámetros de chroma/luma key (ver utils.keying) o None
+        persist_key: Guardar también las máscaras del key en la caché en disco
+    """
+    def __init__(
+        self,
+        clip,
+        opacity: float = 1.0,
+        start_time: float = 0.0,
+        duration: Optional[float] = None,
+        use_alpha: bool = False,
+        blend_mode: str = "normal",
+        key: Optional[dict] = None,
+        persist_key: bool = False
+    ):
+        self.clip = clip
+        self.opacity = opacity
+        self.start_time = start_time
+        self.duration = duration if duration is not None else clip.duration
+        self.use_alpha = use_alpha and clip.mask is not None
+        if blend_mode != "normal" and blend_mode not in KERNELS_FUSION:
+            print(f"[DEBUG] Modo de fusión desconocido '{blend_mode}', se usa 'normal'")
+            blend_mode = "normal"
+        self.blend_mode = blend_mode
+        # 'persist' dentro del key equivale a persist_key y no forma parte de su firma
+        self.key = {k: v for k, v in key.items() if k != "persist"} if key else None
+        self.persist_key = persist_key or bool(key and key.get("persist"))
+        self._origen = getattr(clip, "filename", None) or f"clip-{id(clip)}"
+        self._fps = getattr(clip, "fps", None) or 24
+        self.frames = max(1, int(math.ceil(clip.duration * self._fps)))
+
+    def activa(self, t: float) -> bool:
+        return self.start_time <= t < self.start_time + self.duration
+
+    def alpha(self, t_local: float, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Alpha por píxel en uint8 (0..255), o None si la capa solo tiene opacidad constante.
+        Con key, la máscara se calcula del frame y se memoiza por índice de frame.
+        """
+        mascara = None
+        if self.use_alpha:
+            mascara = self.clip.mask.get_frame(t_local)
+            if mascara.dtype != np.uint8:
+                mascara = (mascara * 255 + 0.5).astype(np.uint8)
+        if self.key:
+            # Pasado su final el lector repite el último frame, y su máscara también
+            indice = min(int(t_local * self._fps + 1e-6), self.frames - 1)
+            mascara_key = key_mask_cache.obtener(self._origen, self.key, indice, frame, self.persist_key)
+            if mascara is None:
+                mascara = mascara_key
+            else:
+                # Alpha real y key a la vez: se multiplican
+                mascara = ((mascara.astype(np.uint16) * mascara_key + 127) // 255).astype(np.uint8)
+        return mascara
+
+
+class OverlayCompositor:
+    """
+    Compone un clip base y sus capas de overlay en una sola pasada por frame.
+    El frame devuelto reutiliza el búfer de salida en la siguiente llamada.
+    """
+    def __init__(self, base_clip, capas: List[CapaOverlay]):
+        self.base_clip = base_clip
+        self.capas = capas
+        self.size = (base_clip.w, base_clip.h)
+        for capa in capas:
+            if capa.key:
+                # Las máscaras de todos los frames del overlay caben en memoria: al
+                # repetirse el overlay no se vuelven a calcular
+                key_mask_cache.reservar(capa._origen, capa.key, capa.frames, self.size)
+        self._salida = None
+        self._acumulado = None
+        self._temporal = None
+        self._fusion = None
+
+    def _reservar(self, forma):
+        if self._salida is None or self._salida.shape != forma:
+            self._salida = np.empty(forma, dtype=np.uint8)
+            self._acumulado = np.empty(forma, dtype=np.uint16)
+            self._temporal = np.empty(forma, dtype=np.uint16)
+            self._fusion = np.empty(forma, dtype=np.uint16)
+
+    def _frame_capa(self, capa: CapaOverlay, t_local: float) -> np.ndarray:
+        frame = a_uint8(capa.clip.get_frame(t_local))
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_LINEAR)
+        return frame
+
+    def _mezclar_capa(self, salida, capa: CapaOverlay, t_local: float):
+        """Mezcla una capa sobre salida (in place) en enteros de 16 bits."""
+        peso = peso_fijo(capa.opacity)
+        if peso == 0:
+            return
+        frame = self._frame_capa(capa, t_local)
+        alpha = capa.alpha(t_local, frame)
+        acumulado, temporal = self._acumulado, self._temporal
+
+        if capa.blend_mode != "normal":
+            # El color de la capa pasa a ser el resultado del modo de fusión
+            frame = KERNELS_FUSION[capa.blend_mode](salida, frame, self._fusion)
+            if alpha is None and peso == ESCALA_PESO:
+                np.copyto(salida, frame, casting="unsafe")
+                return
+
+        if alpha is None:
+            # Opacidad constante: salida = base * (256 - w) + capa * w
+            np.multiply(salida, ESCALA_PESO - peso, out=acumulado, dtype=np.uint16)
+            np.multiply(frame, peso, out=temporal, dtype=np.uint16)
+        else:
+            if (alpha.shape[1], alpha.shape[0]) != self.size:
+                alpha = cv2.resize(alpha, self.size, interpolation=cv2.INTER_LINEAR)
+            # Alpha por píxel en 0..256 (255 -> 256) escalado por la opacidad
+            peso_pixel = alpha.astype(np.uint32)
+            peso_pixel += peso_pixel >> 7
+            peso_pixel *= peso
+            peso_pixel += ESCALA_PESO >> 1
+            peso_pixel >>= BITS_PESO
+            peso_pixel = peso_pixel.astype(np.uint16)[:, :, None]
+            np.multiply(salida, ESCALA_PESO - peso_pixel, out=acumulado, dtype=np.uint16)
+            np.multiply(frame, peso_pixel, out=temporal, dtype=np.uint16)
+        acumulado += temporal
+        acumulado += ESCALA_PESO >> 1
+        acumulado >>= BITS_PESO
+        np.copyto(salida, acumulado, casting="unsafe")
+
+    def get_frame(self, t: float) -> np.ndarray:
+        base = a_uint8(self.base_clip.get_frame(t))
+        activas = [capa for capa in self.capas if capa.activa(t)]
+        if not activas:
+            return base
+        self._reservar(base.shape)
+        salida = self._salida
+        np.copyto(salida, base)
+        for capa in activas:
+            self._mezclar_capa(salida, capa, t - capa.start_time)
+        return salida
+
+    def to_clip(self):
+        """VideoClip con el resultado de la composición y el audio del clip base."""
+        clip = VideoClip(self.get_frame, duration=self.base_clip.duration)
+        if getattr(self.base_clip, "audio", None) is not None:
+            clip = clip.set_audio(self.base_clip.audio)
+        return clip
@@ -1,127 +1,123 @@
 from moviepy.editor import VideoClip, ImageClip, CompositeVideoClip
 import numpy as np
-from PIL import Image
+from utils.warp import CALIDAD_POR_DEFECTO, warp_frame, matriz_zoom, matriz_kenburns
+from utils.blending import escalar_uint8
+
+# Efectos que sobre una imagen fija devuelven otra imagen fija
+EFECTOS_ESTATICOS = ("mirror_x", "mirror_y")
+
+
+def _fuente_estatica(clip):
+    """
+    Devuelve el array de píxeles si el clip es una imagen fija (ImageClip),
+    o None si sus frames dependen del tiempo.
+    """
+    if isinstance(clip, ImageClip) and isinstance(getattr(clip, "img", None), np.ndarray):
+        return clip.img
+    return None
+
+
+def _lector_frames(clip):
+    """
+    Devuelve una función t -> frame. Para imágenes fijas los píxeles se capturan
+    una sola vez y se devuelven directamente, sin pasar por clip.get_frame.
+    El array se marca como solo lectura: los efectos siempre crean un frame nuevo.
+    """
+    img = _fuente_estatica(clip)
+    if img is None:
+        return clip.get_frame
+    img = np.ascontiguousarray(img).view()
+    img.flags.writeable = False
+    return lambda t: img
+
 
 class EfectosVideo:
     @staticmethod
-    def zoom_in(clip, duration=1.0, zoom_factor=1.5):
-        """Aplica un efecto de zoom in continuo al clip"""
+    def zoom_in(clip, duration=1.0, zoom_factor=1.5, calidad=CALIDAD_POR_DEFECTO, tamano_salida=None):
+        """
+        Aplica un efecto de zoom in continuo al clip. Con tamano_salida, el
+        recorte se remuestrea a ese tamaño (imágenes con margen para el zoom).
+        """
+        leer_frame = _lector_frames(clip)
         def make_frame(t):
             # Calcula el zoom basado en el tiempo actual
             progress = t / clip.duration
             zoom = 1 + (zoom_factor - 1) * progress
-            frame = clip.get_frame(t)
+            frame = leer_frame(t)
             h, w = frame.shape[:2]
-            new_h = int(h / zoom)
-            new_w = int(w / zoom)
-            center_y = h // 2
-            center_x = w // 2
-            start_y = center_y - new_h // 2
-            start_x = center_x - new_w // 2
-            cropped = frame[start_y:start_y+new_h, start_x:start_x+new_w]
-            return np.array(Image.fromarray(cropped).resize((w, h), Image.Resampling.LANCZOS))
+            return warp_frame(frame, matriz_zoom(w, h, zoom, tamano_salida), tamano_salida, calidad=calidad)
         return VideoClip(make_frame, duration=clip.duration)
 
     @staticmethod
-    def zoom_out(clip, duration=1.0, zoom_factor=1.5):
+    def zoom_out(clip, duration=1.0, zoom_factor=1.5, calidad=CALIDAD_POR_DEFECTO, tamano_salida=None):
         """Aplica un efecto de zoom out continuo al clip"""
+        leer_frame = _lector_frames(clip)
         def make_frame(t):
             # Calcula el zoom basado en el tiempo actual
             progress = t / clip.duration
             zoom = zoom_factor - (zoom_factor - 1) * progress
-            frame = clip.get_frame(t)
+            frame = leer_frame(t)
             h, w = frame.shape[:2]
-            new_h = int(h / zoom)
-            new_w = int(w / zoom)
-            center_y = h // 2
-            center_x = w // 2
-            start_y = center_y - new_h // 2
-            start_x = center_x - new_w // 2
-            cropped = frame[start_y:start_y+new_h, start_x:start_x+new_w]
-            return np.array(Image.fromarray(cropped).resize((w, h), Image.Resampling.LANCZOS))
+            return warp_frame(frame, matriz_zoom(w, h, zoom, tamano_salida), tamano_salida, calidad=calidad)
         return VideoClip(make_frame, duration=clip.duration)
 
     @staticmethod
     def pan_left(clip, duration=1.0, distance=0.5):
         """Aplica un efecto de paneo continuo a la izquierda"""
+        leer_frame = _lector_frames(clip)
         def make_frame(t):
             # Calcula el desplazamiento basado en el tiempo actual
             progress = t / clip.duration
             x = -distance * progress
-            frame = clip.get_frame(t)
-            h, w = frame.shape[:2]
+            frame = leer_frame(t)
+            w = frame.shape[1]
             offset = int(x * w)
             
-            # Crear un nuevo frame con la imagen original
-            new_frame = frame.copy()
-            
-            # Si el offset es negativo (movimiento a la izquierda)
-            if offset < 0:
-                # Asegurarse de que las dimensiones coincidan
-                visible_width = w + offset
-                if visible_width > 0:
-                    new_frame[:, :visible_width] = frame[:, -offset:-offset+visible_width]
-                    new_frame[:, visible_width:] = frame[:, :w-visible_width]
-            else:
-                # Asegurarse de que las dimensiones coincidan
-                visible_width = w - offset
-                if visible_width > 0:
-                    new_frame[:, offset:] = frame[:, :visible_width]
-                    new_frame[:, :offset] = frame[:, visible_width:visible_width+offset]
-            
-            return new_frame
+            # Desplazamiento circular de columnas: una sola copia del frame
+            return np.roll(frame, offset, axis=1)
         return VideoClip(make_frame, duration=clip.duration)
 
     @staticmethod
     def pan_right(clip, duration=1.0, distance=0.5):
         """Aplica un efecto de paneo continuo a la derecha"""
+        leer_frame = _lector_frames(clip)
         def make_frame(t):
             # Calcula el desplazamiento basado en el tiempo actual
             progress = t / clip.duration
             x = distance * progress
-            frame = clip.get_frame(t)
-            h, w = frame.shape[:2]
+            frame = leer_frame(t)
+            w = frame.shape[1]
             offset = int(x * w)
             
-            # Crear un nuevo frame con la imagen original
-            new_frame = frame.copy()
-            
-            # Si el offset es negativo (movimiento a la derecha)
-            if offset < 0:
-                # Asegurarse de que las dimensiones coincidan
-                visible_width = w + offset
-                if visible_width > 0:
-                    new_frame[:, -offset:] = frame[:, :visible_width]
-                    new_frame[:, :-offset] = frame[:, visible_width:visible_width+w+offset]
-            else:
-                # Asegurarse de que las dimensiones coincidan
-                visible_width = w - offset
-                if visible_width > 0:
-                    new_frame[:, :visible_width] = frame[:, offset:offset+visible_width]
-                    new_frame[:, visible_width:] = frame[:, :w-visible_width]
-            
-            return new_frame
+            # Desplazamiento circular de columnas: una sola copia del frame
+            return np.roll(frame, -offset, axis=1)
         return VideoClip(make_frame, duration=clip.duration)
 
     @staticmethod
     def fade_in(clip, duration=1.0):
         """Aplica un efecto de fade in al clip"""
+        leer_frame = _lector_frames(clip)
         def make_frame(t):
             alpha = min(1.0, t / duration)
-            return clip.get_frame(t) * alpha
+            return escalar_uint8(leer_frame(t), alpha)
         return VideoClip(make_frame, duration=clip.duration)
 
     @staticmethod
     def fade_out(clip, duration=1.0):
         """Aplica un efecto de fade out al clip"""
+        leer_frame = _lector_frames(clip)
         def make_frame(t):
             alpha = max(0.0, 1 - (t - (clip.duration - duration)) / duration)
-            return clip.get_frame(t) * alpha
+            return escalar_uint8(leer_frame(t), alpha)
         return VideoClip(make_frame, duration=clip.duration)
 
     @staticmethod
     def mirror_x(clip):
         """Aplica un efecto de espejo horizontal"""
+        img = _fuente_estatica(clip)
+        if img is not None:
+            # El resultado sigue siendo estático: se calcula una sola vez
+            return ImageClip(np.ascontiguousarray(np.fliplr(img)), duration=clip.duration)
         def make_frame(t):
             return np.fliplr(clip.get_frame(t))
         return VideoClip(make_frame, duration=clip.duration)
@@ -129,12 +125,17 @@ class EfectosVideo:
     @staticmethod
     def mirror_y(clip):
         """Aplica un efecto de espejo vertical"""
+        img = _fuente_estatica(clip)
+        if img is not None:
+            # El resultado sigue siendo estático: se calcula una sola vez
+            return ImageClip(np.ascontiguousarray(np.flipud(img)), duration=clip.duration)
         def make_frame(t):
             return np.flipud(clip.get_frame(t))
         return VideoClip(make_frame, duration=clip.duration)
 
     @staticmethod
-    def kenburns(clip, duration=1.0, zoom_start=1.0, zoom_end=1.5, pan_start=(0, 0), pan_end=(0.2, 0.2)):
+    def kenburns(clip, duration=1.0, zoom_start=1.0, zoom_end=1.5, pan_start=(0, 0), pan_end=(0.2, 0.2),
+                 calidad=CALIDAD_POR_DEFECTO, tamano_salida=None):
         """
         Aplica un efecto Ken Burns al clip.
         Args:
@@ -144,7 +145,10 @@ class EfectosVideo:
             zoom_end: Factor de zoom final
             pan_start: Posición inicial del paneo (x, y) en porcentaje
             pan_end: Posición final del paneo (x, y) en porcentaje
+            calidad: Interpolación del remuestreo ('nearest', 'bilinear', 'bicubic', 'lanczos')
+            tamano_salida: (ancho, alto) del resultado si la imagen trae margen para el zoom
         """
+        leer_frame = _lector_frames(clip)
         def make_frame(t):
             # Calcular el progreso del efecto
             progress = t / duration
@@ -157,32 +161,12 @@ class EfectosVideo:
             pan_y = pan_start[1] + (pan_end[1] - pan_start[1]) * progress
             
             # Obtener el frame original
-            frame = clip.get_frame(t)
+            frame = leer_frame(t)
             h, w = frame.shape[:2]
             
-            # Calcular las nuevas dimensiones basadas en el zoom
-            new_h = int(h / zoom)
-            new_w = int(w / zoom)
-            
-            # Calcular el centro de la imagen
-            center_y = h // 2
-            center_x = w // 2
-            
-            # Calcular el desplazamiento basado en el paneo
-            offset_x = int(pan_x * w)
-            offset_y = int(pan_y * h)
-            
-            # Calcular la posición de inicio del recorte
-            start_y = center_y - new_h // 2 + offset_y
-            start_x = center_x - new_w // 2 + offset_x
-            
-            # Asegurar que no nos salgamos de los límites de la imagen
-            start_y = max(0, min(start_y, h - new_h))
-            start_x = max(0, min(start_x, w - new_w))
-            
-            # Recortar y redimensionar
-            cropped = frame[start_y:start_y+new_h, start_x:start_x+new_w]
-            return np.array(Image.fromarray(cropped).resize((w, h), Image.Resampling.LANCZOS))
+            # Recorte subpíxel y remuestreo en una sola llamada
+            return warp_frame(frame, matriz_kenburns(w, h, zoom, pan_x, pan_y, tamano_salida), tamano_salida,
+                              calidad=calidad)
         
         return VideoClip(make_frame, duration=clip.duration)
 
@@ -208,14 +192,13 @@ class EfectosVideo:
     @staticmethod
     def apply_effects_sequence(clip, effects_list):
         """
-        Aplica una secuencia de efectos al clip
+        Aplica una secuencia de efectos al clip.
+        Los efectos geométricos consecutivos (zoom, paneo, Ken Burns, espejo) se
+        fusionan en una sola transformación y los fades en un solo factor de brillo,
+        de modo que cada frame cuesta un remuestreo y una multiplicación.
         Args:
             clip: Clip de video o imagen
             effects_list: Lista de tuplas (efecto, parámetros)
         """
-        result = clip
-        for effect, params in effects_list:
-            if hasattr(EfectosVideo, effect):
-                effect_func = getattr(EfectosVideo, effect)
-                result = effect_func(result, **params)
-        return result 
\ No newline at end of file
+        from utils.effect_compiler import EffectChainCompiler
+        return EffectChainCompiler.aplicar(clip, effects_list)
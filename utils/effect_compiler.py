@@ -0,0 +1,203 @@
+from moviepy.editor import VideoClip
+import numpy as np
+from utils.efectos import EfectosVideo, _lector_frames
+from utils.blending import escalar_uint8
+from utils.warp import (
+    INTERPOLACIONES, CALIDAD_POR_DEFECTO, warp_frame,
+    matriz_zoom, matriz_kenburns, matriz_desplazamiento
+)
+
+# Orden de calidad: un grupo fusionado usa la mejor calidad pedida por sus efectos
+_ORDEN_CALIDAD = list(INTERPOLACIONES.keys())
+
+
+def _geometrico_zoom_in(params, duracion_clip):
+    zoom_factor = params.get("zoom_factor", 1.5)
+    tamano_salida = params.get("tamano_salida")
+    def matriz(t, w, h):
+        return matriz_zoom(w, h, 1 + (zoom_factor - 1) * t / duracion_clip, tamano_salida)
+    return "zoom", matriz
+
+
+def _geometrico_zoom_out(params, duracion_clip):
+    zoom_factor = params.get("zoom_factor", 1.5)
+    tamano_salida = params.get("tamano_salida")
+    def matriz(t, w, h):
+        return matriz_zoom(w, h, zoom_factor - (zoom_factor - 1) * t / duracion_clip, tamano_salida)
+    return "zoom", matriz
+
+
+def _geometrico_kenburns(params, duracion_clip):
+    duration = params.get("duration", 1.0)
+    zoom_start = params.get("zoom_start", 1.0)
+    zoom_end = params.get("zoom_end", 1.5)
+    pan_start = params.get("pan_start", (0, 0))
+    pan_end = params.get("pan_end", (0.2, 0.2))
+    tamano_salida = params.get("tamano_salida")
+    def matriz(t, w, h):
+        progress = t / duration
+        zoom = zoom_start + (zoom_end - zoom_start) * progress
+        pan_x = pan_start[0] + (pan_end[0] - pan_start[0]) * progress
+        pan_y = pan_start[1] + (pan_end[1] - pan_start[1]) * progress
+        return matriz_kenburns(w, h, zoom, pan_x, pan_y, tamano_salida)
+    return "zoom", matriz
+
+
+def _geometrico_pan(signo):
+    def construir(params, duracion_clip):
+        distance = params.get("distance", 0.5)
+        def matriz(t, w, h):
+            return matriz_desplazamiento(signo * distance * t / duracion_clip * w, 0)
+        return "pan", matriz
+    return construir
+
+
+def _geometrico_mirror_x(params, duracion_clip):
+    def matriz(t, w, h):
+        return np.array([[-1.0, 0.0, w - 1], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    return "mirror", matriz
+
+
+def _geometrico_mirror_y(params, duracion_clip):
+    def matriz(t, w, h):
+        return np.array([[1.0, 0.0, 0.0], [0.0, -1.0, h - 1], [0.0, 0.0, 1.0]])
+    return "mirror", matriz
+
+
+def _brillo_fade_in(params, duracion_clip):
+    duration = params.get("duration", 1.0)
+    return lambda t: min(1.0, t / duration)
+
+
+def _brillo_fade_out(params, duracion_clip):
+    duration = params.get("duration", 1.0)
+    return lambda t: max(0.0, 1 - (t - (duracion_clip - duration)) / duration)
+
+
+EFECTOS_GEOMETRICOS = {
+    "zoom_in": _geometrico_zoom_in,
+    "zoom_out": _geometrico_zoom_out,
+    "kenburns": _geometrico_kenburns,
+    # En EfectosVideo los dos paneos desplazan el frame en el mismo sentido
+    "pan_left": _geometrico_pan(-1),
+    "pan_right": _geometrico_pan(-1),
+    "mirror_x": _geometrico_mirror_x,
+    "mirror_y": _geometrico_mirror_y,
+}
+
+EFECTOS_BRILLO = {
+    "fade_in": _brillo_fade_in,
+    "fade_out": _brillo_fade_out,
+}
+
+
+class _GrupoGeometrico:
+    """Efectos geométricos consecutivos fusionados en una sola transformación."""
+    def __init__(self):
+        self.matrices = []
+        self.tamanos = []
+        self.tipos = set()
+        self.calidad = _ORDEN_CALIDAD[0]
+
+    def admite(self, tipo):
+        # El paneo es circular (borde 'wrap'); solo se puede fusionar por fuera de un
+        # zoom si el zoom no queda entre la fuente y el paneo. Un paneo aplicado
+        # después de un zoom necesita su propio remuestreo.
+        return not (tipo == "pan" and "zoom" in self.tipos)
+
+    def anadir(self, tipo, matriz, calidad, tamano_salida=None):
+        self.matrices.append(matriz)
+        self.tamanos.append(tamano_salida)
+        self.tipos.add(tipo)
+        if _ORDEN_CALIDAD.index(calidad) > _ORDEN_CALIDAD.index(self.calidad):
+            self.calidad = calidad
+
+    @property
+    def borde(self):
+        return "wrap" if "pan" in self.tipos else "replicate"
+
+    def matriz(self, t, w, h):
+        """
+        Matriz combinada de salida a fuente y tamaño de la salida. Cada efecto
+        recibe el tamaño de su entrada: el de la fuente o el tamano_salida del
+        efecto anterior.
+        """
+        # Efectos e1..en aplicados en orden: salida -> M_n -> ... -> M_1 -> fuente
+        resultado = np.eye(3)
+        for matriz, tamano_salida in zip(self.matrices, self.tamanos):
+            resultado = resultado @ matriz(t, w, h)
+            if tamano_salida:
+                w, h = tamano_salida
+        return resultado, (w, h)
+
+
+class EffectChainCompiler:
+    @staticmethod
+    def es_compilable(effect_name):
+        """Indica si el efecto puede fusionarse en la cadena compilada."""
+        return effect_name in EFECTOS_GEOMETRICOS or effect_name in EFECTOS_BRILLO
+
+    @staticmethod
+    def compilar(clip, effects_list):
+        """
+        Compila una lista de efectos compilables en un único clip que hace,
+        por frame, un remuestreo por grupo geométrico y una multiplicación
+        por el factor de brillo combinado de todos los fades. Como en
+        EfectosVideo, un zoom o Ken Burns con tamano_salida remuestrea
+        directamente a ese tamaño.
+        """
+        duracion = clip.duration
+        grupos = []
+        ganancias = []
+
+        for effect_name, params in effects_list:
+            if effect_name in EFECTOS_BRILLO:
+                # El brillo conmuta con la geometría: todos los fades se combinan en un factor
+                ganancias.append(EFECTOS_BRILLO[effect_name](params, duracion))
+                continue
+            tipo, matriz = EFECTOS_GEOMETRICOS[effect_name](params, duracion)
+            calidad = params.get("calidad", CALIDAD_POR_DEFECTO)
+            if not grupos or not grupos[-1].admite(tipo):
+                grupos.append(_GrupoGeometrico())
+            tamano_salida = params.get("tamano_salida")
+            grupos[-1].anadir(tipo, matriz, calidad, tuple(tamano_salida) if tamano_salida else None)
+
+        leer_frame = _lector_frames(clip)
+
+        def make_frame(t):
+            frame = leer_frame(t)
+            h, w = frame.shape[:2]
+            for grupo in grupos:
+                matriz, (w, h) = grupo.matriz(t, w, h)
+                frame = warp_frame(frame, matriz, (w, h), calidad=grupo.calidad, borde=grupo.borde)
+            if ganancias:
+                ganancia = 1.0
+                for funcion in ganancias:
+                    ganancia *= funcion(t)
+                if ganancia != 1.0:
+                    frame = escalar_uint8(frame, ganancia)
+            return frame
+
+        return VideoClip(make_frame, duration=duracion)
+
+    @staticmethod
+    def aplicar(clip, effects_list):
+        """
+        Aplica la secuencia de efectos agrupando los tramos compilables.
+        Los efectos no compilables se aplican con su método de EfectosVideo
+        y cortan la cadena.
+        """
+        result = clip
+        tramo = []
+        for effect, params in effects_list:
+            if EffectChainCompiler.es_compilable(effect):
+                tramo.append((effect, params))
+                continue
+            if tramo:
+                result = EffectChainCompiler.compilar(result, tramo)
+                tramo = []
+            if hasattr(EfectosVideo, effect):
+                result = getattr(EfectosVideo, effect)(result, **params)
+        if tramo:
+            result = EffectChainCompiler.compilar(result, tramo)
+        return result
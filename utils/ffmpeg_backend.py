@@ -0,0 +1,335 @@
+"""
+Backend de render nativo: compila un video de imágenes en un único
+filtergraph de ffmpeg y lo renderiza en un solo proceso, sin pasar ningún
+frame por Python.
+
+Cada escena parte de la imagen ya ingerida (utils.image_ingest: orientada y
+encajada en la resolución con el margen de su efecto), que ffmpeg lee
+directamente del .npy como rawvideo. Los efectos se traducen a perspective
+(zoom y Ken Burns, con el mismo recorte subpíxel que utils.warp), crop sobre la imagen duplicada (paneo circular) y
+hflip/vflip (espejo); las disoluciones a xfade, los overlays de opacidad
+constante a overlay o blend (leyendo la versión ya redimensionada de
+utils.overlay_cache), el texto a un overlay del sprite en PNG y los fundidos
+a fade. El audio se mezcla igual que en el backend de moviepy
+(utils.audio_mixer) y se codifica en paralelo.
+
+Lo que no se puede expresar (subtítulos, keys, overlays con alpha en un modo
+de fusión, efectos sin equivalente, resolución sin fijar) se detecta antes
+con motivo_no_soportado y el render vuelve al backend de moviepy.
+"""
+from typing import List, Optional, Tuple
+import math
+import os
+import shutil
+import tempfile
+import time
+from PIL import Image
+from utils.audio_mixer import CodificadorAudio
+from utils.ffmpeg_tools import ejecutar_ffmpeg
+from utils.image_ingest import image_ingest_cache, margen_efecto
+from utils.overlay_cache import overlay_cache
+from utils.overlays import OverlayManager, normalizar_entrada_overlay
+from utils.render_profiles import RenderProfile, obtener_perfil
+from utils.text_render import text_sprite_cache
+from utils.timeline import FlatTimeline
+
+# Efectos de escena con equivalente en filtros de ffmpeg
+EFECTOS_FILTERGRAPH = ("zoom_in", "zoom_out", "kenburns", "pan_left", "pan_right", "mirror_x", "mirror_y")
+
+# Modos de fusión de utils.blend_modes -> modos del filtro blend
+MODOS_BLEND = {"screen": "screen", "add": "addition", "multiply": "multiply", "overlay": "overlay"}
+
+# Más entradas abiertas a la vez que esto (imágenes y overlays) se deja a moviepy
+MAX_ENTRADAS = 256
+
+
+def _numero(valor: float) -> str:
+    """Número para una expresión de ffmpeg, sin notación científica."""
+    return f"{float(valor):.6f}".rstrip("0").rstrip(".") or "0"
+
+
+def motivo_no_soportado(parametros_video: dict, perfil: RenderProfile) -> Optional[str]:
+    """
+    Motivo por el que el video no se puede compilar a un filtergraph, o None
+    si el backend de ffmpeg puede renderizarlo.
+    """
+    if perfil.tamano is None:
+        return "el perfil conserva el tamaño de cada imagen"
+    if parametros_video.get("captions"):
+        return "subtítulos incrustados"
+    if not parametros_video["images"]:
+        return "no hay imágenes"
+
+    for effect_name, _ in parametros_video.get("effects_sequence") or []:
+        if effect_name and effect_name not in EFECTOS_FILTERGRAPH:
+            return f"efecto {effect_name}"
+
+    entradas = len(parametros_video["images"])
+    overlay_sequence = parametros_video.get("overlay_sequence") or []
+    if overlay_sequence:
+        manager = OverlayManager()
+        for entrada in overlay_sequence:
+            overlay_name, _, _, _, blend_mode, key = normalizar_entrada_overlay(entrada)
+            if key:
+                return f"key en el overlay {overlay_name}"
+            ruta = os.path.join(manager.overlays_dir, overlay_name)
+            if blend_mode != "normal" and os.path.exists(ruta) and manager.has_alpha_channel(ruta):
+                return f"overlay {overlay_name} con alpha en modo {blend_mode}"
+        entradas += len(parametros_video["images"])
+    if entradas > MAX_ENTRADAS:
+        return f"{entradas} entradas (máximo {MAX_ENTRADAS})"
+    return None
+
+
+class FiltergraphRenderer:
+    """
+    Renderiza un video de imágenes con un único proceso de ffmpeg.
+
+    Args:
+        perfil: Perfil de render (resolución, fps y codificador)
+    """
+    def __init__(self, perfil: Optional[RenderProfile] = None):
+        self.perfil = obtener_perfil(perfil)
+        self.fps = self.perfil.fps
+
+    @staticmethod
+    def inicios(parametros_video: dict) -> Tuple[List[float], float]:
+        """Inicio de cada escena y solape entre escenas consecutivas (0 sin disolución)."""
+        n = len(parametros_video["images"])
+        solape = parametros_video["transition_duration"]
+        if n < 2 or solape <= 0 or parametros_video["transition_type"] != "dissolve":
+            solape = 0
+        inicios = FlatTimeline.inicios_disolucion([parametros_video["duration_per_image"]] * n, solape, avisar=False)
+        return inicios, solape
+
+    @staticmethod
+    def duracion(parametros_video: dict) -> float:
+        """Duración del video, la misma que daría la línea de tiempo de moviepy."""
+        inicios, _ = FiltergraphRenderer.inicios(parametros_video)
+        return inicios[-1] + parametros_video["duration_per_image"]
+
+    def _filtro_efecto(self, effect_name: Optional[str], params: dict, duracion: float) -> str:
+        """Cadena de filtros que convierte la imagen de la escena en sus frames a la resolución de salida."""
+        ancho, alto = self.perfil.tamano
+        frames = math.ceil(duracion * self.fps - 1e-6)
+        fps = _numero(self.fps)
+
+        if effect_name in ("zoom_in", "zoom_out", "kenburns"):
+            # Recorte subpíxel con perspective (zoompan solo admite recortes en
+            # píxeles enteros y el zoom tiembla). En perspective, in cuenta los
+            # frames desde 1
+            t = f"((in-1)/{fps})"
+            progreso = f"({t}/{_numero(duracion)})"
+            if effect_name == "kenburns":
+                zoom_start = params.get("zoom_start", 1.0)
+                zoom_end = params.get("zoom_end", 1.5)
+                pan_start = params.get("pan_start", (0, 0))
+                pan_end = params.get("pan_end", (0.2, 0.2))
+                # Igual que EfectosVideo.kenburns: el progreso va sobre la duración del efecto
+                progreso = f"({t}/{_numero(params.get('duration', 1.0))})"
+                zoom = f"({_numero(zoom_start)}+{_numero(zoom_end - zoom_start)}*{progreso})"
+                pan_x = f"({_numero(pan_start[0])}+{_numero(pan_end[0] - pan_start[0])}*{progreso})"
+                pan_y = f"({_numero(pan_start[1])}+{_numero(pan_end[1] - pan_start[1])}*{progreso})"
+                x0 = f"clip((W-W/{zoom})/2+{pan_x}*W\\,0\\,W-W/{zoom})"
+                y0 = f"clip((H-H/{zoom})/2+{pan_y}*H\\,0\\,H-H/{zoom})"
+            else:
+                zoom_factor = params.get("zoom_factor", 1.5)
+                if effect_name == "zoom_in":
+                    zoom = f"(1+{_numero(zoom_factor - 1)}*{progreso})"
+                else:
+                    zoom = f"({_numero(zoom_factor)}-{_numero(zoom_factor - 1)}*{progreso})"
+                x0, y0 = f"(W-W/{zoom})/2", f"(H-H/{zoom})/2"
+            # Como matriz_recorte: el píxel de salida x lee la fuente en
+            # x0 + (x + 0.5) * s - 0.5, con s = (W / zoom) / ancho. perspective
+            # produce un frame del tamaño de la fuente; las esquinas se extrapolan
+            # para que la esquina superior izquierda de ancho x alto sea el recorte
+            escala_x = f"(W/{zoom}/{ancho})"
+            escala_y = f"(H/{zoom}/{alto})"
+            izquierda = f"({x0}+0.5*{escala_x}-0.5)"
+            arriba = f"({y0}+0.5*{escala_y}-0.5)"
+            derecha = f"({izquierda}+W*{escala_x})"
+            abajo = f"({arriba}+H*{escala_y})"
+            esquinas = f"x0='{izquierda}':y0='{arriba}':x1='{derecha}':y1='{arriba}':" \
+                       f"x2='{izquierda}':y2='{abajo}':x3='{derecha}':y3='{abajo}'"
+            # En yuv420p el remuestreo cuesta la mitad que en RGB y queda a ~2 niveles de moviepy
+            return f"format=yuv420p,tpad=stop={frames - 1}:stop_mode=clone," \
+                   f"perspective={esquinas}:interpolation=linear:sense=source:eval=frame," \
+                   f"crop={ancho}:{alto}:0:0"
+
+        # Imagen fija: el único frame se repite durante toda la escena
+        filtros = []
+        if effect_name == "mirror_x":
+            filtros.append("hflip")
+        elif effect_name == "mirror_y":
+            filtros.append("vflip")
+        filtros.append(f"scale={ancho}:{alto}")
+        if effect_name in ("pan_left", "pan_right"):
+            # Desplazamiento circular como np.roll: la imagen junto a una copia de sí
+            # misma y un recorte que avanza int(distance * progreso * ancho) píxeles.
+            # En EfectosVideo pan_left y pan_right desplazan el frame en el mismo sentido
+            # En RGB planar y con exact=1: en yuv420p crop redondea x a un número par
+            filtros.append(f"format=gbrp,pad={2 * ancho}:{alto}:0:0,fillborders=right={ancho}:mode=wrap")
+            desplazamiento = f"trunc({_numero(params.get('distance', 0.5))}*n/{_numero(duracion * self.fps)}*{ancho})"
+            x = f"mod({desplazamiento}\\,{ancho})"
+            filtros.append(f"tpad=stop={frames - 1}:stop_mode=clone")
+            filtros.append(f"crop=w={ancho}:h={alto}:x='{x}':y=0:exact=1")
+        else:
+            filtros.append(f"tpad=stop={frames - 1}:stop_mode=clone")
+        return ",".join(filtros)
+
+    def compilar(self, parametros_video: dict, directorio: str) -> Tuple[List[str], str]:
+        """
+        Argumentos de entrada de ffmpeg y texto del filtergraph (con la salida en
+        [video]) para los parámetros de un render. Los archivos auxiliares
+        (el sprite del texto) se escriben en directorio.
+        """
+        ancho, alto = self.perfil.tamano
+        fps = _numero(self.fps)
+        images = parametros_video["images"]
+        duracion_escena = parametros_video["duration_per_image"]
+        effects_sequence = parametros_video.get("effects_sequence")
+        overlay_sequence = parametros_video.get("overlay_sequence")
+        overlay_manager = OverlayManager()
+
+        entradas = []
+        filtros = []
+
+        def anadir_entrada(args):
+            entradas.extend(args)
+            return (len([a for a in entradas if a == "-i"]) - 1)
+
+        for i, image_path in enumerate(images):
+            effect_name, effect_params = None, {}
+            if effects_sequence:
+                effect_name, effect_params = effects_sequence[i % len(effects_sequence)]
+
+            # La imagen ingerida se lee tal cual del .npy (sin su cabecera) como un frame RGB
+            pixeles = image_ingest_cache.obtener(image_path, (ancho, alto), margen_efecto(effect_name, effect_params))
+            alto_img, ancho_img = pixeles.shape[:2]
+            indice = anadir_entrada([
+                "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{ancho_img}x{alto_img}", "-framerate", fps,
+                "-skip_initial_bytes", str(pixeles.offset), "-i", os.path.abspath(pixeles.filename)
+            ])
+            escena = f"[{indice}:v]{self._filtro_efecto(effect_name, effect_params or {}, duracion_escena)}," \
+                     f"trim=duration={_numero(duracion_escena)},setsar=1"
+
+            if overlay_sequence:
+                overlay_name, opacity, _, _, blend_mode, _ = normalizar_entrada_overlay(
+                    overlay_sequence[i % len(overlay_sequence)]
+                )
+                overlay_path = os.path.join(overlay_manager.overlays_dir, overlay_name)
+                if not os.path.exists(overlay_path):
+                    print(f"[DEBUG] Overlay no encontrado: {overlay_path}")
+                else:
+                    has_alpha = overlay_manager.has_alpha_channel(overlay_path)
+                    ruta_lectura = overlay_cache.obtener(overlay_path, (ancho, alto), self.fps,
+                                                         pix_fmt="rgba" if has_alpha else "yuv420p")
+                    indice_overlay = anadir_entrada(["-i", os.path.abspath(ruta_lectura)])
+                    # Como el lector de moviepy: pasado su final se repite el último frame
+                    capa = f"[{indice_overlay}:v]tpad=stop=-1:stop_mode=clone," \
+                           f"trim=duration={_numero(duracion_escena)},setpts=PTS-STARTPTS"
+                    filtros.append(f"{escena}[base{i}]")
+                    if blend_mode in MODOS_BLEND:
+                        filtros.append(f"{capa},format=gbrp[capa{i}]")
+                        filtros.append(f"[base{i}]format=gbrp[fondo{i}]")
+                        escena = f"[fondo{i}][capa{i}]blend=all_mode={MODOS_BLEND[blend_mode]}:" \
+                                 f"all_opacity={_numero(opacity)}"
+                    else:
+                        filtros.append(f"{capa},format=rgba,colorchannelmixer=aa={_numero(opacity)}[capa{i}]")
+                        escena = f"[base{i}][capa{i}]overlay=eof_action=pass:format=auto"
+            # El overlay deja la base de tiempos del archivo del overlay y xfade
+            # exige la misma en las dos entradas: se vuelve a la de los frames
+            filtros.append(f"{escena},settb=1/{fps},format=yuv420p[escena{i}]")
+
+        # Transiciones: xfade en cada ventana de disolución o concatenación seca
+        inicios, solape = self.inicios(parametros_video)
+        if len(images) == 1:
+            actual = "[escena0]"
+        elif solape > 0:
+            actual = "[escena0]"
+            for i in range(1, len(images)):
+                fin_anterior = inicios[i - 1] + duracion_escena
+                salida = f"[disolucion{i}]"
+                filtros.append(f"{actual}[escena{i}]xfade=transition=fade:"
+                               f"duration={_numero(fin_anterior - inicios[i])}:offset={_numero(inicios[i])}{salida}")
+                actual = salida
+        else:
+            etiquetas = "".join(f"[escena{i}]" for i in range(len(images)))
+            filtros.append(f"{etiquetas}concat=n={len(images)}:v=1:a=0[concatenado]")
+            actual = "[concatenado]"
+
+        # Texto: el mismo sprite que el backend de moviepy, sobre todo el video
+        text = parametros_video.get("text")
+        if text:
+            sprite = text_sprite_cache.obtener(text, size=parametros_video["text_size"],
+                                               color=parametros_video["text_color"], max_width=int(ancho * 0.9))
+            ruta_texto = os.path.join(directorio, "texto.png")
+            Image.fromarray(sprite.rgba, "RGBA").save(ruta_texto)
+            indice_texto = anadir_entrada(["-i", ruta_texto])
+            x, y = sprite.posicion((ancho, alto), parametros_video["text_position"])
+            filtros.append(f"{actual}[{indice_texto}:v]overlay=x={x}:y={y}:format=auto[con_texto]")
+            actual = "[con_texto]"
+
+        # Fundidos de entrada y salida
+        duracion = self.duracion(parametros_video)
+        fade_in = parametros_video.get("fade_in_duration") or 0
+        fade_out = parametros_video.get("fade_out_duration") or 0
+        # El overlay del texto deja el video en yuva420p, y fade sobre ese
+        # formato no sigue la rampa lineal de EfectosVideo: se vuelve a yuv420p
+        fundidos = ["format=yuv420p"]
+        # Por número de frame, como EfectosVideo: el frame k de un fundido de n frames lleva k/n
+        total = int(duracion * self.fps)
+        if fade_in > 0:
+            fundidos.append(f"fade=t=in:s=0:n={max(1, round(fade_in * self.fps))}")
+        if fade_out > 0:
+            frames_salida = max(1, round(fade_out * self.fps))
+            fundidos.append(f"fade=t=out:s={max(0, total - frames_salida)}:n={frames_salida}")
+        fundidos.append(f"trim=duration={_numero(duracion)}")
+        filtros.append(f"{actual}{','.join(fundidos)}[video]")
+
+        return entradas, ";\n".join(filtros)
+
+    def render(self, parametros_video: dict, output_path: str, audio=None) -> dict:
+        """
+        Renderiza el video de parametros_video en output_path con un solo
+        ffmpeg; audio (un AudioClip, p. ej. la mezcla de utils.audio_mixer) se
+        codifica mientras tanto y se une sin recodificar. Devuelve las medidas.
+        """
+        directorio = tempfile.mkdtemp(prefix="render_filtergraph_")
+        inicio = time.perf_counter()
+        codificador = CodificadorAudio(audio, directorio, self.perfil) if audio is not None else None
+        try:
+            entradas, filtergraph = self.compilar(parametros_video, directorio)
+            ruta_filtergraph = os.path.join(directorio, "filtergraph.txt")
+            with open(ruta_filtergraph, "w", encoding="utf8") as f:
+                f.write(filtergraph)
+            print(f"[DEBUG] Filtergraph de {len(parametros_video['images'])} escenas en {ruta_filtergraph}")
+
+            ruta_video = output_path
+            if codificador is not None:
+                ruta_video = os.path.join(directorio, f"video.{self.perfil.extension}")
+            salida = ["-map", "[video]", "-c:v", self.perfil.codec, "-r", _numero(self.fps)]
+            if self.perfil.preset:
+                salida += ["-preset", self.perfil.preset]
+            if self.perfil.threads:
+                salida += ["-threads", str(self.perfil.threads)]
+            salida += self.perfil.ffmpeg_params(final=codificador is None)
+            ejecutar_ffmpeg(entradas + ["-filter_complex_script", ruta_filtergraph] + salida + [ruta_video],
+                            "Render con filtergraph")
+
+            if codificador is not None:
+                ruta_audio = codificador.esperar()
+                codificador = None
+                args = ["-i", ruta_video, "-i", ruta_audio, "-map", "0:v:0", "-map", "1:a:0", "-c", "copy"]
+                if self.perfil.faststart and self.perfil.container in ("mp4", "mov"):
+                    args += ["-movflags", "+faststart"]
+                ejecutar_ffmpeg(args + [output_path], "Unión de audio y video")
+        finally:
+            if codificador is not None:
+                codificador.cancelar()
+            shutil.rmtree(directorio, ignore_errors=True)
+
+        total = time.perf_counter() - inicio
+        frames = int(self.duracion(parametros_video) * self.fps)
+        print(f"[DEBUG] Render con filtergraph terminado en {total:.1f}s ({frames / total:.1f} fps)")
+        return {"frames": frames, "segundos": total}
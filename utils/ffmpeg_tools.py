@@ -0,0 +1,37 @@
+from moviepy.config import FFMPEG_BINARY
+import re
+import subprocess
+from typing import List, Optional
+
+
+def ejecutar_ffmpeg(args: List[str], descripcion: str = "ffmpeg") -> None:
+    """
+    Ejecuta ffmpeg (el mismo binario que usa moviepy) con los argumentos dados.
+    Lanza IOError con la salida de error si el proceso falla.
+    """
+    comando = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y"] + list(args)
+    resultado = subprocess.run(comando, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if resultado.returncode != 0:
+        error = resultado.stderr.decode("utf8", errors="ignore").strip()
+        raise IOError(f"{descripcion} falló (código {resultado.returncode}): {error}")
+
+
+def info_stream_video(path: str) -> dict:
+    """
+    Lee el códec y el formato de píxel del primer stream de video
+    a partir de la cabecera que imprime 'ffmpeg -i' (sin decodificar frames).
+    """
+    comando = [FFMPEG_BINARY, "-hide_banner", "-i", path]
+    resultado = subprocess.run(comando, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    cabecera = resultado.stderr.decode("utf8", errors="ignore")
+    coincidencia = re.search(r"Stream #.*?Video: (\w+)[^,]*, (\w+)", cabecera)
+    if not coincidencia:
+        return {"codec": None, "pix_fmt": None}
+    return {"codec": coincidencia.group(1), "pix_fmt": coincidencia.group(2)}
+
+
+def pix_fmt_con_alpha(pix_fmt: Optional[str]) -> bool:
+    """Indica si un formato de píxel de ffmpeg incluye canal alpha."""
+    if not pix_fmt:
+        return False
+    return bool(re.match(r"(yuva|rgba|argb|bgra|abgr|gbrap|ya8|ya16)", pix_fmt))
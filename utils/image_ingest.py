@@ -0,0 +1,135 @@
+"""
+Ingesta de imágenes: orientación EXIF, encaje en la resolución del render y
+caché de píxeles ya decodificados.
+
+ImageClip(ruta) decodifica cada imagen a su resolución completa y la guarda en
+memoria: con fotos de móvil de 4000 px, un proyecto de 200 imágenes ocupa
+gigas antes de codificar el primer frame. Aquí cada imagen se decodifica una
+sola vez (los JPEG en modo borrador, que reduce la escala durante la
+decodificación), se orienta según su EXIF, se encaja en la resolución de
+salida más el margen que necesite su efecto (zoom, Ken Burns) y se guarda como
+.npy bajo el hash de su contenido. Los renders leen ese archivo mapeado en
+memoria: el sistema carga y libera las páginas según se usan.
+"""
+from typing import Optional, Tuple
+import math
+import os
+import threading
+import uuid
+import numpy as np
+from PIL import Image, ImageOps
+from utils.overlay_cache import overlay_cache, evictar_lru
+from utils.warp import encajar_frame
+
+# Cambiar al modificar la ingesta para invalidar las imágenes guardadas
+VERSION_INGESTA = 1
+
+# Margen máximo sobre la resolución de salida (un zoom x2 ya duplica cada lado)
+MARGEN_MAXIMO = 2.0
+
+# Orientaciones EXIF que giran la imagen 90 grados (intercambian ancho y alto)
+ORIENTACIONES_GIRADAS = (5, 6, 7, 8)
+
+
+def margen_efecto(effect_name: Optional[str], effect_params: Optional[dict] = None) -> float:
+    """Factor de ampliación máximo que aplica el efecto sobre la imagen (1.0 si no amplía)."""
+    params = effect_params or {}
+    if effect_name in ("zoom_in", "zoom_out"):
+        margen = params.get("zoom_factor", 1.5)
+    elif effect_name == "kenburns":
+        margen = max(params.get("zoom_start", 1.0), params.get("zoom_end", 1.5))
+    else:
+        margen = 1.0
+    return float(min(max(margen, 1.0), MARGEN_MAXIMO))
+
+
+def tamano_lienzo(tamano_fuente: Tuple[int, int], tamano: Tuple[int, int], margen: float) -> Tuple[int, int]:
+    """
+    Tamaño en el que se guarda la imagen: la resolución de salida por el margen,
+    sin pasar del margen que la fuente puede dar sin ampliarse.
+    """
+    fuente_w, fuente_h = tamano_fuente
+    ancho, alto = tamano
+    escala_encaje = min(ancho / fuente_w, alto / fuente_h)
+    margen = max(1.0, min(margen, 1.0 / escala_encaje))
+    return int(round(ancho * margen)), int(round(alto * margen))
+
+
+def decodificar_imagen(path: str, tamano: Optional[Tuple[int, int]] = None, margen: float = 1.0) -> np.ndarray:
+    """
+    Decodifica la imagen orientada según su EXIF y, con tamano, encajada
+    (letterbox) en el tamaño de salida por el margen. Array RGB uint8.
+    """
+    with Image.open(path) as imagen:
+        try:
+            orientacion = imagen.getexif().get(0x0112, 1)
+        except Exception:
+            orientacion = 1
+        ancho_fuente, alto_fuente = imagen.size
+        if orientacion in ORIENTACIONES_GIRADAS:
+            ancho_fuente, alto_fuente = alto_fuente, ancho_fuente
+
+        lienzo = tamano_lienzo((ancho_fuente, alto_fuente), tamano, margen) if tamano else None
+        if lienzo and imagen.format == "JPEG":
+            # El decodificador JPEG reduce a 1/2, 1/4 u 1/8 sin bajar del tamaño pedido
+            escala = min(lienzo[0] / ancho_fuente, lienzo[1] / alto_fuente)
+            pedido = (math.ceil(ancho_fuente * escala), math.ceil(alto_fuente * escala))
+            if orientacion in ORIENTACIONES_GIRADAS:
+                pedido = pedido[::-1]
+            imagen.draft("RGB", pedido)
+        imagen = ImageOps.exif_transpose(imagen)
+        pixeles = np.asarray(imagen.convert("RGB"))
+    if lienzo:
+        pixeles = encajar_frame(pixeles, lienzo)
+    return np.ascontiguousarray(pixeles)
+
+
+class ImageIngestCache:
+    """
+    Imágenes ya decodificadas y encajadas, guardadas como .npy bajo el hash de su
+    contenido, el tamaño de salida y el margen. Se devuelven mapeadas en memoria
+    y de solo lectura. La caché tiene un tamaño máximo y expulsa primero las
+    usadas hace más tiempo.
+    """
+    def __init__(self, cache_dir: str = os.path.join("cache", "images"), max_bytes: int = 4 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def ruta(self, path: str, tamano: Optional[Tuple[int, int]], margen: float) -> str:
+        tamano_texto = f"{tamano[0]}x{tamano[1]}" if tamano else "src"
+        nombre = f"{overlay_cache.hash_contenido(path)[:32]}_{tamano_texto}_m{margen:g}_v{VERSION_INGESTA}.npy"
+        return os.path.join(self.cache_dir, nombre)
+
+    def obtener(self, path: str, tamano: Optional[Tuple[int, int]] = None, margen: float = 1.0) -> np.ndarray:
+        """
+        Píxeles RGB de la imagen encajados en tamano (ancho, alto) por el margen,
+        decodificándola solo si no está en caché. Sin tamano se conserva el de la fuente.
+        """
+        destino = self.ruta(path, tamano, margen)
+        if os.path.exists(destino):
+            try:
+                pixeles = np.load(destino, mmap_mode="r")
+                # Marcar como usada recientemente para la política LRU
+                os.utime(destino, None)
+                return pixeles
+            except (OSError, ValueError) as e:
+                print(f"[DEBUG] Imagen en caché ilegible {destino}: {e}")
+
+        pixeles = decodificar_imagen(path, tamano, margen)
+        print(f"[DEBUG] Imagen {path} decodificada a {pixeles.shape[1]}x{pixeles.shape[0]} para la caché")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Temporal y renombrado: dos renders (o procesos) simultáneos no se pisan
+        temporal = f"{destino}.{uuid.uuid4().hex}.tmp.npy"
+        np.save(temporal, pixeles)
+        os.replace(temporal, destino)
+        self.evictar()
+        return np.load(destino, mmap_mode="r")
+
+    def evictar(self):
+        with self._lock:
+            evictar_lru(self.cache_dir, self.max_bytes)
+
+
+# Caché de imágenes compartida por todos los renders del proceso
+image_ingest_cache = ImageIngestCache()
@@ -0,0 +1,156 @@
+"""
+Chroma key y luma key para overlays sin canal alpha.
+
+La máscara se calcula de forma vectorizada a partir del frame del overlay y se
+memoiza por índice de frame: un overlay que se repite en cada escena solo se
+procesa una vez por render. Opcionalmente las máscaras se guardan en la caché
+de overlays en disco para reutilizarlas entre renders.
+"""
+from collections import OrderedDict
+from typing import Optional, Tuple
+import hashlib
+import json
+import os
+import threading
+import cv2
+import numpy as np
+from utils.overlay_cache import overlay_cache
+
+MODOS_KEY = ["chroma", "luma"]
+
+KEY_POR_DEFECTO = {
+    "chroma": {"mode": "chroma", "color": (0, 255, 0), "tolerance": 0.25, "softness": 0.1},
+    "luma": {"mode": "luma", "threshold": 0.1, "softness": 0.1, "invert": False},
+}
+
+
+def _rampa(valor, inicio, ancho):
+    """Rampa lineal 0..255 entre inicio e inicio + ancho (float32 -> uint8)."""
+    if ancho <= 0:
+        return np.where(valor >= inicio, 255, 0).astype(np.uint8)
+    alpha = (valor - inicio) * (255.0 / ancho)
+    np.clip(alpha, 0, 255, out=alpha)
+    return alpha.astype(np.uint8)
+
+
+def mascara_chroma(frame: np.ndarray, color=(0, 255, 0), tolerance: float = 0.25, softness: float = 0.1) -> np.ndarray:
+    """
+    Alpha (uint8) que elimina los píxeles cercanos a color.
+    La distancia se mide en el plano de crominancia (Cr, Cb), así que las
+    sombras y brillos del fondo verde se eliminan igual que el tono plano.
+    """
+    ycrcb = cv2.cvtColor(np.ascontiguousarray(frame), cv2.COLOR_RGB2YCrCb)
+    clave = cv2.cvtColor(np.uint8([[color]]), cv2.COLOR_RGB2YCrCb)[0, 0]
+    d_cr = ycrcb[:, :, 1].astype(np.float32) - float(clave[1])
+    d_cb = ycrcb[:, :, 2].astype(np.float32) - float(clave[2])
+    distancia = cv2.magnitude(d_cr, d_cb)
+    # La distancia máxima en el plano de crominancia ronda 180
+    return _rampa(distancia, tolerance * 180.0, softness * 180.0)
+
+
+def mascara_luma(frame: np.ndarray, threshold: float = 0.1, softness: float = 0.1, invert: bool = False) -> np.ndarray:
+    """
+    Alpha (uint8) según la luminancia: elimina los píxeles oscuros
+    (o los claros con invert=True), útil para overlays sobre fondo negro.
+    """
+    luma = cv2.cvtColor(np.ascontiguousarray(frame), cv2.COLOR_RGB2GRAY).astype(np.float32)
+    if invert:
+        luma = 255.0 - luma
+    return _rampa(luma, threshold * 255.0, softness * 255.0)
+
+
+def calcular_mascara(frame: np.ndarray, key: dict) -> np.ndarray:
+    if key["mode"] == "chroma":
+        return mascara_chroma(frame, tuple(key.get("color", (0, 255, 0))),
+                              key.get("tolerance", 0.25), key.get("softness", 0.1))
+    return mascara_luma(frame, key.get("threshold", 0.1), key.get("softness", 0.1), key.get("invert", False))
+
+
+def firma_key(key: dict) -> str:
+    """Identificador estable de los parámetros del key."""
+    return hashlib.sha1(json.dumps(key, sort_keys=True, default=list).encode("utf8")).hexdigest()[:12]
+
+
+class KeyMaskCache:
+    """
+    Memoria de máscaras por (overlay, parámetros del key, índice de frame),
+    limitada en bytes y con expulsión LRU. Con disk_dir, las máscaras se
+    guardan también en disco para los renders siguientes.
+
+    max_bytes es el límite mínimo; reservar lo sube hasta que quepan todas las
+    máscaras de cada overlay con key (un overlay que se repite no vuelve a
+    calcular las de su primera vuelta), sin pasar de max_bytes_reservables. Por
+    encima de ese techo (p. ej. más de ~1000 frames a 1080p) las máscaras más
+    antiguas se expulsan y se recalculan, o se leen del disco si se persisten.
+    """
+    def __init__(self, max_bytes: int = 512 * 1024 ** 2, disk_dir: Optional[str] = None,
+                 max_bytes_reservables: int = 2 * 1024 ** 3):
+        self.max_bytes = max_bytes
+        self.max_bytes_reservables = max_bytes_reservables
+        self.disk_dir = disk_dir
+        self._reservas = {}  # (origen, firma, tamaño) -> bytes de todas sus máscaras
+        self._mascaras = OrderedDict()
+        self._bytes = 0
+        self._guardadas = 0
+        self._lock = threading.Lock()
+
+    @property
+    def limite(self) -> int:
+        """Bytes que pueden ocupar las máscaras en memoria."""
+        return max(self.max_bytes, min(sum(self._reservas.values()), self.max_bytes_reservables))
+
+    def reservar(self, origen: str, key: dict, frames: int, tamano: Tuple[int, int]):
+        """Sube el límite para que quepan las máscaras de los frames del overlay origen a tamano (ancho, alto)."""
+        with self._lock:
+            self._reservas[(origen, firma_key(key), tuple(tamano))] = frames * tamano[0] * tamano[1]
+
+    def _ruta_disco(self, clave):
+        origen, firma, indice, tamano = clave
+        nombre = hashlib.sha1(origen.encode("utf8")).hexdigest()[:16]
+        return os.path.join(self.disk_dir, f"key_{nombre}_{firma}_{tamano[0]}x{tamano[1]}_{indice}.npy")
+
+    def obtener(self, origen: str, key: dict, indice: int, frame: np.ndarray, persistir: bool = False) -> np.ndarray:
+        """
+        Devuelve la máscara del frame indice del overlay origen, calculándola
+        solo la primera vez.
+        """
+        clave = (origen, firma_key(key), indice, (frame.shape[1], frame.shape[0]))
+        with self._lock:
+            mascara = self._mascaras.get(clave)
+            if mascara is not None:
+                self._mascaras.move_to_end(clave)
+                return mascara
+
+        ruta = self._ruta_disco(clave) if (persistir and self.disk_dir) else None
+        mascara = None
+        if ruta and os.path.exists(ruta):
+            try:
+                mascara = np.load(ruta)
+                os.utime(ruta, None)
+            except (OSError, ValueError):
+                mascara = None
+        if mascara is None:
+            mascara = calcular_mascara(frame, key)
+            if ruta:
+                os.makedirs(self.disk_dir, exist_ok=True)
+                temporal = f"{ruta}.{os.getpid()}.tmp.npy"
+                np.save(temporal, mascara)
+                os.replace(temporal, ruta)
+                # Las máscaras comparten el límite de tamaño de la caché de overlays
+                self._guardadas += 1
+                if self._guardadas % 64 == 0:
+                    overlay_cache.evictar()
+        mascara.flags.writeable = False
+
+        with self._lock:
+            if clave not in self._mascaras:
+                self._mascaras[clave] = mascara
+                self._bytes += mascara.nbytes
+                while self._bytes > self.limite and len(self._mascaras) > 1:
+                    _, expulsada = self._mascaras.popitem(last=False)
+                    self._bytes -= expulsada.nbytes
+        return mascara
+
+
+# Memoria de máscaras compartida; en disco junto a la caché de overlays
+key_mask_cache = KeyMaskCache(disk_dir=overlay_cache.cache_dir)
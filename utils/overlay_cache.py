@@ -0,0 +1,124 @@
+from typing import Optional, Tuple
+import hashlib
+import os
+import threading
+import uuid
+from utils.ffmpeg_tools import ejecutar_ffmpeg
+
+# Formatos intermedios de decodificación rápida por formato de píxel
+FORMATOS_INTERMEDIOS = {
+    # H.264 intra-rápido: sin B-frames ni CABAC, decodifica mucho más rápido
+    "yuv420p": ("mp4", ["-c:v", "libx264", "-preset", "ultrafast", "-tune", "fastdecode",
+                        "-crf", "12", "-pix_fmt", "yuv420p"]),
+    # QuickTime RLE conserva el canal alpha
+    "rgba": ("mov", ["-c:v", "qtrle", "-pix_fmt", "argb"]),
+}
+
+
+class OverlayCache:
+    """
+    Caché en disco de overlays ya redimensionados.
+
+    Cada overlay se transcodifica una sola vez por (resolución, fps, formato de píxel)
+    a un intermedio de decodificación rápida, guardado bajo el hash de su contenido.
+    La caché tiene un tamaño máximo y expulsa primero los archivos usados hace más tiempo.
+    """
+    def __init__(self, cache_dir: str = os.path.join("cache", "overlays"), max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._hashes = {}  # (ruta, mtime, tamaño) -> hash del contenido
+        self._lock = threading.Lock()
+
+    def hash_contenido(self, path: str) -> str:
+        """Hash SHA-256 del archivo, memoizado mientras no cambie en disco."""
+        stat = os.stat(path)
+        clave = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        if clave not in self._hashes:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for bloque in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(bloque)
+            self._hashes[clave] = digest.hexdigest()
+        return self._hashes[clave]
+
+    def ruta_cache(self, path: str, tamano: Tuple[int, int], fps: Optional[float], pix_fmt: str) -> str:
+        extension, _ = FORMATOS_INTERMEDIOS[pix_fmt]
+        fps_texto = "src" if fps is None else f"{fps:g}"
+        nombre = f"{self.hash_contenido(path)[:32]}_{tamano[0]}x{tamano[1]}_{fps_texto}_{pix_fmt}.{extension}"
+        return os.path.join(self.cache_dir, nombre)
+
+    def obtener(
+        self,
+        path: str,
+        tamano: Tuple[int, int],
+        fps: Optional[float] = None,
+        pix_fmt: str = "yuv420p"
+    ) -> str:
+        """
+        Devuelve la ruta del overlay redimensionado a tamano (ancho, alto) y fps,
+        transcodificándolo si no está en caché. Si la transcodificación falla
+        devuelve la ruta original.
+        """
+        try:
+            destino = self.ruta_cache(path, tamano, fps, pix_fmt)
+        except (OSError, KeyError) as e:
+            print(f"[DEBUG] Caché de overlays no disponible para {path}: {e}")
+            return path
+
+        if os.path.exists(destino):
+            # Marcar como usado recientemente para la política LRU
+            os.utime(destino, None)
+            return destino
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        _, codec_args = FORMATOS_INTERMEDIOS[pix_fmt]
+        filtros = f"scale={tamano[0]}:{tamano[1]}:flags=bilinear"
+        if fps is not None:
+            filtros += f",fps={fps:g}"
+        # Se escribe en un temporal y se renombra: dos renders simultáneos no se pisan
+        temporal = f"{destino}.{uuid.uuid4().hex}.tmp.{FORMATOS_INTERMEDIOS[pix_fmt][0]}"
+        try:
+            print(f"[DEBUG] Transcodificando overlay {path} a {tamano[0]}x{tamano[1]} para la caché")
+            ejecutar_ffmpeg(["-i", path, "-an", "-vf", filtros] + codec_args + [temporal],
+                            descripcion="Transcodificación de overlay")
+            os.replace(temporal, destino)
+        except Exception as e:
+            print(f"[DEBUG] Error al cachear overlay {path}: {e}")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return path
+
+        self.evictar()
+        return destino
+
+    def evictar(self):
+        """Borra los archivos menos usados hasta quedar por debajo de max_bytes."""
+        with self._lock:
+            evictar_lru(self.cache_dir, self.max_bytes)
+
+
+def evictar_lru(directorio: str, max_bytes: int):
+    """
+    Borra los archivos de directorio usados hace más tiempo (por mtime) hasta
+    quedar por debajo de max_bytes. Ignora los temporales en escritura.
+    """
+    if not os.path.isdir(directorio):
+        return
+    archivos = []
+    for entrada in os.scandir(directorio):
+        if entrada.is_file() and ".tmp." not in entrada.name:
+            stat = entrada.stat()
+            archivos.append((stat.st_mtime, stat.st_size, entrada.path))
+    total = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, ruta in sorted(archivos):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(ruta)
+            total -= tamano
+        except OSError as e:
+            print(f"[DEBUG] No se pudo expulsar {ruta} de la caché: {e}")
+
+
+# Caché compartida por todos los renders del proceso
+overlay_cache = OverlayCache()
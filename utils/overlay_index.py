@@ -0,0 +1,156 @@
+from typing import Dict, List, Optional
+import json
+import os
+import threading
+import cv2
+from utils.ffmpeg_tools import info_stream_video, pix_fmt_con_alpha
+
+EXTENSIONES_OVERLAY = ('.mp4', '.mov', '.avi', '.webm')
+
+
+class OverlayIndex:
+    """
+    Índice persistente de metadatos de los overlays de un directorio.
+
+    Guarda por archivo su duración, resolución, fps, códec, presencia de alpha,
+    una miniatura y el mtime/tamaño con que se analizó. Al refrescar solo se
+    vuelven a analizar los archivos que cambiaron, así que la interfaz y el
+    render leen los metadatos sin abrir los videos.
+    """
+    _instancias = {}
+    _lock_instancias = threading.Lock()
+
+    def __init__(self, overlays_dir: str, cache_dir: str = "cache"):
+        self.overlays_dir = overlays_dir
+        clave = os.path.basename(os.path.abspath(overlays_dir))
+        self.index_path = os.path.join(cache_dir, f"overlay_index_{clave}.json")
+        self.thumbnails_dir = os.path.join(cache_dir, "overlay_thumbnails")
+        self._entradas = self._cargar()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def para_directorio(cls, overlays_dir: str) -> "OverlayIndex":
+        """Devuelve el índice del directorio, compartido en todo el proceso."""
+        clave = os.path.abspath(overlays_dir)
+        with cls._lock_instancias:
+            if clave not in cls._instancias:
+                cls._instancias[clave] = cls(overlays_dir)
+            return cls._instancias[clave]
+
+    def _cargar(self) -> Dict[str, dict]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[DEBUG] Índice de overlays ilegible, se reconstruye: {e}")
+            return {}
+
+    def _guardar(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        temporal = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self._entradas, f, indent=2)
+        os.replace(temporal, self.index_path)
+
+    def _analizar(self, nombre: str, path: str, stat) -> dict:
+        """Extrae los metadatos de un overlay (solo se hace cuando cambia el archivo)."""
+        entrada = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "duration": None,
+            "width": None,
+            "height": None,
+            "fps": None,
+            "codec": None,
+            "pix_fmt": None,
+            "has_alpha": False,
+            "thumbnail": None,
+        }
+        cap = cv2.VideoCapture(path)
+        try:
+            if cap.isOpened():
+                fps = cap.get(cv2.CAP_PROP_FPS) or None
+                frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+                entrada["fps"] = fps
+                entrada["width"] = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                entrada["height"] = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                if fps and frames > 0:
+                    entrada["duration"] = frames / fps
+                    # Miniatura del frame central
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, int(frames // 2))
+                ret, frame = cap.read()
+                if ret:
+                    os.makedirs(self.thumbnails_dir, exist_ok=True)
+                    alto, ancho = frame.shape[:2]
+                    miniatura = cv2.resize(frame, (160, max(1, int(alto * 160 / ancho))), interpolation=cv2.INTER_AREA)
+                    ruta_miniatura = os.path.join(self.thumbnails_dir, f"{os.path.splitext(nombre)[0]}_{stat.st_mtime_ns}.jpg")
+                    cv2.imwrite(ruta_miniatura, miniatura)
+                    entrada["thumbnail"] = ruta_miniatura
+        finally:
+            cap.release()
+
+        info = info_stream_video(path)
+        entrada["codec"] = info["codec"]
+        entrada["pix_fmt"] = info["pix_fmt"]
+        entrada["has_alpha"] = pix_fmt_con_alpha(info["pix_fmt"])
+        return entrada
+
+    def _reanalizar(self, nombre: str, path: str, stat):
+        anterior = self._entradas.get(nombre)
+        self._entradas[nombre] = self._analizar(nombre, path, stat)
+        # La miniatura de la versión anterior del archivo ya no sirve
+        miniatura = anterior.get("thumbnail") if anterior else None
+        if miniatura and miniatura != self._entradas[nombre]["thumbnail"] and os.path.exists(miniatura):
+            os.remove(miniatura)
+
+    def _vigente(self, nombre: str, stat) -> bool:
+        entrada = self._entradas.get(nombre)
+        return entrada is not None and entrada["mtime"] == stat.st_mtime_ns and entrada["size"] == stat.st_size
+
+    def refrescar(self) -> Dict[str, dict]:
+        """
+        Sincroniza el índice con el directorio: analiza los archivos nuevos o
+        modificados y elimina los borrados. Los demás no se tocan.
+        """
+        if not os.path.isdir(self.overlays_dir):
+            return {}
+        with self._lock:
+            cambiado = False
+            presentes = set()
+            for archivo in os.scandir(self.overlays_dir):
+                if not archivo.is_file() or not archivo.name.endswith(EXTENSIONES_OVERLAY):
+                    continue
+                presentes.add(archivo.name)
+                stat = archivo.stat()
+                if not self._vigente(archivo.name, stat):
+                    print(f"[DEBUG] Analizando overlay para el índice: {archivo.name}")
+                    self._reanalizar(archivo.name, archivo.path, stat)
+                    cambiado = True
+            for nombre in list(self._entradas):
+                if nombre not in presentes:
+                    miniatura = self._entradas.pop(nombre).get("thumbnail")
+                    if miniatura and os.path.exists(miniatura):
+                        os.remove(miniatura)
+                    cambiado = True
+            if cambiado:
+                self._guardar()
+            return dict(self._entradas)
+
+    def obtener(self, nombre: str) -> Optional[dict]:
+        """Metadatos de un overlay; solo lo reanaliza si cambió en disco."""
+        path = os.path.join(self.overlays_dir, nombre)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            if not self._vigente(nombre, stat):
+                self._reanalizar(nombre, path, stat)
+                self._guardar()
+            return self._entradas[nombre]
+
+    def nombres(self) -> List[str]:
+        """Nombres de los overlays indexados, tras refrescar."""
+        return sorted(self.refrescar())
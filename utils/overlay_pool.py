@@ -0,0 +1,116 @@
+from moviepy.editor import VideoFileClip
+from collections import OrderedDict
+from contextlib import contextmanager
+import atexit
+import os
+import threading
+
+
+class OverlayReaderPool:
+    """
+    Pool de lectores de overlays (VideoFileClip) compartido en el proceso.
+
+    Cada lector es un subproceso de ffmpeg; en lugar de abrir uno por imagen,
+    los lectores se prestan a una sesión (un render) y al terminar vuelven al
+    pool, donde pueden reutilizarse en renders posteriores. Un lector solo lo
+    usa una sesión a la vez. Los lectores inactivos por encima de
+    max_inactivos se cierran empezando por el menos usado recientemente.
+    """
+    def __init__(self, max_inactivos: int = 8):
+        self.max_inactivos = max_inactivos
+        self._inactivos = OrderedDict()  # id(clip) -> (clave, clip)
+        self._en_uso = {}  # id(clip) -> (clave, clip)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clave(path: str, has_mask: bool = False):
+        # Si el archivo se reemplaza en disco, el lector antiguo deja de servir. No se
+        # usa el mtime: la caché de overlays lo actualiza en cada uso (LRU)
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_ino, stat.st_size, has_mask)
+
+    def adquirir(self, path: str, has_mask: bool = False) -> VideoFileClip:
+        """
+        Presta un lector para el overlay, reutilizando uno inactivo si existe.
+        Con has_mask=True el lector decodifica RGBA y expone el alpha en clip.mask.
+        """
+        clave = self._clave(path, has_mask)
+        with self._lock:
+            for identificador, (clave_lector, clip) in self._inactivos.items():
+                if clave_lector == clave:
+                    del self._inactivos[identificador]
+                    self._en_uso[identificador] = (clave, clip)
+                    return clip
+
+        # Los overlays no aportan audio: no se abre el lector de audio
+        clip = VideoFileClip(path, audio=False, has_mask=has_mask)
+        with self._lock:
+            self._en_uso[id(clip)] = (clave, clip)
+        return clip
+
+    def liberar(self, clip: VideoFileClip):
+        """Devuelve un lector al pool y cierra los inactivos que sobren."""
+        a_cerrar = []
+        with self._lock:
+            entrada = self._en_uso.pop(id(clip), None)
+            if entrada is None:
+                return
+            self._inactivos[id(clip)] = entrada
+            while len(self._inactivos) > self.max_inactivos:
+                _, (_, sobrante) = self._inactivos.popitem(last=False)
+                a_cerrar.append(sobrante)
+        for sobrante in a_cerrar:
+            sobrante.close()
+
+    def cerrar_todo(self):
+        """Cierra todos los lectores, en uso o no."""
+        with self._lock:
+            clips = [clip for _, clip in self._inactivos.values()]
+            clips += [clip for _, clip in self._en_uso.values()]
+            self._inactivos.clear()
+            self._en_uso.clear()
+        for clip in clips:
+            try:
+                clip.close()
+            except Exception as e:
+                print(f"Error al cerrar overlay: {e}")
+
+    @contextmanager
+    def sesion(self):
+        """
+        Abre una sesión de lectores para un render. Todos los lectores
+        obtenidos en la sesión se devuelven al pool al salir, aunque haya error.
+        """
+        sesion = SesionLectores(self)
+        try:
+            yield sesion
+        finally:
+            sesion.cerrar()
+
+
+class SesionLectores:
+    """Lectores prestados a un render, identificados por (ruta, ranura)."""
+    def __init__(self, pool: OverlayReaderPool):
+        self.pool = pool
+        self._lectores = {}
+
+    def obtener(self, path: str, slot: int = 0, has_mask: bool = False) -> VideoFileClip:
+        """
+        Devuelve el lector de la ranura indicada para el overlay.
+        Escenas que se solapan (disolución) deben usar ranuras distintas para
+        no obligar al lector a saltar hacia atrás en cada frame.
+        """
+        clave = (path, slot, has_mask)
+        if clave not in self._lectores:
+            self._lectores[clave] = self.pool.adquirir(path, has_mask)
+        return self._lectores[clave]
+
+    def cerrar(self):
+        for clip in self._lectores.values():
+            self.pool.liberar(clip)
+        self._lectores.clear()
+
+
+# Pool compartido por todos los renders del proceso
+overlay_pool = OverlayReaderPool()
+atexit.register(overlay_pool.cerrar_todo)
@@ -5,29 +5,61 @@ import os
 from PIL import Image
 import cv2
 import numpy as np
+from utils.overlay_pool import overlay_pool, OverlayReaderPool, SesionLectores
+from utils.overlay_cache import overlay_cache
+from utils.overlay_index import OverlayIndex
+from utils.compositor import CapaOverlay, OverlayCompositor
+
+# Resultado de has_alpha_channel por (ruta, mtime, tamaño): se detecta una vez por archivo
+_cache_alpha = {}
+
+
+def normalizar_entrada_overlay(entrada: tuple) -> tuple:
+    """
+    Completa una entrada de la secuencia de overlays con los campos opcionales.
+    Acepta (nombre, opacidad, inicio, duración[, blend_mode[, key]]) y devuelve
+    siempre la tupla de 6 elementos. key es un dict de chroma/luma key (ver
+    utils.keying) o None.
+    """
+    overlay_name, opacity, start_time, duration, *resto = entrada
+    blend_mode = resto[0] if len(resto) > 0 else "normal"
+    key = resto[1] if len(resto) > 1 else None
+    return (overlay_name, opacity, start_time, duration, blend_mode, key)
 
 class VideoOverlay:
     def __init__(self, name: str, path: str):
         self.name = name
         self.path = path
         self.clip = None
+        self._ruta_cargada = None
     
-    def load(self):
+    def load(self, path: Optional[str] = None):
+        path = path or self.path
+        if self.clip and self._ruta_cargada != path:
+            self.close()
         if not self.clip:
-            self.clip = VideoFileClip(self.path)
+            self.clip = overlay_pool.adquirir(path)
+            self._ruta_cargada = path
         return self.clip
     
-    def apply(self, base_clip, opacity: float = 1.0, start_time: float = 0, duration: Optional[float] = None):
-        overlay = self.load()
+    def close(self):
+        """Devuelve el lector del overlay al pool compartido."""
+        if self.clip:
+            overlay_pool.liberar(self.clip)
+            self.clip = None
+    
+    def apply(self, base_clip, opacity: float = 1.0, start_time: float = 0, duration: Optional[float] = None,
+              fps: Optional[float] = None):
+        # Leer la versión ya redimensionada de la caché en disco
+        overlay = self.load(overlay_cache.obtener(self.path, (base_clip.w, base_clip.h), fps))
         if duration:
             overlay = overlay.subclip(0, duration)
         
-        # Función para redimensionar usando cv2
-        def resize_frame(frame):
-            return cv2.resize(frame, (base_clip.w, base_clip.h), interpolation=cv2.INTER_LINEAR)
-        
-        # Aplicar redimensionamiento
-        overlay = overlay.fl_image(resize_frame)
+        # Redimensionar con cv2 solo si la caché no pudo dar el tamaño correcto
+        if tuple(overlay.size) != (base_clip.w, base_clip.h):
+            def resize_frame(frame):
+                return cv2.resize(frame, (base_clip.w, base_clip.h), interpolation=cv2.INTER_LINEAR)
+            overlay = overlay.fl_image(resize_frame)
         
         # Aplicar opacidad
         if opacity < 1.0:
@@ -43,16 +75,34 @@ class OverlayManager:
         self.overlays_dir = "overlays"
         if not os.path.exists(self.overlays_dir):
             os.makedirs(self.overlays_dir)
+        self.index = OverlayIndex.para_directorio(self.overlays_dir)
     
     def get_available_overlays(self) -> List[str]:
-        """Obtiene la lista de overlays disponibles."""
+        """Obtiene la lista de overlays disponibles (desde el índice de metadatos)."""
         if not os.path.exists(self.overlays_dir):
             return []
-        return [f for f in os.listdir(self.overlays_dir) 
-                if f.endswith(('.mp4', '.mov', '.avi', '.webm'))]
+        return self.index.nombres()
+    
+    def get_overlay_info(self, overlay_name: str) -> Optional[dict]:
+        """Metadatos indexados de un overlay (duración, resolución, fps, códec, alpha, miniatura)."""
+        return self.index.obtener(overlay_name)
     
     def has_alpha_channel(self, video_path: str) -> bool:
-        """Detecta si un video tiene canal alpha."""
+        """Detecta si un video tiene canal alpha (desde el índice si está en la carpeta de overlays)."""
+        if os.path.dirname(os.path.abspath(video_path)) == os.path.abspath(self.overlays_dir):
+            info = self.index.obtener(os.path.basename(video_path))
+            if info is not None:
+                return info["has_alpha"]
+        try:
+            clave = OverlayReaderPool._clave(video_path)
+        except OSError:
+            return False
+        if clave not in _cache_alpha:
+            _cache_alpha[clave] = self._detectar_alpha(video_path)
+        return _cache_alpha[clave]
+    
+    def _detectar_alpha(self, video_path: str) -> bool:
+        """Decodifica los primeros frames para detectar canal alpha."""
         try:
             # Intentar leer el video con OpenCV
             cap = cv2.VideoCapture(video_path)
@@ -76,23 +126,60 @@ class OverlayManager:
             print(f"Error al detectar canal alpha: {e}")
             return False
     
-    def optimize_overlay(self, overlay_clip: VideoFileClip, has_alpha: bool) -> VideoFileClip:
-        """Simplificado: solo devuelve el overlay tal cual, sin canal alpha ni máscara."""
-        return overlay_clip
+    def optimize_overlay(
+        self,
+        overlay_clip: VideoFileClip,
+        has_alpha: bool,
+        opacity: float = 1.0,
+        start_time: float = 0,
+        duration: Optional[float] = None,
+        blend_mode: str = "normal",
+        key: Optional[dict] = None
+    ) -> CapaOverlay:
+        """
+        Prepara el overlay como capa del compositor: con alpha real si el video
+        lo tiene, con la máscara de un chroma/luma key, o solo con opacidad
+        constante. No se crean clips de máscara.
+        """
+        return CapaOverlay(
+            overlay_clip,
+            opacity=opacity,
+            start_time=start_time,
+            duration=duration,
+            use_alpha=has_alpha,
+            blend_mode=blend_mode,
+            key=key
+        )
     
     def apply_overlays(
         self,
         base_clip: VideoFileClip,
-        overlays: List[Tuple[str, float, float, float]]
+        overlays: List[tuple],
+        lectores: Optional[SesionLectores] = None,
+        slot: int = 0,
+        fps: Optional[float] = None
     ) -> VideoFileClip:
+        """
+        Aplica los overlays sobre el clip base.
+        
+        Args:
+            base_clip: Clip sobre el que se componen los overlays
+            overlays: Lista de tuplas (nombre, opacidad, inicio, duración[, blend_mode[, key]])
+            lectores: Sesión del pool de lectores del render en curso; si no se pasa,
+                los lectores se devuelven al pool al cerrar el clip resultante
+            slot: Ranura de lector a usar (escenas solapadas usan ranuras distintas)
+            fps: fps del render; el overlay se lee ya convertido a ese fps desde la caché
+        """
         print(f"[DEBUG] Entrando en apply_overlays con overlays: {overlays}")
         if not overlays:
             print("[DEBUG] No hay overlays para aplicar.")
             return base_clip
         
-        overlay_clips = []
+        capas = []
+        prestados = []  # lectores tomados del pool sin sesión
         
-        for overlay_name, opacity, start_time, duration in overlays:
+        for entrada in overlays:
+            overlay_name, opacity, start_time, duration, blend_mode, key = normalizar_entrada_overlay(entrada)
             overlay_path = os.path.join(self.overlays_dir, overlay_name)
             print(f"[DEBUG] Procesando overlay: {overlay_name} en {overlay_path}")
             if not os.path.exists(overlay_path):
@@ -100,41 +187,49 @@ class OverlayManager:
                 continue
             
             try:
-                # Cargar el overlay
-                overlay_clip = VideoFileClip(overlay_path)
-                print(f"[DEBUG] Overlay {overlay_name} cargado correctamente.")
-                
-                # Redimensionar overlay al tamaño del clip base
-                def resize_frame(frame):
-                    return cv2.resize(frame, (base_clip.w, base_clip.h), interpolation=cv2.INTER_LINEAR)
-                overlay_clip = overlay_clip.fl_image(resize_frame)
-                
                 # Detectar si tiene canal alpha
                 has_alpha = self.has_alpha_channel(overlay_path)
                 print(f"[DEBUG] Overlay {overlay_name} - Tiene alpha: {has_alpha}")
                 
-                # Optimizar el overlay según su tipo
-                overlay_clip = self.optimize_overlay(overlay_clip, has_alpha)
-                
-                # Ajustar la duración y el tiempo de inicio
-                overlay_clip = overlay_clip.set_start(start_time).set_duration(duration)
+                # Usar la versión ya redimensionada de la caché en disco
+                ruta_lectura = overlay_cache.obtener(
+                    overlay_path, (base_clip.w, base_clip.h), fps,
+                    pix_fmt="rgba" if has_alpha else "yuv420p"
+                )
                 
-                # Aplicar la opacidad
-                if opacity < 1.0:
-                    overlay_clip = overlay_clip.set_opacity(opacity)
+                # Obtener el lector del overlay del pool compartido
+                if lectores is not None:
+                    overlay_clip = lectores.obtener(ruta_lectura, slot, has_mask=has_alpha)
+                else:
+                    overlay_clip = overlay_pool.adquirir(ruta_lectura, has_mask=has_alpha)
+                    prestados.append(overlay_clip)
+                print(f"[DEBUG] Overlay {overlay_name} cargado correctamente.")
                 
-                overlay_clips.append(overlay_clip)
-                print(f"[DEBUG] Overlay {overlay_name} añadido a overlay_clips.")
+                # Optimizar el overlay según su tipo
+                capas.append(self.optimize_overlay(
+                    overlay_clip, has_alpha, opacity, start_time, duration, blend_mode, key
+                ))
+                print(f"[DEBUG] Overlay {overlay_name} añadido a las capas.")
                 
             except Exception as e:
                 print(f"[DEBUG] Error al procesar overlay {overlay_name}: {e}")
                 continue
         
-        if not overlay_clips:
+        if not capas:
             print("[DEBUG] Ningún overlay fue añadido. Devolviendo base_clip.")
+            for overlay_clip in prestados:
+                overlay_pool.liberar(overlay_clip)
             return base_clip
         
-        # Combinar todos los overlays con el clip base
-        final_clip = CompositeVideoClip([base_clip] + overlay_clips)
+        # Componer todas las capas sobre el clip base en una sola pasada por frame
+        final_clip = OverlayCompositor(base_clip, capas).to_clip()
+        if prestados:
+            # Sin sesión, los lectores vuelven al pool al cerrar el clip (como VideoOverlay.close)
+            cerrar_clip = final_clip.close
+            def close():
+                while prestados:
+                    overlay_pool.liberar(prestados.pop())
+                cerrar_clip()
+            final_clip.close = close
         print("[DEBUG] Overlays aplicados correctamente.")
         return final_clip 
\ No newline at end of file
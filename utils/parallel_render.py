@@ -0,0 +1,387 @@
+"""
+Render en paralelo.
+
+Por segmentos (ParallelRenderer): el video se corta en fronteras de escena
+fuera de las ventanas de disolución y cada segmento se renderiza en un proceso
+aparte, que reconstruye el clip a partir de los mismos parámetros que el render
+en serie. Los frames de cada segmento son exactamente los índices n / fps que
+escribiría write_videofile, así que al unir los segmentos con el demuxer concat
+de ffmpeg (sin recodificar) la temporización es idéntica a la de un render en serie.
+
+Por frames (FramePoolRenderer): varios procesos generan frames sueltos en
+búferes de memoria compartida y un único ffmpeg los codifica en orden. No
+necesita puntos de corte y solapa la generación de frames con la codificación.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import time
+import traceback
+import numpy as np
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from utils.audio_mixer import CodificadorAudio
+from utils.ffmpeg_tools import ejecutar_ffmpeg
+from utils.overlay_pool import overlay_pool
+from utils.render_profiles import RenderProfile, obtener_perfil
+from utils.timeline import FlatTimeline
+
+
+def escribir_segmento(clip, ruta: str, primer_frame: int, fin_frame: int, perfil: RenderProfile) -> int:
+    """
+    Escribe los frames [primer_frame, fin_frame) del clip (sin audio),
+    muestreados en t = n / fps igual que write_videofile. En los tramos
+    estáticos del clip se repite el frame anterior sin volver a pedirlo.
+    """
+    fps = perfil.fps
+    tramos = getattr(clip, "tramos_estaticos", None)
+    writer = FFMPEG_VideoWriter(ruta, clip.size, fps, **perfil.parametros_writer(final=False))
+    try:
+        for n in range(primer_frame, fin_frame):
+            if n == primer_frame or tramos is None or not tramos.repite(n, fps):
+                frame = clip.get_frame(n / fps)
+                if frame.dtype != np.uint8:
+                    frame = frame.astype(np.uint8)
+            writer.write_frame(frame)
+    finally:
+        writer.close()
+    return fin_frame - primer_frame
+
+
+def _renderizar_segmento(trabajo: dict) -> float:
+    """
+    Punto de entrada de cada proceso: reconstruye el clip de video y escribe su
+    segmento. Devuelve los segundos empleados.
+    """
+    # Import diferido: video_services importa este módulo
+    from utils.video_services import VideoServices
+
+    inicio = time.perf_counter()
+    with overlay_pool.sesion() as lectores:
+        clip = VideoServices()._construir_video(lectores, **trabajo["video"])
+        escribir_segmento(clip, trabajo["ruta"], trabajo["primer_frame"], trabajo["fin_frame"], trabajo["perfil"])
+    return time.perf_counter() - inicio
+
+
+class ParallelRenderer:
+    """
+    Renderiza un video de imágenes en varios procesos.
+
+    Args:
+        workers: Número de procesos; por defecto, uno por núcleo
+        perfil: Perfil de render (todos los segmentos se codifican igual para unirlos sin recodificar)
+    """
+    def __init__(self, workers: Optional[int] = None, perfil: Optional[RenderProfile] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.perfil = obtener_perfil(perfil)
+        self.fps = self.perfil.fps
+
+    @staticmethod
+    def escenas(parametros_video: dict) -> List[Tuple[float, float]]:
+        """(inicio, fin) de cada escena en la línea de tiempo final."""
+        n = len(parametros_video["images"])
+        duracion = parametros_video["duration_per_image"]
+        solape = parametros_video["transition_duration"]
+        if n < 2 or solape <= 0 or parametros_video["transition_type"] != "dissolve":
+            solape = 0
+        inicios = FlatTimeline.inicios_disolucion([duracion] * n, solape, avisar=False)
+        return [(inicio, inicio + duracion) for inicio in inicios]
+
+    @staticmethod
+    def puntos_de_corte(escenas: List[Tuple[float, float]], fps: float, total_frames: int, segmentos: int) -> List[int]:
+        """
+        Índices de frame donde empieza cada segmento (más total_frames al final).
+        Solo se corta en el primer frame en que la escena siguiente está sola,
+        es decir, al acabar la ventana de disolución; entre esos candidatos se
+        eligen los más cercanos a un reparto equitativo de frames.
+        """
+        candidatos = ParallelRenderer.candidatos_de_corte(escenas, fps, total_frames)
+
+        cortes = [0]
+        for k in range(1, segmentos):
+            if not candidatos:
+                break
+            ideal = total_frames * k / segmentos
+            mejor = min(candidatos, key=lambda frame: abs(frame - ideal))
+            if mejor > cortes[-1]:
+                cortes.append(mejor)
+            candidatos = [frame for frame in candidatos if frame > mejor]
+        cortes.append(total_frames)
+        return cortes
+
+    @staticmethod
+    def candidatos_de_corte(escenas: List[Tuple[float, float]], fps: float, total_frames: int) -> List[int]:
+        """Primer frame tras cada ventana de disolución (o tras cada corte seco)."""
+        candidatos = set()
+        for (_, fin), (inicio_siguiente, _) in zip(escenas, escenas[1:]):
+            frame = int(np.ceil(max(fin, inicio_siguiente) * fps - 1e-6))
+            if 0 < frame < total_frames:
+                candidatos.add(frame)
+        return sorted(candidatos)
+
+    def render(self, final_clip, parametros_video: dict, output_path: str, cache=None) -> dict:
+        """
+        Renderiza final_clip en output_path. Los procesos reconstruyen la imagen
+        a partir de parametros_video; el audio de final_clip se codifica en este
+        proceso mientras tanto. Devuelve las medidas del render.
+
+        Con cache (utils.scene_cache.SceneRenderCache) se corta en todas las
+        escenas y solo se renderizan los segmentos que no estén ya guardados.
+        """
+        total_frames = int(final_clip.duration * self.fps)
+        escenas = self.escenas(parametros_video)
+        if cache is not None:
+            cortes = [0] + self.candidatos_de_corte(escenas, self.fps, total_frames) + [total_frames]
+        else:
+            cortes = self.puntos_de_corte(escenas, self.fps, total_frames, self.workers)
+        n_segmentos = len(cortes) - 1
+        if n_segmentos < 2 and self.workers > 1 and cache is None:
+            # Sin puntos de corte seguros: se reparten frames sueltos en su lugar
+            print("[DEBUG] Sin puntos de corte fuera de las disoluciones, se renderiza por frames")
+            return FramePoolRenderer(self.workers, self.perfil).render(
+                final_clip, parametros_video, output_path
+            )
+
+        directorio = tempfile.mkdtemp(prefix="render_segmentos_")
+        inicio = time.perf_counter()
+        # El audio se codifica en paralelo con los segmentos, en el directorio de este render
+        codificador = CodificadorAudio(final_clip.audio, directorio, self.perfil) if final_clip.audio is not None else None
+        try:
+            trabajos = []
+            for i in range(n_segmentos):
+                trabajo = {
+                    "video": parametros_video,
+                    "ruta": os.path.join(directorio, f"segmento_{i:04d}.{self.perfil.extension}"),
+                    "primer_frame": cortes[i],
+                    "fin_frame": cortes[i + 1],
+                    "perfil": self.perfil,
+                }
+                if cache is not None:
+                    trabajo["firma"] = cache.firma_segmento(
+                        parametros_video, self.perfil, escenas, cortes[i], cortes[i + 1], final_clip.duration
+                    )
+                    guardado = cache.obtener(trabajo["firma"], self.perfil)
+                    if guardado:
+                        trabajo["ruta"] = guardado
+                        trabajo["en_cache"] = True
+                trabajos.append(trabajo)
+            pendientes = [trabajo for trabajo in trabajos if not trabajo.get("en_cache")]
+            print(f"[DEBUG] Render por segmentos: {total_frames} frames en {n_segmentos} segmentos "
+                  f"({len(pendientes)} por renderizar) con {self.workers} procesos")
+
+            if self.workers > 1 and len(pendientes) > 1:
+                # spawn: el proceso padre puede tener hilos (Streamlit) y lectores de ffmpeg abiertos
+                contexto = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(pendientes)), mp_context=contexto) as pool:
+                    futuros = [pool.submit(_renderizar_segmento, trabajo) for trabajo in pendientes]
+                    tiempos = [futuro.result() for futuro in futuros]
+            else:
+                # Pocos segmentos o un solo proceso: se renderizan aquí con el clip ya construido
+                tiempos = []
+                for trabajo in pendientes:
+                    inicio_segmento = time.perf_counter()
+                    escribir_segmento(final_clip, trabajo["ruta"], trabajo["primer_frame"], trabajo["fin_frame"], self.perfil)
+                    tiempos.append(time.perf_counter() - inicio_segmento)
+            ruta_audio = codificador.esperar() if codificador is not None else None
+            codificador = None
+
+            if cache is not None:
+                for trabajo in pendientes:
+                    trabajo["ruta"] = cache.guardar(trabajo["ruta"], trabajo["firma"], self.perfil)
+
+            lista = os.path.join(directorio, "segmentos.txt")
+            with open(lista, "w", encoding="utf8") as f:
+                for trabajo in trabajos:
+                    f.write(f"file '{os.path.abspath(trabajo['ruta'])}'\n")
+
+            # Unir los segmentos y añadir el audio, todo sin recodificar
+            args = ["-f", "concat", "-safe", "0", "-i", lista]
+            if ruta_audio:
+                args += ["-i", ruta_audio, "-map", "0:v:0", "-map", "1:a:0"]
+            args += ["-c", "copy"]
+            if self.perfil.faststart and self.perfil.container in ("mp4", "mov"):
+                args += ["-movflags", "+faststart"]
+            args += [output_path]
+            ejecutar_ffmpeg(args, "Unión de segmentos")
+        finally:
+            if codificador is not None:
+                codificador.cancelar()
+            shutil.rmtree(directorio, ignore_errors=True)
+        if cache is not None:
+            cache.evictar()
+
+        total = time.perf_counter() - inicio
+        medidas = {
+            "frames": total_frames,
+            "segmentos": n_segmentos,
+            "segmentos_reutilizados": n_segmentos - len(pendientes),
+            "workers": self.workers,
+            "segundos": total,
+            "segundos_segmentos": sum(tiempos),
+            "aceleracion": sum(tiempos) / total if total > 0 else 1.0,
+        }
+        print(f"[DEBUG] Render por segmentos terminado en {total:.1f}s "
+              f"({sum(tiempos):.1f}s de trabajo en segmentos, x{medidas['aceleracion']:.2f}, "
+              f"{medidas['segmentos_reutilizados']} segmentos reutilizados)")
+        return medidas
+
+
+def _productor_frames(parametros_video: dict, nombre_memoria: str, forma: tuple, fps: float, tareas, resultados):
+    """
+    Punto de entrada de cada productor: reconstruye el clip y, por cada tarea
+    (n, ranura), escribe el frame n / fps en la ranura de la memoria compartida.
+    Termina al recibir None.
+    """
+    from utils.video_services import VideoServices
+
+    memoria = shared_memory.SharedMemory(name=nombre_memoria)
+    try:
+        ranuras = np.ndarray(forma, dtype=np.uint8, buffer=memoria.buf)
+        with overlay_pool.sesion() as lectores:
+            clip = VideoServices()._construir_video(lectores, **parametros_video)
+            while True:
+                tarea = tareas.get()
+                if tarea is None:
+                    break
+                n, ranura = tarea
+                ranuras[ranura] = clip.get_frame(n / fps)
+                resultados.put((n, ranura))
+        del ranuras
+    except Exception:
+        resultados.put(("error", traceback.format_exc()))
+    finally:
+        memoria.close()
+
+
+class FramePoolRenderer:
+    """
+    Renderiza el video repartiendo frames sueltos entre varios procesos.
+
+    Los frames vuelven a través de ranuras de memoria compartida (no se
+    serializan) y se escriben en orden en un único ffmpeg. Solo hay tantas
+    tareas en vuelo como ranuras, así que la memoria queda acotada a
+    ranuras * tamaño de frame.
+
+    Args:
+        workers: Número de procesos productores; por defecto, uno por núcleo
+        perfil: Perfil de render
+        ranuras: Frames en vuelo como máximo; por defecto, 4 por proceso
+    """
+    def __init__(self, workers: Optional[int] = None, perfil: Optional[RenderProfile] = None,
+                 ranuras: Optional[int] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.perfil = obtener_perfil(perfil)
+        self.fps = self.perfil.fps
+        self.ranuras = ranuras or 4 * self.workers
+
+    def render(self, final_clip, parametros_video: dict, output_path: str) -> dict:
+        """
+        Renderiza final_clip en output_path. Los productores reconstruyen la
+        imagen a partir de parametros_video; el audio de final_clip se codifica
+        en este proceso mientras tanto. Devuelve las medidas del render.
+        """
+        total_frames = int(final_clip.duration * self.fps)
+        ancho, alto = final_clip.size
+        forma = (self.ranuras, alto, ancho, 3)
+        print(f"[DEBUG] Render por frames: {total_frames} frames con {self.workers} procesos y {self.ranuras} ranuras")
+
+        directorio = tempfile.mkdtemp(prefix="render_frames_")
+        memoria = shared_memory.SharedMemory(create=True, size=int(np.prod(forma)))
+        contexto = multiprocessing.get_context("spawn")
+        tareas = contexto.Queue(maxsize=self.ranuras)
+        resultados = contexto.Queue(maxsize=self.ranuras)
+        procesos = []
+        codificador = None
+        inicio = time.perf_counter()
+        try:
+            ranuras = np.ndarray(forma, dtype=np.uint8, buffer=memoria.buf)
+            for _ in range(self.workers):
+                proceso = contexto.Process(
+                    target=_productor_frames,
+                    args=(parametros_video, memoria.name, forma, self.fps, tareas, resultados),
+                    daemon=True
+                )
+                proceso.start()
+                procesos.append(proceso)
+
+            # El audio se codifica en paralelo con los frames y se une al final sin recodificar
+            ruta_video = output_path
+            if final_clip.audio is not None:
+                codificador = CodificadorAudio(final_clip.audio, directorio, self.perfil)
+                ruta_video = os.path.join(directorio, f"video.{self.perfil.extension}")
+
+            # Los frames que repiten el anterior (tramos estáticos) no se piden a los productores
+            tramos = getattr(final_clip, "tramos_estaticos", None)
+            repetidos = (lambda n: tramos.repite(n, self.fps)) if tramos is not None else (lambda n: False)
+
+            writer = FFMPEG_VideoWriter(ruta_video, final_clip.size, self.fps, **self.perfil.parametros_writer())
+            try:
+                libres = list(range(self.ranuras))
+                listos = {}
+                siguiente_tarea = 0
+                anterior = None
+                for n in range(total_frames):
+                    if repetidos(n):
+                        writer.write_frame(anterior)
+                        continue
+                    # Mantener ocupadas todas las ranuras libres
+                    while libres and siguiente_tarea < total_frames:
+                        if not repetidos(siguiente_tarea):
+                            tareas.put((siguiente_tarea, libres.pop()))
+                        siguiente_tarea += 1
+                    while n not in listos:
+                        listos.update([self._recibir(resultados, procesos)])
+                    ranura = listos.pop(n)
+                    writer.write_frame(ranuras[ranura])
+                    if repetidos(n + 1):
+                        # La ranura se libera: se guarda una copia para las repeticiones
+                        anterior = ranuras[ranura].copy()
+                    libres.append(ranura)
+            finally:
+                writer.close()
+            del ranuras
+
+            if codificador is not None:
+                ruta_audio = codificador.esperar()
+                codificador = None
+                args = ["-i", ruta_video, "-i", ruta_audio, "-map", "0:v:0", "-map", "1:a:0", "-c", "copy"]
+                if self.perfil.faststart and self.perfil.container in ("mp4", "mov"):
+                    args += ["-movflags", "+faststart"]
+                ejecutar_ffmpeg(args + [output_path], "Unión de audio y video")
+        finally:
+            if codificador is not None:
+                codificador.cancelar()
+            for _ in procesos:
+                try:
+                    tareas.put(None, timeout=1)
+                except queue.Full:
+                    break
+            for proceso in procesos:
+                proceso.join(timeout=5)
+                if proceso.is_alive():
+                    proceso.terminate()
+            memoria.close()
+            memoria.unlink()
+            shutil.rmtree(directorio, ignore_errors=True)
+
+        total = time.perf_counter() - inicio
+        print(f"[DEBUG] Render por frames terminado en {total:.1f}s ({total_frames / total:.1f} fps)")
+        return {"frames": total_frames, "workers": self.workers, "segundos": total}
+
+    @staticmethod
+    def _recibir(resultados, procesos) -> tuple:
+        """Espera el siguiente frame terminado; falla si un productor ha muerto o ha dado error."""
+        while True:
+            try:
+                resultado = resultados.get(timeout=1)
+            except queue.Empty:
+                if not all(proceso.is_alive() for proceso in procesos):
+                    raise RuntimeError("Un proceso productor de frames terminó inesperadamente")
+                continue
+            if resultado[0] == "error":
+                raise RuntimeError(f"Error en un proceso productor de frames:\n{resultado[1]}")
+            return resultado
@@ -0,0 +1,273 @@
+"""
+Perfiles de render: resolución, fps y parámetros del codificador.
+
+Los perfiles se leen una sola vez de la sección render_profiles de config.yaml
+(sobre los incluidos aquí por defecto) y cada render elige el suyo por nombre.
+"""
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+import copy
+import os
+import yaml
+
+RUTA_CONFIG = "config.yaml"
+
+RESOLUCIONES = {
+    "2160p": (3840, 2160),
+    "1440p": (2560, 1440),
+    "1080p": (1920, 1080),
+    "720p": (1280, 720),
+    "480p": (854, 480),
+    "vertical": (1080, 1920),
+    "cuadrado": (1080, 1080),
+}
+
+# Códec de audio, extensión del audio temporal y tipo MIME de cada contenedor
+CONTENEDORES = {
+    "mp4": {"audio_codec": "aac", "extension_audio": "m4a", "mime": "video/mp4"},
+    "mov": {"audio_codec": "aac", "extension_audio": "m4a", "mime": "video/quicktime"},
+    "webm": {"audio_codec": "libvorbis", "extension_audio": "ogg", "mime": "video/webm"},
+}
+
+PERFILES_POR_DEFECTO = {
+    "borrador": {
+        "descripcion": "Vista previa rápida",
+        "resolution": "720p", "fps": 24, "preset": "ultrafast", "crf": 28,
+    },
+    "youtube_1080p": {
+        "descripcion": "YouTube 1080p",
+        "resolution": "1080p", "fps": 30, "preset": "medium", "crf": 20,
+    },
+    "alta_calidad": {
+        "descripcion": "Máxima calidad (lento)",
+        "resolution": "1080p", "fps": 30, "preset": "slow", "crf": 17,
+    },
+    "vertical": {
+        "descripcion": "Shorts / Reels",
+        "resolution": "vertical", "fps": 30, "preset": "medium", "crf": 20,
+    },
+    "webm": {
+        "descripcion": "WebM VP9",
+        "resolution": "1080p", "fps": 30, "codec": "libvpx-vp9", "crf": 32, "container": "webm",
+    },
+}
+
+
+class RenderProfile:
+    """
+    Parámetros de salida de un render.
+
+    Args:
+        nombre: Identificador del perfil
+        resolution: Nombre de RESOLUCIONES, 'ANCHOxALTO', tupla, o None para conservar el tamaño de las imágenes
+        fps: Frames por segundo
+        codec: Códec de video de ffmpeg
+        preset: Preset del codificador (velocidad frente a compresión)
+        crf: Calidad constante; None usa el valor por defecto del códec
+        threads: Hilos del codificador; None deja que ffmpeg decida
+        pix_fmt: Formato de píxel de salida (con libx264 y tamaño par moviepy usa yuv420p)
+        faststart: Mover el índice al principio del archivo (mp4/mov) para reproducir antes de descargarlo
+        container: 'mp4', 'mov' o 'webm'
+        audio_codec: Códec de audio; por defecto el del contenedor
+        descripcion: Texto para la interfaz
+    """
+    def __init__(
+        self,
+        nombre: str,
+        resolution=None,
+        fps: float = 24,
+        codec: str = "libx264",
+        preset: str = "medium",
+        crf: Optional[int] = 23,
+        threads: Optional[int] = None,
+        pix_fmt: str = "yuv420p",
+        faststart: bool = True,
+        container: str = "mp4",
+        audio_codec: Optional[str] = None,
+        descripcion: str = ""
+    ):
+        if container not in CONTENEDORES:
+            raise ValueError(f"Contenedor no soportado: {container}")
+        self.nombre = nombre
+        self.resolution = resolution
+        self.fps = fps
+        self.codec = codec
+        self.preset = preset
+        self.crf = crf
+        self.threads = threads
+        self.pix_fmt = pix_fmt
+        self.faststart = faststart
+        self.container = container
+        self.audio_codec = audio_codec or CONTENEDORES[container]["audio_codec"]
+        self.descripcion = descripcion or nombre
+
+    @property
+    def tamano(self) -> Optional[Tuple[int, int]]:
+        """(ancho, alto) de salida, o None para conservar el de las imágenes."""
+        if self.resolution is None:
+            return None
+        if isinstance(self.resolution, (tuple, list)):
+            return int(self.resolution[0]), int(self.resolution[1])
+        if self.resolution in RESOLUCIONES:
+            return RESOLUCIONES[self.resolution]
+        ancho, alto = str(self.resolution).lower().split("x")
+        return int(ancho), int(alto)
+
+    @property
+    def extension(self) -> str:
+        return self.container
+
+    @property
+    def extension_audio(self) -> str:
+        return CONTENEDORES[self.container]["extension_audio"]
+
+    @property
+    def mime(self) -> str:
+        return CONTENEDORES[self.container]["mime"]
+
+    def ffmpeg_params(self, final: bool = True) -> list:
+        """
+        Opciones de salida extra para ffmpeg. final=False omite las que solo
+        tienen sentido en el archivo definitivo (faststart), p. ej. en segmentos.
+        """
+        params = []
+        if self.crf is not None:
+            params += ["-crf", str(self.crf)]
+            if self.codec.startswith("libvpx"):
+                # VP8/VP9 solo usan el crf como calidad constante con bitrate 0
+                params += ["-b:v", "0"]
+        if self.pix_fmt:
+            params += ["-pix_fmt", self.pix_fmt]
+        if final and self.faststart and self.container in ("mp4", "mov"):
+            params += ["-movflags", "+faststart"]
+        return params
+
+    def parametros_writer(self, final: bool = True) -> dict:
+        """Argumentos para FFMPEG_VideoWriter."""
+        return {
+            "codec": self.codec,
+            "preset": self.preset,
+            "threads": self.threads,
+            "ffmpeg_params": self.ffmpeg_params(final),
+        }
+
+    def parametros_write_videofile(self) -> dict:
+        """Argumentos para clip.write_videofile."""
+        return dict(
+            self.parametros_writer(),
+            fps=self.fps,
+            audio_codec=self.audio_codec,
+        )
+
+    def a_dict(self) -> dict:
+        return {
+            "nombre": self.nombre,
+            "resolution": self.resolution,
+            "fps": self.fps,
+            "codec": self.codec,
+            "preset": self.preset,
+            "crf": self.crf,
+            "threads": self.threads,
+            "pix_fmt": self.pix_fmt,
+            "faststart": self.faststart,
+            "container": self.container,
+            "audio_codec": self.audio_codec,
+            "descripcion": self.descripcion,
+        }
+
+    @staticmethod
+    def desde_dict(nombre: str, datos: dict) -> "RenderProfile":
+        datos = dict(datos)
+        datos.pop("nombre", None)
+        return RenderProfile(nombre, **datos)
+
+    def __repr__(self):
+        return f"RenderProfile({self.nombre!r}, {self.tamano}, {self.fps} fps, {self.codec} {self.preset} crf={self.crf})"
+
+
+@lru_cache(maxsize=1)
+def cargar_config(ruta: str = RUTA_CONFIG) -> dict:
+    """Lee config.yaml una sola vez por proceso."""
+    if not os.path.exists(ruta):
+        print(f"[DEBUG] No se encontró {ruta}, se usan los perfiles por defecto")
+        return {}
+    with open(ruta, "r", encoding="utf8") as f:
+        return yaml.safe_load(f) or {}
+
+
+@lru_cache(maxsize=1)
+def _perfiles() -> dict:
+    config = cargar_config()
+    video = config.get("video") or {}
+    definiciones = copy.deepcopy(PERFILES_POR_DEFECTO)
+    for nombre, datos in (config.get("render_profiles") or {}).items():
+        definiciones.setdefault(nombre, {}).update(datos or {})
+
+    perfiles = {nombre: RenderProfile.desde_dict(nombre, datos) for nombre, datos in definiciones.items()}
+    # Perfil con los valores generales de la sección video
+    perfiles.setdefault("por_defecto", RenderProfile(
+        "por_defecto",
+        resolution=video.get("default_resolution"),
+        fps=video.get("default_fps", 24),
+        descripcion="Por defecto (config.yaml)"
+    ))
+    return perfiles
+
+
+def nombres_perfiles() -> list:
+    """Perfiles disponibles, empezando por el perfil por defecto."""
+    por_defecto = nombre_perfil_por_defecto()
+    return [por_defecto] + [nombre for nombre in _perfiles() if nombre != por_defecto]
+
+
+def nombre_perfil_por_defecto() -> str:
+    nombre = (cargar_config().get("video") or {}).get("default_profile", "por_defecto")
+    return nombre if nombre in _perfiles() else "por_defecto"
+
+
+def obtener_perfil(perfil: Union[str, RenderProfile, None] = None) -> RenderProfile:
+    """
+    Devuelve el perfil pedido: un RenderProfile se usa tal cual, un nombre se
+    busca entre los perfiles cargados y None da el perfil por defecto.
+    """
+    if isinstance(perfil, RenderProfile):
+        return perfil
+    perfiles = _perfiles()
+    if perfil is None:
+        return perfiles[nombre_perfil_por_defecto()]
+    if perfil not in perfiles:
+        raise ValueError(f"Perfil de render desconocido: {perfil}")
+    return perfiles[perfil]
+
+
+# Calidades de la interfaz -> (preset, crf)
+CALIDADES = {
+    "Baja": ("veryfast", 28),
+    "Media": ("medium", 23),
+    "Alta": ("slow", 19),
+    "Ultra": ("slower", 16),
+}
+
+
+def perfil_desde_opciones(resolucion: str, formato: str, calidad: str, fps: Optional[float] = None) -> RenderProfile:
+    """
+    Construye un perfil a partir de los selectores de la interfaz
+    ('1080p (1920x1080)', 'MP4', 'Alta'...), partiendo del perfil por defecto.
+    """
+    base = obtener_perfil()
+    clave = resolucion.split(" ")[0].lower()
+    tamano = RESOLUCIONES.get(clave)
+    if tamano is None and "(" in resolucion:
+        tamano = RenderProfile("", resolution=resolucion.split("(")[1].rstrip(")")).tamano
+    container = formato.lower()
+    preset, crf = CALIDADES.get(calidad, (base.preset, base.crf))
+    datos = dict(base.a_dict(), resolution=tamano or base.resolution, fps=fps or base.fps,
+                 container=container, preset=preset, crf=crf, audio_codec=None,
+                 descripcion=f"{resolucion} · {formato} · {calidad}")
+    if container == "webm":
+        # La escala de crf de VP9 es más alta que la de x264 para la misma calidad
+        datos["codec"] = "libvpx-vp9"
+        datos["crf"] = crf + 10
+    elif base.codec.startswith("libvpx"):
+        datos["codec"] = "libx264"
+    return RenderProfile.desde_dict(f"{clave}_{container}_{calidad.lower()}", datos)
@@ -0,0 +1,134 @@
+"""
+Caché en disco de segmentos ya codificados, para re-renders incrementales.
+
+Cada segmento del render por segmentos (una escena más la disolución hacia la
+siguiente) se identifica por un hash de todo lo que determina sus frames: la
+imagen, el efecto, el overlay y el texto de cada escena que aparece en él, su
+posición en la línea de tiempo, los subtítulos visibles, los fundidos que le
+afectan y el perfil de render. Al cambiar una imagen solo cambian los hashes de los segmentos donde
+aparece; el resto se reutiliza y se une sin recodificar.
+"""
+from typing import List, Optional, Tuple
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from utils.overlay_cache import overlay_cache, evictar_lru
+from utils.overlays import OverlayManager, normalizar_entrada_overlay
+from utils.render_profiles import RenderProfile
+
+# Cambiar al modificar el render de forma que los segmentos guardados dejen de valer
+VERSION_RENDER = 3
+
+
+class SceneRenderCache:
+    """
+    Segmentos codificados guardados bajo su hash, con tamaño máximo y
+    expulsión de los usados hace más tiempo.
+    """
+    def __init__(self, cache_dir: str = os.path.join("cache", "scenes"), max_bytes: int = 4 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def descripcion_escena(parametros_video: dict, indice: int) -> dict:
+        """Todo lo que define los frames propios de la escena indice."""
+        imagen = parametros_video["images"][indice]
+        descripcion = {
+            "imagen": overlay_cache.hash_contenido(imagen),
+            "duracion": parametros_video["duration_per_image"],
+        }
+
+        efectos = parametros_video.get("effects_sequence")
+        if efectos:
+            descripcion["efecto"] = list(efectos[indice % len(efectos)])
+
+        overlays = parametros_video.get("overlay_sequence")
+        if overlays:
+            nombre, opacidad, _, _, modo, key = normalizar_entrada_overlay(overlays[indice % len(overlays)])
+            ruta = os.path.join(OverlayManager().overlays_dir, nombre)
+            contenido = overlay_cache.hash_contenido(ruta) if os.path.exists(ruta) else None
+            descripcion["overlay"] = [nombre, contenido, opacidad, modo, key]
+
+        if parametros_video.get("text"):
+            descripcion["texto"] = [parametros_video[campo] for campo in
+                                    ("text", "text_position", "text_color", "text_size")]
+        return descripcion
+
+    def firma_segmento(
+        self,
+        parametros_video: dict,
+        perfil: RenderProfile,
+        escenas: List[Tuple[float, float]],
+        primer_frame: int,
+        fin_frame: int,
+        duracion_total: float
+    ) -> str:
+        """Hash del segmento [primer_frame, fin_frame) del render."""
+        fps = perfil.fps
+        inicio, fin = primer_frame / fps, fin_frame / fps
+        activas = [
+            [inicio_escena, self.descripcion_escena(parametros_video, i)]
+            for i, (inicio_escena, fin_escena) in enumerate(escenas)
+            if inicio_escena < fin and fin_escena > inicio
+        ]
+        firma = {
+            "version": VERSION_RENDER,
+            "perfil": {clave: valor for clave, valor in perfil.a_dict().items() if clave not in ("nombre", "descripcion")},
+            "tamano": perfil.tamano,
+            "frames": [primer_frame, fin_frame],
+            "escenas": activas,
+            "transicion": [parametros_video["transition_type"], parametros_video["transition_duration"]],
+        }
+        # Solo los subtítulos visibles en el segmento, con su tiempo en el video
+        subtitulos = [
+            [s["start"], s["end"], s["text"], s.get("words")]
+            for s in parametros_video.get("captions") or []
+            if s["start"] < fin and s["end"] > inicio
+        ]
+        if subtitulos:
+            firma["subtitulos"] = [subtitulos, parametros_video.get("caption_style")]
+        # Los fundidos solo afectan a los segmentos que tocan su ventana
+        fade_in = parametros_video.get("fade_in_duration", 0)
+        if fade_in > 0 and inicio < fade_in:
+            firma["fade_in"] = fade_in
+        fade_out = parametros_video.get("fade_out_duration", 0)
+        if fade_out > 0 and fin > duracion_total - fade_out:
+            firma["fade_out"] = [fade_out, duracion_total]
+
+        texto = json.dumps(firma, sort_keys=True, default=list)
+        return hashlib.sha256(texto.encode("utf8")).hexdigest()[:40]
+
+    def ruta(self, firma: str, perfil: RenderProfile) -> str:
+        return os.path.join(self.cache_dir, f"{firma}.{perfil.extension}")
+
+    def obtener(self, firma: str, perfil: RenderProfile) -> Optional[str]:
+        """Ruta del segmento guardado, o None si hay que renderizarlo."""
+        ruta = self.ruta(firma, perfil)
+        if not os.path.exists(ruta):
+            return None
+        # Marcar como usado recientemente para la política LRU
+        os.utime(ruta, None)
+        return ruta
+
+    def guardar(self, ruta_segmento: str, firma: str, perfil: RenderProfile) -> str:
+        """Mueve un segmento recién codificado a la caché y devuelve su nueva ruta."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        destino = self.ruta(firma, perfil)
+        # Temporal dentro de la caché y renombrado: dos renders simultáneos no se pisan
+        temporal = f"{destino}.{uuid.uuid4().hex}.tmp.{perfil.extension}"
+        # (shutil.move copia si el segmento está en otro disco, p. ej. en /tmp)
+        shutil.move(ruta_segmento, temporal)
+        os.replace(temporal, destino)
+        return destino
+
+    def evictar(self):
+        with self._lock:
+            evictar_lru(self.cache_dir, self.max_bytes)
+
+
+# Caché de escenas compartida por todos los renders del proceso
+scene_render_cache = SceneRenderCache()
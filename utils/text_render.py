@@ -0,0 +1,240 @@
+"""
+Texto rasterizado con PIL/FreeType en sprites RGBA.
+
+Sustituye a TextClip (que lanza ImageMagick en cada llamada) y a la capa de
+CompositeVideoClip por escena: el sprite de cada combinación de texto, fuente,
+tamaño, color, contorno y ancho máximo se rasteriza una sola vez, se guarda en
+memoria y en disco, y se mezcla directamente sobre los frames en punto fijo.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import hashlib
+import json
+import math
+import os
+import threading
+import uuid
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+from moviepy.editor import ImageClip
+from utils.blending import ESCALA_PESO, BITS_PESO
+from utils.overlay_cache import evictar_lru
+
+FUENTE_POR_DEFECTO = "DejaVuSans.ttf"
+INTERLINEADO = 4
+
+
+@lru_cache(maxsize=32)
+def cargar_fuente(font: Optional[str], size: int):
+    """Fuente TrueType por nombre o ruta; si no existe, la fuente por defecto de PIL."""
+    try:
+        return ImageFont.truetype(font or FUENTE_POR_DEFECTO, size)
+    except OSError:
+        print(f"[DEBUG] Fuente '{font or FUENTE_POR_DEFECTO}' no encontrada, se usa la de PIL")
+        return ImageFont.load_default(size=size)
+
+
+def partir_lineas(texto: str, fuente, ancho_maximo: Optional[int], stroke_width: int) -> List[str]:
+    """Parte el texto en líneas de como mucho ancho_maximo píxeles (respeta los saltos de línea)."""
+    if not ancho_maximo:
+        return texto.split("\n")
+    lineas = []
+    for parrafo in texto.split("\n"):
+        actual = ""
+        for palabra in parrafo.split(" "):
+            candidata = f"{actual} {palabra}" if actual else palabra
+            if actual and fuente.getlength(candidata) + 2 * stroke_width > ancho_maximo:
+                lineas.append(actual)
+                actual = palabra
+            else:
+                actual = candidata
+        lineas.append(actual)
+    return lineas
+
+
+def rasterizar_texto(
+    text: str,
+    font: Optional[str] = None,
+    size: int = 30,
+    color: str = "white",
+    stroke_width: int = 0,
+    stroke_color: str = "black",
+    max_width: Optional[int] = None
+) -> np.ndarray:
+    """Dibuja el texto (centrado, con contorno opcional) en un array RGBA uint8 recortado a su contenido."""
+    fuente = cargar_fuente(font, size)
+    texto = "\n".join(partir_lineas(text, fuente, max_width, stroke_width))
+    borrador = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    x0, y0, x1, y1 = borrador.multiline_textbbox(
+        (0, 0), texto, font=fuente, spacing=INTERLINEADO, align="center", stroke_width=stroke_width
+    )
+    # Las versiones recientes de PIL devuelven la caja en coordenadas no enteras
+    x0, y0, x1, y1 = math.floor(x0), math.floor(y0), math.ceil(x1), math.ceil(y1)
+    imagen = Image.new("RGBA", (max(1, x1 - x0), max(1, y1 - y0)), (0, 0, 0, 0))
+    ImageDraw.Draw(imagen).multiline_text(
+        (-x0, -y0), texto, font=fuente, fill=ImageColor.getrgb(color), spacing=INTERLINEADO,
+        align="center", stroke_width=stroke_width, stroke_fill=ImageColor.getrgb(stroke_color)
+    )
+    return np.asarray(imagen)
+
+
+class SpriteTexto:
+    """
+    Sprite RGBA listo para mezclar: el color ya va multiplicado por su peso
+    (alpha 0..255 -> 0..256) para que cada frame solo cueste una
+    multiplicación y una suma en la zona del texto.
+    """
+    def __init__(self, rgba: np.ndarray):
+        self.rgba = rgba
+        self.alto, self.ancho = rgba.shape[:2]
+        self._inverso, self._color = self._premultiplicar(rgba)
+
+    @staticmethod
+    def _premultiplicar(rgba: np.ndarray):
+        peso = rgba[:, :, 3:4].astype(np.uint16)
+        peso += peso >> 7
+        return (ESCALA_PESO - peso).astype(np.uint16), (rgba[:, :, :3] * peso).astype(np.uint16)
+
+    def con_zona(self, rgba_zona: np.ndarray, x: int, y: int) -> "SpriteTexto":
+        """Copia del sprite con la zona que empieza en (x, y) sustituida; solo se recalcula esa zona."""
+        alto, ancho = rgba_zona.shape[:2]
+        copia = object.__new__(SpriteTexto)
+        copia.rgba = self.rgba.copy()
+        copia.rgba[y:y + alto, x:x + ancho] = rgba_zona
+        copia.alto, copia.ancho = self.alto, self.ancho
+        copia._inverso = self._inverso.copy()
+        copia._color = self._color.copy()
+        copia._inverso[y:y + alto, x:x + ancho], copia._color[y:y + alto, x:x + ancho] = self._premultiplicar(rgba_zona)
+        return copia
+
+    @property
+    def nbytes(self) -> int:
+        return self.rgba.nbytes + self._inverso.nbytes + self._color.nbytes
+
+    def posicion(self, tamano_frame: Tuple[int, int], position="bottom") -> Tuple[int, int]:
+        """
+        Esquina superior izquierda del sprite con las mismas posiciones que
+        set_position de moviepy: 'center', 'top', 'bottom', 'left', 'right',
+        o un par (x, y) con números o esas palabras.
+        """
+        ancho, alto = tamano_frame
+        if isinstance(position, str):
+            position = {
+                "center": ("center", "center"),
+                "top": ("center", "top"),
+                "bottom": ("center", "bottom"),
+                "left": ("left", "center"),
+                "right": ("right", "center"),
+            }.get(position, ("center", "center"))
+        x, y = position
+        x = {"left": 0, "center": (ancho - self.ancho) // 2, "right": ancho - self.ancho}.get(x, x)
+        y = {"top": 0, "center": (alto - self.alto) // 2, "bottom": alto - self.alto}.get(y, y)
+        return int(x), int(y)
+
+    def pegar(self, frame: np.ndarray, x: int, y: int) -> np.ndarray:
+        """Devuelve una copia del frame con el sprite mezclado en (x, y), recortado a los bordes."""
+        salida = np.array(frame, dtype=np.uint8)
+        alto, ancho = salida.shape[:2]
+        fx0, fy0 = max(x, 0), max(y, 0)
+        fx1, fy1 = min(x + self.ancho, ancho), min(y + self.alto, alto)
+        if fx0 >= fx1 or fy0 >= fy1:
+            return salida
+        sx0, sy0 = fx0 - x, fy0 - y
+        sx1, sy1 = sx0 + (fx1 - fx0), sy0 + (fy1 - fy0)
+
+        zona = salida[fy0:fy1, fx0:fx1, :3]
+        mezcla = zona * self._inverso[sy0:sy1, sx0:sx1]
+        mezcla += self._color[sy0:sy1, sx0:sx1]
+        mezcla += ESCALA_PESO >> 1
+        mezcla >>= BITS_PESO
+        zona[...] = mezcla
+        return salida
+
+
+class TextSpriteCache:
+    """
+    Sprites de texto en memoria (LRU limitada en bytes) y en disco como PNG,
+    bajo el hash de todos los parámetros del texto.
+    """
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 ** 2,
+        disk_dir: Optional[str] = os.path.join("cache", "text"),
+        max_bytes_disco: int = 256 * 1024 ** 2
+    ):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_bytes_disco = max_bytes_disco
+        self._sprites = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clave(**parametros) -> str:
+        return hashlib.sha1(json.dumps(parametros, sort_keys=True).encode("utf8")).hexdigest()[:24]
+
+    def obtener(
+        self,
+        text: str,
+        font: Optional[str] = None,
+        size: int = 30,
+        color: str = "white",
+        stroke_width: int = 0,
+        stroke_color: str = "black",
+        max_width: Optional[int] = None
+    ) -> SpriteTexto:
+        """Devuelve el sprite del texto, rasterizándolo solo la primera vez."""
+        parametros = dict(text=text, font=font, size=int(size), color=color, stroke_width=int(stroke_width),
+                          stroke_color=stroke_color, max_width=max_width)
+        clave = self.clave(**parametros)
+        with self._lock:
+            sprite = self._sprites.get(clave)
+            if sprite is not None:
+                self._sprites.move_to_end(clave)
+                return sprite
+
+        ruta = os.path.join(self.disk_dir, f"{clave}.png") if self.disk_dir else None
+        rgba = None
+        if ruta and os.path.exists(ruta):
+            try:
+                rgba = np.asarray(Image.open(ruta).convert("RGBA"))
+                os.utime(ruta, None)
+            except OSError:
+                rgba = None
+        if rgba is None:
+            rgba = rasterizar_texto(**parametros)
+            if ruta:
+                os.makedirs(self.disk_dir, exist_ok=True)
+                temporal = f"{ruta}.{uuid.uuid4().hex}.tmp.png"
+                Image.fromarray(rgba, "RGBA").save(temporal)
+                os.replace(temporal, ruta)
+                evictar_lru(self.disk_dir, self.max_bytes_disco)
+
+        sprite = SpriteTexto(rgba)
+        with self._lock:
+            if clave not in self._sprites:
+                self._sprites[clave] = sprite
+                self._bytes += sprite.nbytes
+                while self._bytes > self.max_bytes and len(self._sprites) > 1:
+                    _, expulsado = self._sprites.popitem(last=False)
+                    self._bytes -= expulsado.nbytes
+        return sprite
+
+
+def superponer_texto(clip, sprite: SpriteTexto, position="bottom"):
+    """
+    Mezcla el sprite sobre todos los frames del clip. Sobre una imagen fija
+    el texto se incrusta una sola vez en los píxeles de la imagen.
+    """
+    x, y = sprite.posicion(clip.size, position)
+    if isinstance(clip, ImageClip) and isinstance(getattr(clip, "img", None), np.ndarray) and clip.mask is None:
+        resultado = ImageClip(sprite.pegar(clip.img, x, y), duration=clip.duration)
+        if clip.audio is not None:
+            resultado = resultado.set_audio(clip.audio)
+        return resultado
+    return clip.fl_image(lambda frame: sprite.pegar(frame, x, y))
+
+
+# Sprites compartidos por todos los renders del proceso
+text_sprite_cache = TextSpriteCache()
@@ -0,0 +1,320 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+from moviepy.editor import VideoClip, ImageClip, CompositeAudioClip
+from utils.blending import mezclar_varios_uint8
+from utils.transitions import TransitionEffect
+
+
+class IndiceIntervalos:
+    """
+    Índice de intervalos [inicio, fin) ordenados por inicio. Los activos en t se
+    encuentran con una búsqueda binaria sobre los inicios y un máximo acumulado
+    de los finales que corta la búsqueda hacia atrás: si apenas se solapan, el
+    coste no depende del número de intervalos.
+    """
+    def __init__(self, inicios, finales):
+        """
+        Los intervalos pueden llegar en cualquier orden (finales en el mismo
+        orden que inicios); activos devuelve sus posiciones originales.
+        """
+        inicios = list(inicios)
+        finales = list(finales)
+        self._orden = sorted(range(len(inicios)), key=inicios.__getitem__)
+        self.inicios = [inicios[i] for i in self._orden]
+        self.finales = [finales[i] for i in self._orden]
+        self._fin_maximo = []
+        fin_maximo = float("-inf")
+        for fin in self.finales:
+            fin_maximo = max(fin_maximo, fin)
+            self._fin_maximo.append(fin_maximo)
+
+    def activos(self, t):
+        """Posiciones originales de los intervalos que contienen t, de menor a mayor."""
+        indice = bisect_right(self.inicios, t) - 1
+        activos = []
+        while indice >= 0 and self._fin_maximo[indice] > t:
+            if self.finales[indice] > t:
+                activos.append(self._orden[indice])
+            indice -= 1
+        activos.sort()
+        return activos
+
+    def ultimo_iniciado(self, t):
+        """Mayor posición original entre los intervalos iniciados en t (0 si ninguno)."""
+        return max(self._orden[:bisect_right(self.inicios, t)], default=0)
+
+
+class TramosEstaticos:
+    """
+    Intervalos [inicio, fin) de la salida en los que el frame no cambia (una
+    escena fija sola, sin disolución, fundido ni cambio de subtítulo). El frame
+    de cada tramo se calcula una vez y se reutiliza en todo el tramo.
+    """
+    def __init__(self, tramos=()):
+        tramos = sorted((inicio, fin) for inicio, fin in tramos if fin > inicio)
+        self.inicios = [inicio for inicio, _ in tramos]
+        self.finales = [fin for _, fin in tramos]
+
+    def __len__(self):
+        return len(self.inicios)
+
+    @property
+    def duracion(self):
+        """Segundos cubiertos por los tramos estáticos."""
+        return sum(fin - inicio for inicio, fin in zip(self.inicios, self.finales))
+
+    def tramo(self, t):
+        """Índice del tramo que contiene t, o None si el frame en t puede cambiar."""
+        indice = bisect_right(self.inicios, t) - 1
+        if indice >= 0 and t < self.finales[indice]:
+            return indice
+        return None
+
+    def repite(self, n, fps):
+        """Si el frame n (en t = n / fps) es el mismo que el frame n - 1."""
+        if n <= 0:
+            return False
+        indice = self.tramo(n / fps)
+        return indice is not None and indice == self.tramo((n - 1) / fps)
+
+    def partir(self, instantes):
+        """Tramos cortados en cada uno de los instantes dados."""
+        instantes = sorted(instantes)
+        tramos = []
+        for inicio, fin in zip(self.inicios, self.finales):
+            desde = bisect_right(instantes, inicio)
+            hasta = bisect_left(instantes, fin)
+            limites = [inicio] + instantes[desde:hasta] + [fin]
+            tramos.extend(zip(limites[:-1], limites[1:]))
+        return TramosEstaticos(tramos)
+
+    def restar(self, desde, hasta):
+        """Tramos sin la parte que cae en [desde, hasta)."""
+        tramos = []
+        for inicio, fin in zip(self.inicios, self.finales):
+            tramos.append((inicio, min(fin, desde)))
+            tramos.append((max(inicio, hasta), fin))
+        return TramosEstaticos(tramos)
+
+    def fijar(self, clip):
+        """
+        Clip que, dentro de un tramo estático, devuelve siempre el mismo frame
+        (calculado al entrar en el tramo) sin recorrer la cadena de composición.
+        """
+        if not self.inicios:
+            return clip
+        ultimo = [None, None]
+
+        def get_frame(gf, t):
+            indice = self.tramo(t)
+            if indice is None:
+                return gf(t)
+            if ultimo[0] != indice:
+                # Copia propia: el compositor reutiliza su búfer de salida en cada frame
+                frame = np.array(gf(t), dtype=np.uint8)
+                frame.flags.writeable = False
+                ultimo[:] = [indice, frame]
+            return ultimo[1]
+
+        resultado = clip.fl(get_frame)
+        resultado.tramos_estaticos = self
+        return resultado
+
+
+class EscenaDiferida:
+    """
+    Descriptor ligero de una escena: su duración y cómo construir el clip. La
+    línea de tiempo solo la construye (decodifica la imagen, aplica el efecto,
+    abre los overlays) cuando el cabezal llega a ella. No aporta audio propio.
+    """
+    def __init__(self, duration, construir, estatica=False):
+        """
+        Args:
+            duration: Duración de la escena en segundos
+            construir: Función sin argumentos que devuelve el clip de la escena
+            estatica: Si todos los frames de la escena son iguales (sin efecto de
+                movimiento ni overlay de video)
+        """
+        self.duration = duration
+        self._construir = construir
+        self.estatica = estatica
+
+    def materializar(self):
+        clip = self._construir()
+        if abs(clip.duration - self.duration) > 1e-6:
+            raise ValueError(f"La escena construida dura {clip.duration}s en lugar de {self.duration}s")
+        return clip
+
+
+def _igualar_dimensiones(frames):
+    """Lleva todos los frames al menor alto y ancho comunes (solo clips externos de otro tamaño)."""
+    referencia = frames[0]
+    for frame in frames[1:]:
+        referencia, _ = TransitionEffect._ensure_same_dimensions(referencia, frame)
+    return [TransitionEffect._ensure_same_dimensions(referencia, frame)[1] for frame in frames]
+
+
+class FlatTimeline:
+    """
+    Línea de tiempo plana: cada clip tiene un inicio absoluto y los solapamientos
+    entre clips consecutivos son ventanas de disolución. Los clips se guardan en
+    orden de montaje: cada uno se mezcla sobre todo lo montado antes que él.
+
+    En lugar de anidar un make_frame por transición, se guarda un índice ordenado
+    de inicios y finales, y el frame t se resuelve con una búsqueda binaria:
+    el coste por frame no depende del número de clips.
+
+    Las entradas pueden ser escenas diferidas (EscenaDiferida): se construyen al
+    entrar en el cabezal y se sueltan en cuanto termina su última ventana de
+    disolución, así que la memoria no depende del número de escenas.
+    """
+    def __init__(self, entradas, duracion=None, anticipacion=1.0):
+        """
+        Args:
+            entradas: Lista de tuplas (clip o EscenaDiferida, inicio) con el inicio en
+                segundos, en orden de montaje
+            duracion: Duración total; por defecto el final del último clip
+            anticipacion: Segundos por delante del cabezal en los que una escena
+                diferida ya construida se conserva (p. ej. tras saltar hacia atrás)
+        """
+        self.clips = [clip for clip, _ in entradas]
+        self.inicios = [inicio for _, inicio in entradas]
+        self.finales = [inicio + clip.duration for clip, inicio in entradas]
+        self._indice = IndiceIntervalos(self.inicios, self.finales)
+        # Final de lo montado antes de cada clip: ahí acaba su ventana de disolución
+        self._fin_montado = []
+        fin_montado = float("-inf")
+        for fin in self.finales:
+            self._fin_montado.append(fin_montado)
+            fin_montado = max(fin_montado, fin)
+        self.anticipacion = anticipacion
+        self._materializados = {}
+
+        self.duracion = duracion if duracion is not None else (max(self.finales) if self.finales else 0)
+
+    @staticmethod
+    def desde_disolucion(clips, transition_duration, **opciones):
+        """
+        Coloca los clips (o escenas diferidas) uno tras otro solapando
+        transition_duration segundos entre cada par consecutivo.
+        """
+        inicios = FlatTimeline.inicios_disolucion([clip.duration for clip in clips], transition_duration)
+        return FlatTimeline(list(zip(clips, inicios)), **opciones)
+
+    @staticmethod
+    def inicios_disolucion(duraciones, transition_duration, avisar=True):
+        """
+        Inicio absoluto de cada clip al solapar transition_duration segundos entre
+        cada par consecutivo (con transition_duration=0 los clips se concatenan).
+        El solape se limita como en la disolución encadenada original: frente a
+        lo ya montado (del inicio al final del clip anterior), no frente al
+        clip anterior solo. Con un clip más corto que la transición, el
+        siguiente puede entrar antes de que empiece ese clip corto.
+        """
+        inicios = []
+        inicio = 0.0
+        for i, duracion in enumerate(duraciones):
+            if i > 0:
+                montado = inicios[-1] + duraciones[i - 1]
+                solape = transition_duration
+                if solape > 0 and (montado <= solape or duracion <= solape):
+                    solape = min(solape, montado / 2, duracion / 2)
+                    if avisar:
+                        print(f"Advertencia: Duración de transición ajustada a {solape} segundos")
+                inicio = montado - solape
+            inicios.append(inicio)
+        return inicios
+
+    @staticmethod
+    def es_estatico(entrada):
+        """Si todos los frames de la entrada (clip o escena diferida) son iguales."""
+        if isinstance(entrada, EscenaDiferida):
+            return entrada.estatica
+        return (isinstance(entrada, ImageClip) and isinstance(getattr(entrada, "img", None), np.ndarray)
+                and entrada.mask is None)
+
+    def tramos_estaticos(self):
+        """
+        Tramos en los que una entrada estática está sola en la línea de tiempo,
+        es decir, fuera de las ventanas de disolución con sus vecinas.
+        """
+        # Primer inicio de lo que se monta después de cada clip (un clip corto
+        # puede hacer que el siguiente empiece antes que él)
+        inicio_siguiente = [self.duracion] * len(self.clips)
+        for i in range(len(self.clips) - 2, -1, -1):
+            inicio_siguiente[i] = min(inicio_siguiente[i + 1], self.inicios[i + 1])
+        tramos = []
+        for i, entrada in enumerate(self.clips):
+            if self.es_estatico(entrada):
+                desde = max(self.inicios[i], self._fin_montado[i])
+                hasta = min(self.finales[i], inicio_siguiente[i])
+                tramos.append((desde, hasta))
+        return TramosEstaticos(tramos)
+
+    def indices_activos(self, t):
+        """Índices de los clips activos en t, en orden de montaje."""
+        return self._indice.activos(t)
+
+    def _indice_mas_cercano(self, t):
+        # Para t fuera de todos los clips (p. ej. t == duración) se usa el último montado
+        return self._indice.ultimo_iniciado(t)
+
+    def clip(self, indice):
+        """Clip de la entrada indice, construyéndolo si es una escena diferida."""
+        entrada = self.clips[indice]
+        if not isinstance(entrada, EscenaDiferida):
+            return entrada
+        clip = self._materializados.get(indice)
+        if clip is None:
+            clip = entrada.materializar()
+            self._materializados[indice] = clip
+        return clip
+
+    def _soltar_fuera_de_ventana(self, t):
+        """Suelta las escenas diferidas ya pasadas o demasiado adelantadas respecto a t."""
+        for indice in list(self._materializados):
+            if self.finales[indice] <= t or self.inicios[indice] > t + self.anticipacion:
+                del self._materializados[indice]
+
+    @property
+    def materializados(self):
+        """Número de escenas diferidas construidas en este momento."""
+        return len(self._materializados)
+
+    def get_frame(self, t):
+        activos = self.indices_activos(t) or [self._indice_mas_cercano(t)]
+        if self._materializados:
+            self._soltar_fuera_de_ventana(t)
+        frames = [self.clip(indice).get_frame(t - self.inicios[indice]) for indice in activos]
+        if len(frames) == 1:
+            return frames[0]
+
+        # Cada clip que entra se mezcla sobre todo lo anterior: su ventana va de
+        # su inicio al final de lo ya montado, aunque el clip previo sea más corto.
+        # Los pesos de las mezclas encadenadas se combinan para redondear una sola vez
+        pesos = [1.0]
+        for indice in activos[1:]:
+            inicio = self.inicios[indice]
+            ventana = self._fin_montado[indice] - inicio
+            progress = (t - inicio) / ventana if ventana > 0 else 1.0
+            pesos = [peso * (1 - progress) for peso in pesos] + [progress]
+        return mezclar_varios_uint8(_igualar_dimensiones(frames), pesos)
+
+    def audio(self):
+        """Audio de todos los clips en una sola composición plana (las escenas diferidas no tienen)."""
+        pistas = [
+            clip.audio.set_start(inicio)
+            for clip, inicio in zip(self.clips, self.inicios)
+            if not isinstance(clip, EscenaDiferida) and getattr(clip, "audio", None) is not None
+        ]
+        if not pistas:
+            return None
+        return CompositeAudioClip(pistas)
+
+    def to_clip(self):
+        """Construye el VideoClip final a partir de la línea de tiempo."""
+        clip = VideoClip(self.get_frame, duration=self.duracion)
+        audio = self.audio()
+        if audio is not None:
+            clip = clip.set_audio(audio.set_duration(self.duracion))
+        return clip
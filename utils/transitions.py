@@ -1,6 +1,7 @@
+import cv2
 import numpy as np
-from PIL import Image
 from moviepy.editor import VideoClip, CompositeAudioClip, concatenate_videoclips
+from utils.blending import mezclar_uint8
 
 class TransitionEffect:
     @staticmethod
@@ -34,15 +35,16 @@ class TransitionEffect:
         target_height = min(h1, h2)
         target_width = min(w1, w2)
         
+        # Con la ingesta de imágenes (utils.image_ingest) todas las escenas llegan ya
+        # al mismo tamaño; esto solo cubre clips externos. INTER_AREA reduce sin
+        # aliasing y mucho más rápido que LANCZOS en PIL
         if h1 != target_height or w1 != target_width:
-            frame1_pil = Image.fromarray(frame1.astype('uint8'))
-            frame1_resized = frame1_pil.resize((target_width, target_height), Image.LANCZOS)
-            frame1 = np.array(frame1_resized)
+            frame1 = cv2.resize(np.ascontiguousarray(frame1, dtype=np.uint8), (target_width, target_height),
+                                interpolation=cv2.INTER_AREA)
         
         if h2 != target_height or w2 != target_width:
-            frame2_pil = Image.fromarray(frame2.astype('uint8'))
-            frame2_resized = frame2_pil.resize((target_width, target_height), Image.LANCZOS)
-            frame2 = np.array(frame2_resized)
+            frame2 = cv2.resize(np.ascontiguousarray(frame2, dtype=np.uint8), (target_width, target_height),
+                                interpolation=cv2.INTER_AREA)
         
         return frame1, frame2
     
@@ -57,7 +59,7 @@ class TransitionEffect:
         
         def blend(frame1, frame2, progress):
             frame1, frame2 = TransitionEffect._ensure_same_dimensions(frame1, frame2)
-            return (1 - progress) * frame1 + progress * frame2
+            return mezclar_uint8(frame1, frame2, progress)
         
         def make_frame(t):
             if t < start_time:
@@ -88,15 +90,17 @@ class TransitionEffect:
     
     @staticmethod
     def _apply_dissolve_transitions(clips, transition_duration=1.0):
-        """Aplica transiciones de disolución entre una lista de clips."""
+        """
+        Aplica transiciones de disolución entre una lista de clips.
+        Los clips se colocan en una línea de tiempo plana (sin anidar una
+        transición dentro de otra), así que cada frame se resuelve con una
+        búsqueda binaria sea cual sea el número de clips.
+        """
         if not clips:
             return None
             
         if len(clips) == 1 or transition_duration <= 0:
             return clips[0] if len(clips) == 1 else concatenate_videoclips(clips)
         
-        final_clip = clips[0]
-        for i in range(1, len(clips)):
-            final_clip = TransitionEffect._dissolve_transition(final_clip, clips[i], transition_duration)
-        
-        return final_clip 
\ No newline at end of file
+        from utils.timeline import FlatTimeline
+        return FlatTimeline.desde_disolucion(clips, transition_duration).to_clip()
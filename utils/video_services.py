@@ -1,15 +1,22 @@
 from moviepy.editor import (
-    VideoFileClip, AudioFileClip, TextClip, ImageClip,
-    concatenate_videoclips, CompositeVideoClip, CompositeAudioClip,
-    concatenate_audioclips
+    VideoFileClip, AudioFileClip, ImageClip,
+    concatenate_videoclips, CompositeVideoClip
 )
 from moviepy.video.fx import all as vfx
 from moviepy.audio.fx import all as afx
-from utils.efectos import EfectosVideo
-from utils.transitions import TransitionEffect
-from utils.overlays import OverlayManager
+from utils.efectos import EfectosVideo, EFECTOS_ESTATICOS
+from utils.overlays import OverlayManager, normalizar_entrada_overlay
+from utils.overlay_pool import overlay_pool
+from utils.render_profiles import RenderProfile, obtener_perfil
+from utils.text_render import text_sprite_cache, superponer_texto
+from utils.captions import CaptionRenderer
+from utils.audio_loop import AudioEnBucle
+from utils.audio_mixer import AudioMixer, escribir_video_con_mezcla
+from utils.image_ingest import image_ingest_cache, margen_efecto
+from utils.timeline import EscenaDiferida, FlatTimeline
 import os
-from typing import List, Union, Optional
+from functools import partial
+from typing import List, Union, Optional, Tuple
 
 class VideoServices:
     def __init__(self):
@@ -34,88 +41,266 @@ class VideoServices:
         fade_in_duration: float = 1.0,
         fade_out_duration: float = 1.0,
         music_volume: float = 0.5,
-        music_loop: bool = True
+        music_loop: bool = True,
+        music_crossfade: float = 0.0,
+        music_ducking: bool = False,
+        workers: int = 1,
+        parallel_mode: str = 'segments',
+        profile: Union[str, RenderProfile, None] = None,
+        scene_cache: bool = False,
+        captions: Optional[List[dict]] = None,
+        caption_style: Optional[dict] = None,
+        backend: str = 'moviepy'
     ) -> str:
-        """Crea un video a partir de imágenes con transiciones y efectos."""
-        clips = []
-        overlay_manager = OverlayManager()
-        
-        for i, image_path in enumerate(images):
-            # Crear clip de imagen
-            clip = ImageClip(image_path, duration=duration_per_image)
-            
-            # Aplicar efecto si se proporciona
-            if effects_sequence:
-                effect_index = i % len(effects_sequence)
-                effect_name, effect_params = effects_sequence[effect_index]
-                clip = EfectosVideo.apply_effect(clip, effect_name, **effect_params)
-            
-            # Aplicar overlays de forma cíclica si se proporcionan
-            if overlay_sequence:
-                overlay_index = i % len(overlay_sequence)
-                overlay_name, opacity, start_time, duration = overlay_sequence[overlay_index]
-                print(f"[DEBUG] Aplicando overlay: {overlay_name}, opacidad: {opacity}, start_time: {start_time}, duration: {duration_per_image} a la imagen {i} ({image_path})")
-                clip = overlay_manager.apply_overlays(
-                    clip,
-                    [(overlay_name, opacity, 0, duration_per_image)]
-                )
-            
-            # Aplicar texto si se proporciona
-            if text:
-                txt_clip = TextClip(text, fontsize=text_size, color=text_color)
-                txt_clip = txt_clip.set_position(text_position).set_duration(duration_per_image)
-                clip = CompositeVideoClip([clip, txt_clip])
-            
-            clips.append(clip)
+        """
+        Crea un video a partir de imágenes con transiciones y efectos.
+        profile elige el perfil de render (resolución, fps y codificador) por
+        nombre; por defecto el de config.yaml. Con scene_cache=True se renderiza
+        por segmentos de escena y se reutilizan los que no han cambiado desde un
+        render anterior (ver utils.scene_cache).
+        Con music_loop la música se repite hasta cubrir el video, fundiendo cada
+        unión durante music_crossfade segundos (ver utils.audio_loop). Con
+        music_ducking la música baja mientras suena la voz en off (ver utils.audio_mixer).
+        captions (los segmentos de la transcripción, con 'text', 'start' y 'end')
+        se incrustan como subtítulos con el estilo de caption_style (ver utils.captions).
+        Con workers > 1 el render se reparte entre procesos (ver utils.parallel_render):
+        por segmentos unidos sin recodificar (parallel_mode='segments') o por
+        frames sueltos hacia un único codificador (parallel_mode='frames').
+        Con backend='ffmpeg' el video se compila en un único filtergraph de
+        ffmpeg (ver utils.ffmpeg_backend; workers y scene_cache no se usan) y,
+        si tiene algo que no se puede expresar, se renderiza con moviepy.
+        """
+        perfil = obtener_perfil(profile)
+        print(f"[DEBUG] Perfil de render: {perfil}")
         
-        # Aplicar transiciones entre clips
-        final_clip = TransitionEffect.apply_transition(
-            clips, 
+        # Todo lo que define la imagen del video; los procesos del render en
+        # paralelo reconstruyen el clip a partir de estos mismos parámetros
+        parametros_video = dict(
+            images=list(images),
+            duration_per_image=duration_per_image,
+            transition_duration=transition_duration,
             transition_type=transition_type,
-            transition_duration=transition_duration
+            text=text,
+            text_position=text_position,
+            text_color=text_color,
+            text_size=text_size,
+            effects_sequence=effects_sequence,
+            overlay_sequence=overlay_sequence,
+            fade_in_duration=fade_in_duration,
+            fade_out_duration=fade_out_duration,
+            captions=captions,
+            caption_style=caption_style,
+            fps=perfil.fps,
+            resolution=perfil.tamano
         )
         
-        # Aplicar fade in y fade out
-        if fade_in_duration > 0:
-            final_clip = final_clip.fadein(fade_in_duration)
-        if fade_out_duration > 0:
-            final_clip = final_clip.fadeout(fade_out_duration)
+        # Backend nativo: todo el video en un solo filtergraph de ffmpeg, si se puede expresar
+        if backend == 'ffmpeg':
+            from utils.ffmpeg_backend import FiltergraphRenderer, motivo_no_soportado
+            motivo = motivo_no_soportado(parametros_video, perfil)
+            if motivo is None:
+                mezclador = self._mezclar_audio(
+                    FiltergraphRenderer.duracion(parametros_video), None, background_music, voice_over,
+                    music_volume, music_loop, music_crossfade, music_ducking
+                )
+                output_path = self._get_unique_output_path(perfil.extension)
+                FiltergraphRenderer(perfil).render(
+                    parametros_video, output_path, audio=None if mezclador.vacio else mezclador.como_clip()
+                )
+                return output_path
+            print(f"[DEBUG] El backend ffmpeg no admite este video ({motivo}), se usa moviepy")
+        
+        # Los lectores de overlays se toman del pool compartido y se devuelven
+        # al terminar el render, aunque falle
+        with overlay_pool.sesion() as lectores:
+            final_clip = self._construir_video(lectores, **parametros_video)
+        
+            # Mezclar el audio (música, voz en off y audio de las transiciones) por bloques
+            mezclador = self._mezclar_audio(
+                final_clip.duration, final_clip.audio, background_music, voice_over,
+                music_volume, music_loop, music_crossfade, music_ducking
+            )
+            if not mezclador.vacio:
+                final_clip = final_clip.set_audio(mezclador.como_clip())
+        
+            # Generar nombre de archivo único
+            output_path = self._get_unique_output_path(perfil.extension)
+        
+            # Guardar el video
+            if scene_cache:
+                from utils.parallel_render import ParallelRenderer
+                from utils.scene_cache import scene_render_cache
+                ParallelRenderer(workers=workers, perfil=perfil).render(
+                    final_clip, parametros_video, output_path, cache=scene_render_cache
+                )
+            elif workers > 1:
+                from utils.parallel_render import ParallelRenderer, FramePoolRenderer
+                renderer = FramePoolRenderer if parallel_mode == 'frames' else ParallelRenderer
+                renderer(workers=workers, perfil=perfil).render(final_clip, parametros_video, output_path)
+            else:
+                escribir_video_con_mezcla(final_clip, mezclador, output_path, perfil)
         
-        # Manejar el audio
-        audio_clips = []
+        return output_path
+    
+    @staticmethod
+    def _mezclar_audio(
+        duracion: float,
+        audio_base,
+        background_music,
+        voice_over,
+        music_volume: float,
+        music_loop: bool,
+        music_crossfade: float,
+        music_ducking: bool
+    ) -> AudioMixer:
+        """Mezclador con el audio del video, la música de fondo y la voz en off."""
+        mezclador = AudioMixer(duracion)
+        if audio_base is not None:
+            mezclador.anadir(audio_base)
         
         # Añadir música de fondo si se proporciona
         if background_music:
             if music_loop:
-                while background_music.duration < final_clip.duration:
-                    background_music = concatenate_audioclips([background_music, background_music])
-                background_music = background_music.subclip(0, final_clip.duration)
-            background_music = background_music.volumex(music_volume)
-            audio_clips.append(background_music)
+                background_music = AudioEnBucle(background_music, duracion, crossfade=music_crossfade)
+            mezclador.anadir(background_music, volumen=music_volume, atenuar=music_ducking)
         
         # Añadir voz en off si se proporciona
         if voice_over:
-            audio_clips.append(voice_over)
+            mezclador.anadir_voz(voice_over)
+        return mezclador
+    
+    def _construir_video(
+        self,
+        lectores,
+        images: List[str],
+        duration_per_image: float,
+        transition_duration: float,
+        transition_type: str,
+        text: Optional[str],
+        text_position: str,
+        text_color: str,
+        text_size: int,
+        effects_sequence: Optional[List[tuple]],
+        overlay_sequence: Optional[List[tuple]],
+        fade_in_duration: float,
+        fade_out_duration: float,
+        captions: Optional[List[dict]] = None,
+        caption_style: Optional[dict] = None,
+        fps: float = 24,
+        resolution: Optional[Tuple[int, int]] = None
+    ):
+        """
+        Construye el clip de video (imágenes, efectos, overlays, texto,
+        transiciones, subtítulos y fundidos) sin la música ni la voz en off.
+        Con resolution, cada imagen se encaja en ese tamaño antes de los efectos
+        (ver utils.image_ingest).
+        """
+        overlay_manager = OverlayManager()
         
-        # Combinar todos los clips de audio
-        if audio_clips:
-            final_audio = CompositeAudioClip(audio_clips)
-            final_clip = final_clip.set_audio(final_audio)
+        # Cada escena es un descriptor ligero: la línea de tiempo la construye al
+        # llegar el cabezal y la suelta tras su última disolución, así que la
+        # memoria no crece con la duración del video
+        escenas = [
+            EscenaDiferida(duration_per_image, partial(
+                self._construir_escena, overlay_manager, lectores, i, image_path, duration_per_image,
+                text, text_position, text_color, text_size, effects_sequence, overlay_sequence, fps, resolution
+            ), estatica=self._escena_estatica(i, effects_sequence, overlay_sequence))
+            for i, image_path in enumerate(images)
+        ]
         
-        # Generar nombre de archivo único
-        output_path = self._get_unique_output_path()
+        # Aplicar transiciones entre clips (sin disolución las escenas se concatenan)
+        solape = transition_duration if transition_type == 'dissolve' and len(escenas) > 1 else 0
+        linea = FlatTimeline.desde_disolucion(escenas, solape)
+        final_clip = linea.to_clip()
+        tramos = linea.tramos_estaticos()
         
-        # Guardar el video
-        final_clip.write_videofile(
-            output_path,
-            fps=24,
-            codec='libx264',
-            audio_codec='aac',
-            temp_audiofile='temp-audio.m4a',
-            remove_temp=True
-        )
+        # Incrustar los subtítulos de la transcripción (antes de los fundidos,
+        # que también los oscurecen)
+        if captions:
+            subtitulos = CaptionRenderer(captions, final_clip.size, caption_style)
+            final_clip = subtitulos.aplicar(final_clip)
+            tramos = tramos.partir(subtitulos.instantes_cambio())
         
-        return output_path
+        # Aplicar fade in y fade out (en uint8, conservando el audio de las transiciones)
+        if fade_in_duration > 0 or fade_out_duration > 0:
+            audio_transiciones = final_clip.audio
+            if fade_in_duration > 0:
+                final_clip = EfectosVideo.fade_in(final_clip, duration=fade_in_duration)
+            if fade_out_duration > 0:
+                final_clip = EfectosVideo.fade_out(final_clip, duration=fade_out_duration)
+            if audio_transiciones is not None:
+                final_clip = final_clip.set_audio(audio_transiciones)
+            tramos = tramos.restar(0, fade_in_duration).restar(final_clip.duration - fade_out_duration, final_clip.duration)
+        
+        # Donde la salida no cambia, el frame se compone una vez y se repite
+        if len(tramos):
+            print(f"[DEBUG] {len(tramos)} tramos estáticos ({tramos.duracion:.1f}s de {final_clip.duration:.1f}s)")
+        return tramos.fijar(final_clip)
+    
+    @staticmethod
+    def _escena_estatica(i: int, effects_sequence: Optional[List[tuple]], overlay_sequence: Optional[List[tuple]]) -> bool:
+        """Si la escena i es una imagen fija: sin overlay de video y sin efecto de movimiento."""
+        if overlay_sequence:
+            return False
+        effect_name = effects_sequence[i % len(effects_sequence)][0] if effects_sequence else None
+        return effect_name is None or effect_name in EFECTOS_ESTATICOS
+    
+    def _construir_escena(
+        self,
+        overlay_manager,
+        lectores,
+        i: int,
+        image_path: str,
+        duration_per_image: float,
+        text: Optional[str],
+        text_position: str,
+        text_color: str,
+        text_size: int,
+        effects_sequence: Optional[List[tuple]],
+        overlay_sequence: Optional[List[tuple]],
+        fps: float,
+        resolution: Optional[Tuple[int, int]]
+    ):
+        """Construye el clip de la escena i: imagen, efecto, overlay y texto."""
+        effect_name, effect_params = None, {}
+        if effects_sequence:
+            effect_name, effect_params = effects_sequence[i % len(effects_sequence)]
+        
+        # Crear clip de imagen: decodificada una vez, encajada en la resolución
+        # (con margen para el zoom del efecto) y leída mapeada desde la caché
+        margen = margen_efecto(effect_name, effect_params) if resolution else 1.0
+        clip = ImageClip(image_ingest_cache.obtener(image_path, resolution, margen), duration=duration_per_image)
+        
+        # Aplicar efecto si se proporciona
+        if effect_name:
+            if resolution and tuple(clip.size) != tuple(resolution):
+                # La imagen trae margen: el efecto remuestrea directamente a la resolución
+                effect_params = dict(effect_params, tamano_salida=tuple(resolution))
+            clip = EfectosVideo.apply_effect(clip, effect_name, **effect_params)
+        
+        # Aplicar overlays de forma cíclica si se proporcionan
+        if overlay_sequence:
+            overlay_index = i % len(overlay_sequence)
+            overlay_name, opacity, start_time, duration, blend_mode, key = normalizar_entrada_overlay(
+                overlay_sequence[overlay_index]
+            )
+            print(f"[DEBUG] Aplicando overlay: {overlay_name}, opacidad: {opacity}, modo: {blend_mode}, start_time: {start_time}, duration: {duration_per_image} a la imagen {i} ({image_path})")
+            clip = overlay_manager.apply_overlays(
+                clip,
+                [(overlay_name, opacity, 0, duration_per_image, blend_mode, key)],
+                lectores=lectores,
+                slot=i % 2,
+                fps=fps
+            )
+        
+        # Aplicar texto si se proporciona
+        if text:
+            # El sprite se rasteriza una vez y se reutiliza en todas las escenas
+            sprite = text_sprite_cache.obtener(text, size=text_size, color=text_color,
+                                               max_width=int(clip.w * 0.9))
+            clip = superponer_texto(clip, sprite, text_position)
+        
+        return clip
     
     def add_text_to_video(
         self,
@@ -124,7 +309,8 @@ class VideoServices:
         position: str = "bottom",
         font_size: int = 24,
         color: str = "white",
-        output_name: str = "video_with_text.mp4"
+        output_name: str = "video_with_text.mp4",
+        profile: Union[str, RenderProfile, None] = None
     ) -> str:
         """
         Añade texto a un video existente.
@@ -136,38 +322,28 @@ class VideoServices:
             font_size: Tamaño de la fuente
             color: Color del texto
             output_name: Nombre del archivo de salida
+            profile: Perfil de render (fps y codificador; se conserva el tamaño del video)
             
         Returns:
             str: Ruta al video con texto
         """
         video = VideoFileClip(video_path)
         
-        # Crear clip de texto
-        txt_clip = TextClip(
-            text,
-            fontsize=font_size,
-            color=color,
-            bg_color='transparent'
-        )
+        # Rasterizar el texto (sprite RGBA)
+        sprite = text_sprite_cache.obtener(text, size=font_size, color=color, max_width=int(video.w * 0.9))
         
         # Posicionar el texto
-        if position == "top":
-            txt_clip = txt_clip.set_position(('center', 'top'))
-        elif position == "bottom":
-            txt_clip = txt_clip.set_position(('center', 'bottom'))
-        else:
-            txt_clip = txt_clip.set_position('center')
+        if position not in ("top", "bottom"):
+            position = "center"
         
-        # Combinar video y texto
-        final_clip = video.set_mask(txt_clip)
+        # Mezclar el texto sobre cada frame del video
+        final_clip = superponer_texto(video, sprite, position)
         
         # Guardar el resultado
         output_path = os.path.join(self.output_dir, output_name)
         final_clip.write_videofile(
             output_path,
-            fps=24,
-            codec='libx264',
-            audio_codec='aac'
+            **obtener_perfil(profile).parametros_write_videofile()
         )
         
         return output_path
@@ -176,7 +352,8 @@ class VideoServices:
         self,
         video_path: str,
         effect: str,
-        output_name: str = "video_with_effect.mp4"
+        output_name: str = "video_with_effect.mp4",
+        profile: Union[str, RenderProfile, None] = None
     ) -> str:
         """
         Aplica un efecto al video.
@@ -185,6 +362,7 @@ class VideoServices:
             video_path: Ruta al video original
             effect: Nombre del efecto a aplicar
             output_name: Nombre del archivo de salida
+            profile: Perfil de render (fps y codificador; se conserva el tamaño del video)
             
         Returns:
             str: Ruta al video con el efecto aplicado
@@ -205,9 +383,7 @@ class VideoServices:
         output_path = os.path.join(self.output_dir, output_name)
         video.write_videofile(
             output_path,
-            fps=24,
-            codec='libx264',
-            audio_codec='aac'
+            **obtener_perfil(profile).parametros_write_videofile()
         )
         
         return output_path
@@ -228,7 +404,7 @@ class VideoServices:
             clip = effect(clip)
         return clip
 
-    def _get_unique_output_path(self):
+    def _get_unique_output_path(self, extension: str = "mp4"):
         # Implementa la lógica para obtener un nombre de archivo único
         # Este es un ejemplo básico, puedes mejorarlo según tus necesidades
-        return os.path.join(self.output_dir, f"video_{len(os.listdir(self.output_dir))}.mp4") 
\ No newline at end of file
+        return os.path.join(self.output_dir, f"video_{len(os.listdir(self.output_dir))}.{extension}") 
\ No newline at end of file
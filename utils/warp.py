@@ -0,0 +1,125 @@
+import cv2
+import numpy as np
+
+# Calidades de interpolación disponibles para el remuestreo
+INTERPOLACIONES = {
+    "nearest": cv2.INTER_NEAREST,
+    "bilinear": cv2.INTER_LINEAR,
+    "bicubic": cv2.INTER_CUBIC,
+    "lanczos": cv2.INTER_LANCZOS4,
+}
+
+CALIDAD_POR_DEFECTO = "bilinear"
+
+# Modos de borde para las coordenadas que caen fuera de la imagen fuente
+BORDES = {
+    "replicate": cv2.BORDER_REPLICATE,
+    "wrap": cv2.BORDER_WRAP,
+    "constant": cv2.BORDER_CONSTANT,
+}
+
+
+def matriz_identidad():
+    """Transformación que deja el frame tal cual."""
+    return np.eye(3, dtype=np.float64)
+
+
+def matriz_recorte(w, h, x0, y0, ancho, alto, tamano_salida=None):
+    """
+    Matriz que lleva coordenadas de salida a coordenadas de la fuente
+    para el recorte (x0, y0, ancho, alto) escalado al tamaño de salida.
+
+    Las posiciones son subpíxel: no se redondea el recorte.
+    """
+    out_w, out_h = tamano_salida or (w, h)
+    sx = ancho / out_w
+    sy = alto / out_h
+    # Alinear centros de píxel: src + 0.5 = x0 + (dst + 0.5) * s
+    return np.array([
+        [sx, 0.0, x0 + 0.5 * sx - 0.5],
+        [0.0, sy, y0 + 0.5 * sy - 0.5],
+        [0.0, 0.0, 1.0],
+    ])
+
+
+def matriz_zoom(w, h, zoom, tamano_salida=None):
+    """Zoom centrado: recorta w/zoom x h/zoom en el centro de la imagen."""
+    ancho = w / zoom
+    alto = h / zoom
+    return matriz_recorte(w, h, (w - ancho) / 2, (h - alto) / 2, ancho, alto, tamano_salida)
+
+
+def matriz_kenburns(w, h, zoom, pan_x, pan_y, tamano_salida=None):
+    """
+    Zoom con desplazamiento del centro (pan_x, pan_y en fracción del tamaño),
+    manteniendo el recorte dentro de los límites de la imagen.
+    """
+    ancho = w / zoom
+    alto = h / zoom
+    x0 = (w - ancho) / 2 + pan_x * w
+    y0 = (h - alto) / 2 + pan_y * h
+    x0 = max(0.0, min(x0, w - ancho))
+    y0 = max(0.0, min(y0, h - alto))
+    return matriz_recorte(w, h, x0, y0, ancho, alto, tamano_salida)
+
+
+def matriz_desplazamiento(dx, dy):
+    """Traslación en píxeles: el píxel de salida x lee la fuente en x - dx."""
+    return np.array([
+        [1.0, 0.0, -dx],
+        [0.0, 1.0, -dy],
+        [0.0, 0.0, 1.0],
+    ])
+
+
+def warp_frame(frame, matriz, tamano_salida=None, calidad=CALIDAD_POR_DEFECTO, borde="replicate"):
+    """
+    Remuestrea el frame en una sola llamada aplicando la matriz afín
+    (coordenadas de salida -> coordenadas de la fuente).
+
+    Args:
+        frame: Array HxWxC uint8
+        matriz: Matriz 3x3 o 2x3 de salida a fuente
+        tamano_salida: (ancho, alto) del resultado; por defecto el de la fuente
+        calidad: 'nearest', 'bilinear', 'bicubic' o 'lanczos'
+        borde: 'replicate', 'wrap' o 'constant'
+    """
+    h, w = frame.shape[:2]
+    out_w, out_h = tamano_salida or (w, h)
+    m = np.asarray(matriz, dtype=np.float64)[:2]
+
+    # Una matriz identidad no necesita remuestreo
+    if (out_w, out_h) == (w, h) and np.allclose(m, np.eye(3)[:2]):
+        return frame
+
+    if not frame.flags["C_CONTIGUOUS"]:
+        frame = np.ascontiguousarray(frame)
+    flags = INTERPOLACIONES.get(calidad, INTERPOLACIONES[CALIDAD_POR_DEFECTO]) | cv2.WARP_INVERSE_MAP
+    return cv2.warpAffine(
+        frame, m, (out_w, out_h),
+        flags=flags,
+        borderMode=BORDES.get(borde, cv2.BORDER_REPLICATE)
+    )
+
+
+def encajar_frame(frame, tamano_salida):
+    """
+    Escala el frame completo para que quepa en tamano_salida conservando su
+    proporción y lo centra sobre negro (letterbox / pillarbox).
+    """
+    h, w = frame.shape[:2]
+    out_w, out_h = tamano_salida
+    if (w, h) == (out_w, out_h):
+        return frame
+    escala = min(out_w / w, out_h / h)
+    ancho = max(1, round(w * escala))
+    alto = max(1, round(h * escala))
+    # INTER_AREA promedia al reducir y evita el aliasing de las fotos grandes
+    interpolacion = cv2.INTER_AREA if escala < 1 else cv2.INTER_CUBIC
+    frame = cv2.resize(np.ascontiguousarray(frame), (ancho, alto), interpolation=interpolacion)
+    izquierda = (out_w - ancho) // 2
+    arriba = (out_h - alto) // 2
+    return cv2.copyMakeBorder(
+        frame, arriba, out_h - alto - arriba, izquierda, out_w - ancho - izquierda,
+        cv2.BORDER_CONSTANT, value=0
+    )